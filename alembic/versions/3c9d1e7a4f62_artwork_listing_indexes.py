@@ -0,0 +1,33 @@
+"""artwork listing indexes
+
+Revision ID: 3c9d1e7a4f62
+Revises: e8a41d6b9c07
+Create Date: 2026-10-18 12:31:44.086205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9d1e7a4f62'
+down_revision: Union[str, Sequence[str], None] = 'e8a41d6b9c07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_artworks_created_id', 'artworks', ['createdAt', 'id'], unique=False)
+    op.create_index('ix_artworks_category_created_id', 'artworks', ['category', 'createdAt', 'id'], unique=False)
+    op.create_index('ix_artworks_forsale_created_id', 'artworks', ['forSale', 'createdAt', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_artworks_forsale_created_id', table_name='artworks')
+    op.drop_index('ix_artworks_category_created_id', table_name='artworks')
+    op.drop_index('ix_artworks_created_id', table_name='artworks')
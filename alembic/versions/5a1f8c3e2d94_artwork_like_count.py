@@ -0,0 +1,33 @@
+"""artwork like_count
+
+Revision ID: 5a1f8c3e2d94
+Revises: 3c9d1e7a4f62
+Create Date: 2026-10-18 14:02:17.512930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a1f8c3e2d94'
+down_revision: Union[str, Sequence[str], None] = '3c9d1e7a4f62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('artworks', sa.Column('like_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute(
+        "UPDATE artworks SET like_count = "
+        "(SELECT COUNT(*) FROM artwork_likes WHERE artwork_likes.artworkId = artworks.id)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('artworks', 'like_count')
@@ -0,0 +1,73 @@
+"""added conversations table
+
+Revision ID: 7b3f0c2d5e81
+Revises: c4e2a7d91b35
+Create Date: 2026-10-18 11:02:17.530914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b3f0c2d5e81'
+down_revision: Union[str, Sequence[str], None] = 'c4e2a7d91b35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('conversations',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('owner_id', sa.String(length=36), nullable=False),
+    sa.Column('partner_id', sa.String(length=36), nullable=False),
+    sa.Column('pair_key', sa.String(length=73), nullable=False),
+    sa.Column('last_message_id', sa.String(length=36), nullable=True),
+    sa.Column('last_message_preview', sa.String(length=255), nullable=True),
+    sa.Column('last_message_type', sa.String(length=20), nullable=True),
+    sa.Column('last_message_at', sa.DateTime(), nullable=False),
+    sa.Column('unread_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['partner_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('owner_id', 'partner_id', name='uq_conversations_owner_partner')
+    )
+    op.create_index('ix_conversations_owner_activity', 'conversations', ['owner_id', 'last_message_at', 'id'], unique=False)
+    op.create_index(op.f('ix_conversations_pair_key'), 'conversations', ['pair_key'], unique=False)
+
+    # Backfill: one row per (owner, partner) with the latest activity and unread count
+    op.execute("""
+        INSERT INTO conversations (id, owner_id, partner_id, pair_key, last_message_at, unread_count)
+        SELECT UUID(), t.owner_id, t.partner_id,
+               CONCAT(LEAST(t.owner_id, t.partner_id), ':', GREATEST(t.owner_id, t.partner_id)),
+               MAX(t.ts), SUM(t.unread)
+        FROM (
+            SELECT sender_id AS owner_id, receiver_id AS partner_id, timestamp AS ts, 0 AS unread
+            FROM messages
+            UNION ALL
+            SELECT receiver_id, sender_id, timestamp, CASE WHEN is_read THEN 0 ELSE 1 END
+            FROM messages
+        ) t
+        GROUP BY t.owner_id, t.partner_id
+    """)
+    op.execute("""
+        UPDATE conversations c
+        JOIN messages m
+          ON m.timestamp = c.last_message_at
+         AND ((m.sender_id = c.owner_id AND m.receiver_id = c.partner_id)
+           OR (m.sender_id = c.partner_id AND m.receiver_id = c.owner_id))
+        SET c.last_message_id = m.id,
+            c.last_message_preview = LEFT(m.content, 255),
+            c.last_message_type = m.message_type
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_conversations_pair_key'), table_name='conversations')
+    op.drop_index('ix_conversations_owner_activity', table_name='conversations')
+    op.drop_table('conversations')
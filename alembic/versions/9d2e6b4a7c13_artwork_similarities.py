@@ -0,0 +1,39 @@
+"""artwork similarities
+
+Revision ID: 9d2e6b4a7c13
+Revises: 5a1f8c3e2d94
+Create Date: 2026-10-18 16:40:05.218734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d2e6b4a7c13'
+down_revision: Union[str, Sequence[str], None] = '5a1f8c3e2d94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('artwork_similarities',
+    sa.Column('artwork_id', sa.String(length=36), nullable=False),
+    sa.Column('similar_id', sa.String(length=36), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('rank', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('artwork_id', 'similar_id')
+    )
+    op.create_index('ix_artwork_similarities_lookup', 'artwork_similarities', ['artwork_id', 'rank'], unique=False)
+    op.create_index('ix_artwork_similarities_similar', 'artwork_similarities', ['similar_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_artwork_similarities_similar', table_name='artwork_similarities')
+    op.drop_index('ix_artwork_similarities_lookup', table_name='artwork_similarities')
+    op.drop_table('artwork_similarities')
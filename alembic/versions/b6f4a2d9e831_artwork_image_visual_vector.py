@@ -0,0 +1,29 @@
+"""artwork image visual vector
+
+Revision ID: b6f4a2d9e831
+Revises: 9d2e6b4a7c13
+Create Date: 2026-10-18 17:22:51.603127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6f4a2d9e831'
+down_revision: Union[str, Sequence[str], None] = '9d2e6b4a7c13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('artwork_images', sa.Column('visual_vector', sa.LargeBinary(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('artwork_images', 'visual_vector')
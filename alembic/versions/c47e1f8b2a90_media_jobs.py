@@ -0,0 +1,41 @@
+"""media jobs
+
+Revision ID: c47e1f8b2a90
+Revises: b6f4a2d9e831
+Create Date: 2026-10-18 18:05:12.448903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c47e1f8b2a90'
+down_revision: Union[str, Sequence[str], None] = 'b6f4a2d9e831'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('media_jobs',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('action', sa.String(length=20), nullable=False),
+    sa.Column('public_id', sa.String(length=255), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('run_after', sa.DateTime(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_media_jobs_status_run_after', 'media_jobs', ['status', 'run_after'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_media_jobs_status_run_after', table_name='media_jobs')
+    op.drop_table('media_jobs')
@@ -0,0 +1,74 @@
+"""added artist rating stats table
+
+Revision ID: c4e2a7d91b35
+Revises: 95c70ac85952
+Create Date: 2026-10-18 10:12:41.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e2a7d91b35'
+down_revision: Union[str, Sequence[str], None] = '95c70ac85952'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BAYESIAN_M = 5
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    stats = op.create_table('artist_rating_stats',
+    sa.Column('artist_id', sa.String(length=36), nullable=False),
+    sa.Column('rating_sum', sa.Integer(), nullable=False),
+    sa.Column('review_count', sa.Integer(), nullable=False),
+    sa.Column('avg_rating', sa.Float(), nullable=False),
+    sa.Column('weighted_rating', sa.Float(), nullable=False),
+    sa.Column('rank', sa.Integer(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['artist_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('artist_id')
+    )
+    op.create_index(op.f('ix_artist_rating_stats_weighted_rating'), 'artist_rating_stats', ['weighted_rating'], unique=False)
+    op.create_index(op.f('ix_artist_rating_stats_rank'), 'artist_rating_stats', ['rank'], unique=False)
+
+    # Backfill from existing reviews
+    rows = op.get_bind().execute(sa.text(
+        "SELECT artist_id, SUM(rating) AS total, COUNT(id) AS cnt "
+        "FROM artist_reviews GROUP BY artist_id"
+    )).fetchall()
+    total_sum = sum(int(r.total or 0) for r in rows)
+    total_count = sum(int(r.cnt) for r in rows)
+    global_avg = total_sum / total_count if total_count else 0.0
+
+    backfill = []
+    for r in rows:
+        count = int(r.cnt)
+        avg = int(r.total or 0) / count
+        weighted = (count / (count + BAYESIAN_M)) * avg + (BAYESIAN_M / (count + BAYESIAN_M)) * global_avg
+        backfill.append({
+            'artist_id': r.artist_id,
+            'rating_sum': int(r.total or 0),
+            'review_count': count,
+            'avg_rating': avg,
+            'weighted_rating': weighted,
+        })
+
+    dense = {w: i for i, w in enumerate(sorted({b['weighted_rating'] for b in backfill}, reverse=True), start=1)}
+    for b in backfill:
+        b['rank'] = dense[b['weighted_rating']]
+
+    if backfill:
+        op.bulk_insert(stats, backfill)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_artist_rating_stats_rank'), table_name='artist_rating_stats')
+    op.drop_index(op.f('ix_artist_rating_stats_weighted_rating'), table_name='artist_rating_stats')
+    op.drop_table('artist_rating_stats')
@@ -0,0 +1,39 @@
+"""added conversation key to messages
+
+Revision ID: e8a41d6b9c07
+Revises: 7b3f0c2d5e81
+Create Date: 2026-10-18 11:48:05.112376
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8a41d6b9c07'
+down_revision: Union[str, Sequence[str], None] = '7b3f0c2d5e81'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('messages', sa.Column('conversation_key', sa.String(length=73), nullable=True))
+
+    # Backfill: same format as chat_crud.pair_key ("<smaller id>:<larger id>")
+    op.execute("""
+        UPDATE messages
+        SET conversation_key = CONCAT(LEAST(sender_id, receiver_id), ':', GREATEST(sender_id, receiver_id))
+    """)
+
+    op.alter_column('messages', 'conversation_key', existing_type=sa.String(length=73), nullable=False)
+    op.create_index('ix_messages_conversation_history', 'messages', ['conversation_key', 'timestamp', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_messages_conversation_history', table_name='messages')
+    op.drop_column('messages', 'conversation_key')
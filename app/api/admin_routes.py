@@ -1,18 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, Form, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Form, UploadFile, File, BackgroundTasks
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from uuid import UUID
 
 from app.database import get_db
 from app.core.auth import get_current_admin
-from app.models.models import User
+from app.models.models import User, Artwork, ModerationQueue, StatusENUM
 
 from app.schemas.user_schema import UserCreate, UserBaseAdmin, UserUpdateAdmin, DeleteMessageUser
-from app.schemas.artworks_schemas import ArtworkAdmin, ArtworkRead, ArtworkDelete, ArtworkUpdate
+from app.schemas.artworks_schemas import ArtworkAdmin, ArtworkRead, ArtworkDelete, ArtworkAdminUpdate
 from app.schemas.order_schemas import OrderRead, OrderDelete
 from app.schemas.follow_schemas import FollowFollowers
 from app.schemas.admin_schemas import AdminAuditLogResponse
-from app.crud import admin_crud, search_crud
+from app.crud import admin_crud, search_crud, moderation_crud
+from app.util import util_leaderboard, util_cache, util_artwork_hooks
 from app.schemas.feedback_schemas import (
     FeedbackCreate,
     FeedbackRead,
@@ -91,6 +92,7 @@ def delete_artwork_admin_route(artwork_id: UUID, db: Session = Depends(get_db)):
 @admin_router.patch("/update/artworks/{artwork_id}", response_model=ArtworkRead)
 def update_artwork(
     artwork_id: UUID,
+    background_tasks: BackgroundTasks,
     title: Optional[str] = Form(None),
     description: Optional[str] = Form(None),
     category: Optional[str] = Form(None),
@@ -98,6 +100,7 @@ def update_artwork(
     quantity: Optional[int] = Form(None),
     tags: Optional[list[str]] = Form(None),
     isSold: Optional[bool] = Form(None),
+    status: Optional[StatusENUM] = Form(None),
     files: Optional[List[UploadFile]] = File(None),
     db: Session = Depends(get_db)
 ):
@@ -106,17 +109,23 @@ def update_artwork(
         if isinstance(f, UploadFile) and f.filename and f.content_type != "application/octet-stream"
     ]
 
-    artwork_update = ArtworkUpdate(
+    # only the fields that were sent, so a partial PATCH leaves the others alone
+    fields = dict(
         title=title,
         description=description,
         category=category,
         price=price,
         quantity=quantity,
         tags=tags,
-        isSold=isSold
+        isSold=isSold,
+        status=status
     )
+    artwork_update = ArtworkAdminUpdate(**{k: v for k, v in fields.items() if v is not None})
 
-    return admin_crud.update_artwork(db=db, artwork_id=str(artwork_id), artwork_update=artwork_update, files=valid_files)
+    return admin_crud.update_artwork(
+        db=db, artwork_id=str(artwork_id), artwork_update=artwork_update,
+        files=valid_files, background_tasks=background_tasks
+    )
 
 
 @admin_router.get("/artworks/filter", response_model=List[ArtworkRead])
@@ -174,6 +183,56 @@ def list_follow_followers(db: Session = Depends(get_db)):
 def get_admin_audit_logs(db: Session = Depends(get_db)):
     return admin_crud.list_admin_logs(db)
 
+# -------------------------
+# ARTIST LEADERBOARD
+# -------------------------
+
+@admin_router.post("/leaderboard/rebuild")
+def rebuild_artist_leaderboard(db: Session = Depends(get_db)):
+    count = util_leaderboard.rebuild_leaderboard(db)
+    return {"message": "Leaderboard rebuilt", "artists": count}
+
+# -------------------------
+# CACHE
+# -------------------------
+
+@admin_router.get("/cache/stats")
+def get_cache_stats():
+    """This worker's in-process cache: size, hit rate, evictions."""
+    return util_cache.stats()
+
+# -------------------------
+# MODERATION
+# -------------------------
+
+@admin_router.post("/moderation/{queue_id}/approve")
+def approve_moderation_item(queue_id: str, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    return _review_moderation_item(db, queue_id, approved=True, background_tasks=background_tasks)
+
+@admin_router.post("/moderation/{queue_id}/reject")
+def reject_moderation_item(queue_id: str, db: Session = Depends(get_db)):
+    return _review_moderation_item(db, queue_id, approved=False)
+
+def _review_moderation_item(db: Session, queue_id: str, approved: bool, background_tasks: Optional[BackgroundTasks] = None):
+    # artworks go through the same hook as every other artwork write (indexes, caches,
+    # random pool and, once visible, the followers' timelines)
+    queued = db.query(ModerationQueue).filter_by(id=str(queue_id)).first()
+    artwork = None
+    if queued is not None and queued.table_name == "artworks":
+        artwork = db.get(Artwork, queued.content_id)
+    previous_status = artwork.status if artwork is not None else None
+
+    item = moderation_crud.review_content(db, queue_id, approved=approved)
+    if not item:
+        raise HTTPException(status_code=404, detail="Moderation item not found")
+    if artwork is not None:
+        util_artwork_hooks.artwork_saved(db, artwork, previous_status=previous_status, background_tasks=background_tasks)
+    return {
+        "message": "Content approved" if approved else "Content rejected",
+        "table_name": item.table_name,
+        "content_id": item.content_id,
+    }
+
 # -----------------------------
 # FEEDBACK 
 # -----------------------------
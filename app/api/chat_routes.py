@@ -181,60 +181,122 @@
 #     return chat_users
 
 # ------------------------- WebSocket & API -------------------------
-from fastapi import WebSocket, WebSocketDisconnect, APIRouter, Depends
-from typing import Dict, List
+from fastapi import WebSocket, WebSocketDisconnect, APIRouter, Depends, HTTPException, Query, Response
+from typing import List, Optional
+from uuid import UUID
 from app.crud.user_crud import get_user_by_username
-from app.crud.chat_crud import get_messages_between, create_message, mark_messages_as_read
-from app.database import get_db
+from app.crud.chat_crud import aget_messages_between, aget_chat_users, build_message_row
+from app.database import get_async_db, SessionLocal
+from app.models.models import User
 from app.schemas.chat_schemas import MessageCreate, MessageOut
-from app.core.auth import decode_access_token, get_current_user
+from app.core.auth import decode_access_token, get_current_user, get_current_user_id
+from app.core.chat_broker import chat_broker
+from app.core.chat_writer import chat_writer
+from app.util.util_cursor import decode_cursor
+from app.util import util_unread
 from sqlalchemy.orm import Session
-from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
 import traceback
 
 chat_router = APIRouter(tags=["Chat"])
-active_connections: Dict[str, WebSocket] = {}  # user_id -> WebSocket
 
 # -------------------------
 # Authenticate WebSocket user
 # -------------------------
-async def get_current_user_ws(websocket: WebSocket) -> tuple:
+def _load_ws_user(decoded: dict):
+    db: Session = SessionLocal()
+    try:
+        try:
+            user = db.query(User).filter(User.id == str(UUID(decoded["user_id"]))).first()
+        except ValueError:
+            user = None
+        if not user and decoded.get("username"):
+            user = get_user_by_username(db, decoded["username"])
+        return user
+    finally:
+        db.close()
+
+async def get_current_user_ws(websocket: WebSocket):
     token = websocket.query_params.get("token")
     if not token:
         await websocket.close(code=1008)
-        return None, None
+        return None
 
-    username = decode_access_token(token)
-    if not username:
+    decoded = decode_access_token(token)
+    if not decoded or not decoded.get("user_id"):
         await websocket.close(code=1008)
-        return None, None
+        return None
 
-    db: Session = next(get_db())
-    user = get_user_by_username(db, username)
+    user = await asyncio.to_thread(_load_ws_user, decoded)
     if not user:
         await websocket.close(code=1008)
-        return None, None
+        return None
 
-    return user, db
+    return user
+
+# -------------------------
+# Delivery once durable
+# -------------------------
+async def _safe_send(websocket: WebSocket, payload: dict):
+    try:
+        await websocket.send_json(payload)
+    except Exception:
+        pass  # sender disconnected while the write was in flight
+
+async def _deliver_message(websocket: WebSocket, future, client_id):
+    try:
+        row = await future
+    except Exception:
+        await _safe_send(websocket, {"error": "Failed to save message", "client_id": client_id})
+        return
+
+    payload = {
+        "action": "message",
+        "id": row["id"],
+        "sender_id": row["sender_id"],
+        "receiver_id": row["receiver_id"],
+        "content": row["content"],
+        "timestamp": row["timestamp"].isoformat()
+    }
+    # Routed to whichever worker(s) hold the receiver's sockets
+    await chat_broker.send_to_user(row["receiver_id"], payload)
+    await _safe_send(websocket, {"action": "ack", "id": row["id"], "client_id": client_id, "timestamp": payload["timestamp"]})
+
+async def _deliver_read(future, receiver_id: str, data: dict):
+    try:
+        await future
+    except Exception as e:
+        print(f"❌ Error marking messages as read: {e}")
+        return
+    await chat_broker.send_to_user(receiver_id, data)
 
 # -------------------------
 # WebSocket endpoint
 # -------------------------
 @chat_router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    user, db = await get_current_user_ws(websocket)
+    user = await get_current_user_ws(websocket)
     if not user:
         return
 
     await websocket.accept()
     user_id = str(user.id)
-    active_connections[user_id] = websocket
+    await chat_broker.register(user_id, websocket)
+    pending = set()  # delivery tasks waiting on a commit
     print(f"✅ WebSocket connected for user: {user.username} ({user_id})")
 
+    def track(coro):
+        task = asyncio.create_task(coro)
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+
     try:
         while True:
             try:
                 data = await websocket.receive_json()
+            except WebSocketDisconnect:
+                raise
             except Exception as e:
                 print("❌ Error receiving JSON:", e)
                 await websocket.send_json({"error": "Invalid JSON"})
@@ -254,43 +316,21 @@ async def websocket_endpoint(websocket: WebSocket):
                     await websocket.send_json({"error": "Invalid message format"})
                     continue
 
-                try:
-                    saved_msg = create_message(db, sender_id=user_id, msg=msg)
-                except Exception as e:
-                    print("❌ Error saving message:", e)
-                    traceback.print_exc()
-                    await websocket.send_json({"error": "Failed to save message"})
-                    continue
-
-                payload = {
-                    "action": "message",
-                    "sender_id": user_id,
-                    "receiver_id": msg.receiver_id,
-                    "content": saved_msg.content,
-                    "timestamp": saved_msg.timestamp.isoformat() if saved_msg.timestamp else datetime.utcnow().isoformat()
-                }
-
-                # Send to receiver if online
-                receiver_ws = active_connections.get(msg.receiver_id)
-                if receiver_ws:
-                    await receiver_ws.send_json(payload)
+                # queued for the next group commit; sender gets an "ack" once it is durable
+                future = await chat_writer.save_message(build_message_row(user_id, msg))
+                track(_deliver_message(websocket, future, data.get("client_id")))
 
             # -------------------------
             # TYPING / PRESENCE / PING / READ
             # -------------------------
             elif action in ["typing", "presence", "ping", "read"]:
                 receiver_id = data.get("receiver_id")
+                data["sender_id"] = user_id  # never trust the client for who sent it
                 if action == "read":
-                    try:
-                        mark_messages_as_read(db, sender_id=receiver_id, receiver_id=user_id)
-                    except Exception as e:
-                        print(f"❌ Error marking messages as read: {e}")
-                        traceback.print_exc()
-
-                # Broadcast to receiver if online
-                receiver_ws = active_connections.get(receiver_id)
-                if receiver_ws:
-                    await receiver_ws.send_json(data)
+                    future = await chat_writer.mark_read(sender_id=receiver_id, receiver_id=user_id)
+                    track(_deliver_read(future, receiver_id, data))
+                else:
+                    await chat_broker.send_to_user(receiver_id, data)
 
             else:
                 await websocket.send_json({"error": "Unknown action"})
@@ -299,30 +339,67 @@ async def websocket_endpoint(websocket: WebSocket):
         print(f"⚠️ User disconnected: {user_id}")
 
     finally:
-        active_connections.pop(user_id, None)
-        db.close()
+        await chat_broker.unregister(user_id, websocket)
         print(f"🧹 Cleaned up connection for user: {user_id}")
 
+# -------------------------
+# Presence endpoint
+# -------------------------
+@chat_router.get("/online/{user_id}")
+async def get_user_online(user_id: str, current_user=Depends(get_current_user)):
+    return {"userId": user_id, "online": await chat_broker.is_online(user_id)}
+
 # -------------------------
 # Chat history endpoint
 # -------------------------
 @chat_router.get("/history/{other_user_id}", response_model=List[MessageOut])
-def get_chat_history(
+async def get_chat_history(
     other_user_id: str,
-    current_user=Depends(get_current_user),
-    db: Session = Depends(get_db),
-    limit: int = 50
+    response: Response,
+    before: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    user_id: str = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
+    limit: int = Query(50, ge=1, le=200)
 ):
-    messages = get_messages_between(db, current_user.id, other_user_id, limit)
+    try:
+        before_key = decode_cursor(before) if before else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    messages, next_cursor = await aget_messages_between(db, user_id, other_user_id, limit, before=before_key)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return messages
 
 # -------------------------
 # Chat list endpoint
 # -------------------------
 @chat_router.get("/chatslist")
-def get_user_chat_list(
-    db: Session = Depends(get_db),
-    current_user=Depends(get_current_user)
+async def get_user_chat_list(
+    response: Response,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    limit: int = Query(30, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+    user_id: str = Depends(get_current_user_id)
 ):
-    from app.crud.chat_crud import get_chat_users
-    return get_chat_users(db, current_user.id)
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    chat_list, next_cursor = await aget_chat_users(db, user_id, cursor=after, limit=limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return chat_list
+
+# -------------------------
+# Unread badge endpoint
+# -------------------------
+@chat_router.get("/unread/total")
+def get_unread_total(user_id: str = Depends(get_current_user_id)):
+    """Polled by clients for the badge: token check + one Redis HGETALL, no MySQL."""
+    try:
+        return {"total": util_unread.get_total(user_id)}
+    except Exception as e:
+        print(f"❌ Unread total failed for {user_id}: {e}")
+        raise HTTPException(status_code=503, detail="Unread counts unavailable")
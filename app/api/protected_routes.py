@@ -1,15 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Request, Response
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from uuid import UUID
+import asyncio
 from app.models import models
 
 
-from app.database import get_db
-from app.core.auth import get_current_user
+from app.database import get_db, get_async_db, SessionLocal
+from app.core.auth import get_current_user, get_current_user_id
 from app.models.models import User, ArtistReview, CommunityType
 from app.schemas.user_schema import UserRead, UserUpdate, ProfileImageResponse, ChangePasswordSchema
-from app.schemas.artworks_schemas import ArtworkMe, ArtworkCreateResponse, ArtworkRead, ArtworkDelete, ArtworkCreate, ArtworkUpdate, ArtworkArtist, ArtworkMeResponse
+from app.schemas.artworks_schemas import ArtworkMe, ArtworkCreateResponse, ArtworkRead, ArtworkDelete, ArtworkCreate, ArtworkUpdate, ArtworkArtist, ArtworkMeResponse, ArtworkStateRequest, ArtworkState
 from app.schemas.likes_schemas import LikeCountResponse, HasLikedResponse
 from app.schemas.comment_schemas import CommentCreate
 from app.schemas.order_schemas import OrderCreate, OrderRead
@@ -18,13 +20,13 @@ from app.schemas.cart_schemas import CartCreatePublic, CartRead, CartCreate
 from app.schemas.review_schemas import ReviewCreate, ReviewRead
 from app.schemas.follow_schemas import FollowList, FollowStatus
 from app.schemas.artistreview_schemas import ArtistReviewRead, ArtistReviewCreate
-from app.util import util_artistrank
+from app.util import util_artistrank, util_feedcache
 
 from app.crud import (
     user_crud, artworks_crud, likes_crud, comment_crud,
     orders_crud, saved_crud, cart_crud, homefeed_crud,
     follow_crud, review_crud, artistreview_crud, community_crud,
-    community_members_crud
+    community_members_crud, viewer_state_crud
 )
 
 from app.schemas.community_schemas import (
@@ -54,6 +56,9 @@ user_router = APIRouter(
     dependencies=[Depends(get_current_user)]  # Dependency Injection
 )
 
+# routes that authenticate from the token alone (no per-request user lookup)
+feed_router = APIRouter(tags=["authorized"])
+
 # -------------------------
 # USER 
 # -------------------------
@@ -196,6 +201,15 @@ def update_profile_image(
 def read_my_artworks(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     return artworks_crud.get_artworks_by_me(db, user_id=current_user.id)
 
+@user_router.post("/artworks/state", response_model=List[ArtworkState])
+def artworks_viewer_state(
+    payload: ArtworkStateRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    state = viewer_state_crud.get_viewer_state(db, current_user.id, payload.artworkIds)
+    return [ArtworkState(artworkId=artwork_id, **flags) for artwork_id, flags in state.items()]
+
 @user_router.post("/change-password")
 def change_password(
     data: ChangePasswordSchema,
@@ -440,31 +454,53 @@ def is_following_check(user_id: str, current_user: User = Depends(get_current_us
 # def home_feed(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
 #     return homefeed_crud.get_home_feed(db, current_user)
 
-@user_router.get("/homefeed", response_model=List[ArtworkRead])
-def home_feed(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-
-    cart_ids = None
-    saved_ids = None
-    liked_ids = None
-
-    if current_user:
-        cart_items = db.query(models.Cart.artworkId).filter_by(userId=str(current_user.id)).all()
-        cart_ids = {str(item.artworkId) for item in cart_items}
+def _compute_home_feed(user_id: str, tag: Optional[str]):
+    """Cache miss: the full feed build is sync CRUD, so it runs in a worker thread on its own session."""
+    db = SessionLocal()
+    try:
+        current_user = db.get(User, user_id)
+        if not current_user:
+            raise HTTPException(status_code=401, detail="User not found")
+        artworks = homefeed_crud.get_home_feed(db, current_user)  # artist + images are eager-loaded
+        etag = util_feedcache.store(
+            user_id, tag, [str(art.id) for art in artworks], [art.like_count for art in artworks]
+        )
+        return artworks, etag
+    finally:
+        db.close()
 
-        saved_items = db.query(models.Saved.artworkId).filter_by(userId=str(current_user.id)).all()
-        saved_ids = {str(item.artworkId) for item in saved_items}
 
-        liked_items = db.query(models.ArtworkLike.artworkId).filter_by(userId=str(current_user.id)).all()
-        liked_ids = {str(item.artworkId) for item in liked_items}
+@feed_router.get("/homefeed", response_model=List[ArtworkRead])
+async def home_feed(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    user_id: str = Depends(get_current_user_id)
+):
+    # version tag + cached feed come from Redis only; an unchanged feed costs no DB work
+    tag, cached = await util_feedcache.aget_cached(user_id)
+    if cached and request.headers.get("if-none-match") == cached["etag"]:
+        return Response(status_code=304, headers={"ETag": cached["etag"]})
+
+    if cached:
+        artworks = await homefeed_crud.ahydrate_feed(db, cached["ids"], user_id)
+        etag = cached["etag"]
+    else:
+        artworks, etag = await asyncio.to_thread(_compute_home_feed, user_id, tag)
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
 
-    artworks = homefeed_crud.get_home_feed(db, current_user)
+    # liked / saved / in-cart flags for just this page, in one query
+    state = await viewer_state_crud.aget_viewer_state(db, user_id, [art.id for art in artworks])
 
     result = []
     for art in artworks:
-        like_count = len(art.likes) if art.likes else 0
-        is_in_cart = str(art.id) in cart_ids if cart_ids else None
-        is_saved = str(art.id) in saved_ids if saved_ids else None
-        is_like = str(art.id) in liked_ids if liked_ids else None
+        like_count = art.like_count
+        flags = state.get(str(art.id), {})
+        is_in_cart = flags.get("isInCart")
+        is_saved = flags.get("isSaved")
+        is_like = flags.get("isLike")
 
         result.append(
             ArtworkRead(
@@ -1,33 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Form, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Form, UploadFile, File, Response
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from sqlalchemy.orm import Session, subqueryload
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from uuid import UUID
 from datetime import timedelta, datetime
 
-from app.database import get_db
+from app.database import get_db, get_async_db
 from app.core import auth
-from app.core.auth import get_current_user_optional
+from app.core.auth import get_current_user_optional, get_current_user_id_optional
 from app.models import models
 from app.models.models import User
 
 from app.schemas.user_schema import UserCreate, UserRead, UserSearch, Token, ResetPasswordWithOTPSchema, UserAuthResponse, UserPublic
-from app.schemas.artworks_schemas import ArtworkRead, ArtworkCategory, ArtworkArtist
+from app.schemas.artworks_schemas import ArtworkRead, ArtworkCategory, ArtworkArtist, likeArt
 from app.schemas.review_schemas import ReviewRead
 from app.schemas.likes_schemas import LikeCountResponse
 from app.schemas.comment_schemas import CommentRead
-from app.schemas.artistreview_schemas import ArtistReviewRead, ArtistRatingSummary
+from app.schemas.artistreview_schemas import ArtistReviewRead, ArtistRatingSummary, ArtistLeaderboardPosition
 from app.schemas.saved_schemas import SavedRead
 from app.schemas.error_response_schemas import standard_responses
 
 from app.core.smtp_otp import send_otp_email
 from fastapi import BackgroundTasks
-from app.crud import user_crud, search_crud, artworks_crud, recmmendation_crud,review_crud, likes_crud, comment_crud, artistreview_crud, googleauth_crud, saved_crud, community_crud
+from app.crud import user_crud, search_crud, artworks_crud, recmmendation_crud,review_crud, likes_crud, comment_crud, artistreview_crud, googleauth_crud, saved_crud, community_crud, viewer_state_crud
 from passlib.context import CryptContext
 from app.util import util
 from app.core.redis_client import get_redis_client
 import json
-from app.util import util_cache
+from app.util import util_leaderboard, util_likecount
+from app.util.util_cursor import decode_cursor
 
 from app.schemas.community_schemas import (
     CommunityCreate,
@@ -223,7 +225,7 @@ def register_user(
 def read_user(
     user_id: str,  # can be UUID or username
     db: Session = Depends(get_db),
-    current_user: Optional[models.User] = Depends(get_current_user_optional)
+    viewer_id: Optional[str] = Depends(get_current_user_id_optional)
 ):
     # Try to interpret `user_id` as UUID
     from uuid import UUID
@@ -231,12 +233,12 @@ def read_user(
     user = None
     try:
         user_uuid = UUID(user_id)
-        user = user_crud.get_user(db, user_uuid, current_user)
+        user = user_crud.get_user(db, user_uuid, viewer_id)
     except ValueError:
         # If not a UUID, search by username
-        user_obj = db.query(models.User).filter(models.User.username == user_id).first()
-        if user_obj:
-            user = user_crud.get_user(db, user_obj.id, current_user)
+        row = user_crud.get_user_id_by_username(db, user_id)
+        if row:
+            user = user_crud.get_user(db, row["id"], viewer_id)
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -269,13 +271,23 @@ def reset_password(data: ResetPasswordWithOTPSchema, db: Session = Depends(get_d
 # -------------------------
 
 @router.get("/search/artworks", response_model=List[ArtworkRead])
-def search_artworks(query: str = Query(..., min_length=2), db: Session = Depends(get_db)):
-    return search_crud.search_artworks(db, query)
+def search_artworks(
+    query: str = Query(..., min_length=2),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    return search_crud.search_artworks(db, query, skip=skip, limit=limit)
 
 
 @router.get("/search/user", response_model=List[UserSearch])
-def search_users(query: str = Query(..., min_length=2), db: Session = Depends(get_db)):
-    return search_crud.search_users(db, query)
+def search_users(
+    query: str = Query(..., min_length=2),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    return search_crud.search_users(db, query, skip=skip, limit=limit)
 
 
 @router.get("/artworks/category/{category}", response_model=List[ArtworkCategory])
@@ -359,23 +371,30 @@ def get_artworks_with_filters(
 
 @router.get("/artworks", response_model=List[ArtworkRead])
 def list_artworks_route(
+    response: Response,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    limit: int = Query(20, ge=1, le=100),
+    category: Optional[str] = None,
+    forSale: Optional[bool] = None,
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user_optional)
 ):
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
-    artworks = (
-        db.query(models.Artwork)
-        .options(
-            subqueryload(models.Artwork.artist),
-            subqueryload(models.Artwork.likes),
-            subqueryload(models.Artwork.images)
-        )
-        .order_by(models.Artwork.createdAt.desc())  # ⬅️ most recent first
-        .all()
+    artworks, next_cursor = artworks_crud.list_artworks_page(
+        db, cursor=after, limit=limit, category=category, for_sale=forSale
     )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    state = viewer_state_crud.get_viewer_state(db, current_user.id if current_user else None, [art.id for art in artworks])
 
     result = []
     for art in artworks:
+        flags = state.get(art.id, {})
         result.append(
             ArtworkRead(
                 id=art.id,
@@ -396,6 +415,10 @@ def list_artworks_route(
                     username=art.artist.username,
                     profileImage=art.artist.profileImage
                 ),
+                how_many_like=likeArt(like_count=art.like_count),
+                isInCart=flags.get("isInCart"),
+                isSaved=flags.get("isSaved"),
+                isLike=flags.get("isLike"),
             )
         )
     return result
@@ -438,59 +461,26 @@ def list_artworks_route(
 #______________________________________________________________________________________
 
 @router.get("/artworks/{artwork_id}", response_model=ArtworkRead)
-def get_artwork_route(artwork_id: UUID, db: Session = Depends(get_db), user=Depends(get_current_user_optional)):
-    db_artwork = artworks_crud.get_artwork(db, artwork_id)
-    if not db_artwork:
+async def get_artwork_route(
+    artwork_id: UUID,
+    db: AsyncSession = Depends(get_async_db),
+    user_id: Optional[str] = Depends(get_current_user_id_optional)
+):
+    # cached detail + like counter from Redis: a guest view never touches MySQL
+    artwork = await artworks_crud.aget_artwork_detail(db, artwork_id)
+    if not artwork:
         raise HTTPException(status_code=404, detail="Artwork not found")
 
-    like_count = len(db_artwork.likes) if db_artwork.likes else 0
-    is_in_cart: Optional[bool] = None
-    is_saved: Optional[bool] = None
-    is_like: Optional[bool] = None
+    artwork.how_many_like = likeArt(like_count=await util_likecount.aget_count(db, str(artwork.id)))
 
-    if user:
-        # Check if in cart
-        cart_item = db.query(models.Cart).filter(
-            models.Cart.userId == user.id, models.Cart.artworkId == db_artwork.id
-        ).first()
-        is_in_cart = bool(cart_item)
+    if user_id:
+        # cart / saved / liked in one round trip
+        flags = (await viewer_state_crud.aget_viewer_state(db, user_id, [str(artwork.id)]))[str(artwork.id)]
+        artwork.isInCart = flags["isInCart"]
+        artwork.isSaved = flags["isSaved"]
+        artwork.isLike = flags["isLike"]
 
-        # Check if saved
-        saved_item = db.query(models.Saved).filter(
-            models.Saved.userId == user.id, models.Saved.artworkId == db_artwork.id
-        ).first()
-        is_saved = bool(saved_item)
-
-        # ✅ Check if liked
-        liked_item = db.query(models.ArtworkLike).filter(
-            models.ArtworkLike.userId == user.id, models.ArtworkLike.artworkId == db_artwork.id
-        ).first()
-        is_like = bool(liked_item)
-
-    return ArtworkRead(
-        id=db_artwork.id,
-        title=db_artwork.title,
-        description=db_artwork.description,
-        category=db_artwork.category,
-        price=db_artwork.price,
-        tags=db_artwork.tags,
-        quantity=db_artwork.quantity,
-        isSold=db_artwork.isSold,
-        images=db_artwork.images,
-        createdAt=db_artwork.createdAt,
-        artistId=db_artwork.artistId,
-        artist=ArtworkArtist(
-            id=db_artwork.artist.id,
-            username=db_artwork.artist.username,
-            profileImage=db_artwork.artist.profileImage
-        ),
-        how_many_like={"like_count": like_count},
-        isInCart=is_in_cart,
-        isSaved=is_saved,
-        isLike=is_like,
-        forSale=db_artwork.forSale,
-        status=db_artwork.status
-    )
+    return artwork
 
 
 @router.get("/{user_id}/artworks", response_model=List[ArtworkRead])
@@ -518,35 +508,29 @@ def get_reviews_for_artwork(artwork_id: UUID, db: Session = Depends(get_db)):
 #     return artistreview_crud.list_artists_by_rating(db)
 
 @router.get("/artists/top", response_model=list[ArtistRatingSummary])
-async def get_top_artists(db: Session = Depends(get_db)):
+def get_top_artists(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db)
+):
     """
-    Get all artists sorted by rating.
-    Cached in Redis until midnight.
+    Get artists sorted by weighted rating.
+    Served from the live Redis leaderboard (updated on every artist review).
     """
-    cache_key = "artists:top"
-
-    # 1️⃣ Try Redis cache first
-    cached_data = await util_cache.get_cache(cache_key)
-    if cached_data:
-        print("🎯 Cache hit for artists:top")
-        return cached_data
-
-    # 2️⃣ Cache miss — query database
-    print("💾 Cache miss for artists:top — querying DB")
-    data = artistreview_crud.list_artists_by_rating(db)
-
-    # 3️⃣ Convert ORM objects → dicts (for JSON serialization)
-    serialized = [
-        d.dict() if hasattr(d, "dict") else
-        d.__dict__ if hasattr(d, "__dict__") else dict(d)
-        for d in data
-    ]
+    try:
+        return util_leaderboard.get_top_artists(db, skip=skip, limit=limit)
+    except Exception as e:
+        # Redis unavailable — fall back to the materialized stats table
+        print(f"⚠️ Leaderboard unavailable, reading from DB: {e}")
+        return artistreview_crud.list_artists_by_rating(db)[skip:skip + limit]
 
-    # 4️⃣ Cache until midnight
-    await util_cache.set_cache_until_midnight(cache_key, serialized)
-    print("✅ Cached artists:top until midnight")
 
-    return serialized
+@router.get("/artists/{artist_id}/rank", response_model=ArtistLeaderboardPosition)
+def get_artist_leaderboard_position(artist_id: UUID, db: Session = Depends(get_db)):
+    position = util_leaderboard.get_artist_position(db, str(artist_id))
+    if not position:
+        raise HTTPException(status_code=404, detail="Artist not found")
+    return position
 
 # -------------------------
 # RECOMMENDATION
@@ -556,13 +540,18 @@ async def get_top_artists(db: Session = Depends(get_db)):
 def get_artwork_recommendations(
     artwork_id: UUID,
     limit: int = 10,
+    mode: str = Query("tags", pattern="^(tags|visual)$"),
     db: Session = Depends(get_db)
 ):
     """
-    Get recommended artworks based on the title, category, and tags of the given artwork ID.
+    Get recommended artworks based on the title, category, and tags of the given artwork ID,
+    or on how its images look (mode=visual).
     Always returns up to 'limit' artworks.
     """
-    recommended = recmmendation_crud.recommend_artworks(db, artwork_id, limit=limit)
+    if mode == "visual":
+        recommended = recmmendation_crud.recommend_visual(db, artwork_id, limit=limit)
+    else:
+        recommended = recmmendation_crud.recommend_artworks(db, artwork_id, limit=limit)
     # Convert to Pydantic models
     return [ArtworkRead.model_validate(art) for art in recommended]
 
@@ -680,16 +669,17 @@ def resolve_user_by_id(
     user_id: str,
     db: Session = Depends(get_db),
 ):
-    user = db.query(models.User).filter(
-        models.User.id == user_id
-    ).first()
+    try:
+        user = user_crud.get_username_by_id(db, str(UUID(user_id)))
+    except ValueError:
+        user = None
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
     return {
-        "user_id": user.id,
-        "username": user.username,
+        "user_id": user["id"],
+        "username": user["username"],
     }
 
 # -----------------------------
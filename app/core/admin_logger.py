@@ -1,44 +1,197 @@
-from starlette.middleware.base import BaseHTTPMiddleware
-from fastapi import Request
-from sqlalchemy.orm import Session
+import asyncio
 from datetime import datetime
+from typing import Optional
+from sqlalchemy import insert
 from app.database import SessionLocal
-from app.models.models import AdminAuditLog, User, RoleEnum
-from app.core.auth import decode_access_token
+from app.models.models import AdminAuditLog
 
+# from starlette.middleware.base import BaseHTTPMiddleware
+# from fastapi import Request
+# from sqlalchemy.orm import Session
+# from app.models.models import User, RoleEnum
+# from app.core.auth import decode_access_token
 
-class AdminLoggerMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        path = request.url.path
-        method = request.method
 
-        # Only log /admin routes
-        if path.startswith("/api/admin"):
-            db: Session = SessionLocal()
+# class AdminLoggerMiddleware(BaseHTTPMiddleware):
+#     async def dispatch(self, request: Request, call_next):
+#         path = request.url.path
+#         method = request.method
+
+#         # Only log /admin routes
+#         if path.startswith("/api/admin"):
+#             db: Session = SessionLocal()
+#             try:
+#                 token = request.headers.get("Authorization")
+#                 if token and token.startswith("Bearer "):
+#                     token = token.split(" ")[1]
+#                     decoded = decode_access_token(token)
+
+#                     if decoded and decoded.get("username"):
+#                         user = db.query(User).filter(User.username == decoded["username"]).first()
+#                         if user and user.role == RoleEnum.admin:
+#                             log = AdminAuditLog(
+#                                 admin_id=user.id,
+#                                 method=method,
+#                                 path=path,
+#                                 action=f"{method} {path}",
+#                                 description=f"Admin {user.username} called {method} {path}",
+#                                 ip_address=request.headers.get("x-forwarded-for", request.client.host),
+#                                 timestamp=datetime.utcnow()
+#                             )
+#                             db.add(log)
+#                             db.commit()
+#             except Exception as e:
+#                 print(f"[AdminLoggerMiddleware] Error: {e}")
+#             finally:
+#                 db.close()
+
+#         response = await call_next(request)
+#         return response
+
+# -------------------------
+# ADMIN AUDIT LOG
+# -------------------------
+# AdminAuditMiddleware is plain ASGI: requests outside ADMIN_PREFIX go straight through.
+# For admin requests it does no auth or DB work of its own. get_current_admin has already
+# verified the caller and left {"id", "username"} in request.state under STATE_KEY. Once the
+# handler is done, the middleware queues one audit row. AuditLogWriter bulk-inserts the queue
+# in batches from a background task.
+
+ADMIN_PREFIX = "/api/admin"
+STATE_KEY = "audit_admin"  # request.state attribute set by get_current_admin
+MAX_QUEUE = 10000          # bounded: admin requests wait (backpressure) when the DB falls behind
+MAX_BATCH = 500
+LINGER = 0.5               # seconds to wait for more rows before flushing a partial batch
+
+
+class AuditLogWriter:
+    def __init__(self, session_factory=SessionLocal, max_queue: int = MAX_QUEUE,
+                 max_batch: int = MAX_BATCH, linger: float = LINGER):
+        self.session_factory = session_factory
+        self.max_queue = max_queue
+        self.max_batch = max_batch
+        self.linger = linger
+        self.queue = None
+        self._task = None
+
+    # ----------------------------
+    # Lifecycle
+    # ----------------------------
+    async def start(self):
+        self.queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run())
+        print("✅ Admin audit writer started")
+
+    async def stop(self):
+        """Flush everything already queued, then stop."""
+        if not self._task:
+            return
+        await self.queue.put(None)
+        await self._task
+        self._task = None
+        print("🛑 Admin audit writer stopped")
+
+    # ----------------------------
+    # Producer
+    # ----------------------------
+    async def record(self, row: dict):
+        if self._task is None:  # not started (e.g. app run without its lifespan): write directly
+            await asyncio.to_thread(self._flush, [row])
+            return
+        await self.queue.put(row)
+
+    # ----------------------------
+    # Consumer
+    # ----------------------------
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            row = await self.queue.get()
+            if row is None:
+                break
+            batch = [row]
+            deadline = loop.time() + self.linger
+            while len(batch) < self.max_batch:
+                try:
+                    row = self.queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        row = await asyncio.wait_for(self.queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if row is None:
+                    stopping = True
+                    break
+                batch.append(row)
+            await asyncio.to_thread(self._flush, batch)
+
+    def _flush(self, rows: list):
+        """Runs in a worker thread: one multi-row INSERT, row by row if that fails."""
+        db = self.session_factory()
+        try:
             try:
-                token = request.headers.get("Authorization")
-                if token and token.startswith("Bearer "):
-                    token = token.split(" ")[1]
-                    decoded = decode_access_token(token)
-
-                    if decoded and decoded.get("username"):
-                        user = db.query(User).filter(User.username == decoded["username"]).first()
-                        if user and user.role == RoleEnum.admin:
-                            log = AdminAuditLog(
-                                admin_id=user.id,
-                                method=method,
-                                path=path,
-                                action=f"{method} {path}",
-                                description=f"Admin {user.username} called {method} {path}",
-                                ip_address=request.headers.get("x-forwarded-for", request.client.host),
-                                timestamp=datetime.utcnow()
-                            )
-                            db.add(log)
-                            db.commit()
+                db.execute(insert(AdminAuditLog), rows)
+                db.commit()
+                return
             except Exception as e:
-                print(f"[AdminLoggerMiddleware] Error: {e}")
-            finally:
-                db.close()
+                db.rollback()
+                if len(rows) == 1:
+                    print(f"[AdminAuditMiddleware] Error: {e}")
+                    return
+                print(f"⚠️ Admin audit batch of {len(rows)} failed, retrying one by one: {e}")
+
+            for row in rows:
+                try:
+                    db.execute(insert(AdminAuditLog), [row])
+                    db.commit()
+                except Exception as e:
+                    db.rollback()
+                    print(f"[AdminAuditMiddleware] Error: {e}")
+        finally:
+            db.close()
+
+
+audit_writer = AuditLogWriter()
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class AdminAuditMiddleware:
+    def __init__(self, app, prefix: str = ADMIN_PREFIX, writer: AuditLogWriter = audit_writer):
+        self.app = app
+        self.prefix = prefix
+        self.writer = writer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
 
-        response = await call_next(request)
-        return response
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admin = (scope.get("state") or {}).get(STATE_KEY)
+            if admin is not None:  # only set once get_current_admin accepted the caller
+                method, path = scope["method"], scope["path"]
+                client = scope.get("client")
+                try:
+                    await self.writer.record({
+                        "admin_id": admin["id"],
+                        "method": method,
+                        "path": path,
+                        "action": f"{method} {path}",
+                        "description": f"Admin {admin['username']} called {method} {path}",
+                        "ip_address": _header(scope, b"x-forwarded-for") or (client[0] if client else None),
+                        "timestamp": datetime.utcnow(),
+                    })
+                except Exception as e:
+                    print(f"[AdminAuditMiddleware] Error: {e}")
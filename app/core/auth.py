@@ -2,7 +2,7 @@ from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from uuid import UUID
@@ -110,6 +110,39 @@ def get_current_user(
     return user
 
 
+# -------------------------------------------------------------------------
+# AUTH: USER ID ONLY (no DB lookup)
+# -------------------------------------------------------------------------
+
+def get_current_user_id(token: Optional[str] = Depends(oauth2_scheme)) -> str:
+    """For hot polling endpoints: trusts the signed token and never touches the DB."""
+    if not token:
+        raise HTTPException(
+            status_code=401,
+            detail="Authentication required",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    decoded = decode_access_token(token)
+    if not decoded or not decoded.get("user_id"):
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid or expired token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return str(decoded["user_id"])
+
+
+def get_current_user_id_optional(token: Optional[str] = Depends(oauth2_scheme)) -> Optional[str]:
+    """get_current_user_id for public endpoints: None for guests and invalid tokens."""
+    if not token:
+        return None
+    decoded = decode_access_token(token)
+    if not decoded or not decoded.get("user_id"):
+        return None
+    return str(decoded["user_id"])
+
+
 # -------------------------------------------------------------------------
 # AUTH: OPTIONAL USER (no errors)
 # -------------------------------------------------------------------------
@@ -134,6 +167,7 @@ def get_current_user_optional(
 # -------------------------------------------------------------------------
 
 def get_current_admin(
+    request: Request,
     token: Optional[str] = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
 ) -> User:
@@ -160,4 +194,6 @@ def get_current_admin(
     if user.role != RoleEnum.admin:
         raise HTTPException(status_code=403, detail="Admin access required")
 
+    # picked up by AdminAuditMiddleware (plain values: the session is closed by then)
+    request.state.audit_admin = {"id": str(user.id), "username": user.username}
     return user
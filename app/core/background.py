@@ -0,0 +1,51 @@
+import asyncio
+from app.core.redis_client import get_sync_redis
+
+# -------------------------
+# BACKGROUND JOBS
+# -------------------------
+# Periodic maintenance jobs run inside the API process, started from the app
+# lifespan. Jobs are plain sync functions and run in a worker thread so they
+# never block the event loop.
+
+_tasks = []
+
+
+def start_periodic(name: str, interval: float, func, *args, run_at_start: bool = True):
+    """Run func(*args) every `interval` seconds until stop_all(). Errors are logged, never raised."""
+    async def runner():
+        if not run_at_start:
+            await asyncio.sleep(interval)
+        while True:
+            try:
+                await asyncio.to_thread(func, *args)
+            except Exception as e:
+                print(f"❌ Background job {name} failed: {e}")
+            await asyncio.sleep(interval)
+
+    _tasks.append(asyncio.create_task(runner(), name=name))
+    print(f"⏱️ Background job {name} scheduled every {interval}s")
+
+
+def start_task(name: str, coro):
+    """Run a long-lived coroutine (e.g. a pub/sub listener) until stop_all()."""
+    _tasks.append(asyncio.create_task(coro, name=name))
+
+
+async def stop_all():
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
+
+
+def acquire_job_lock(name: str, ttl: int) -> bool:
+    """
+    Every worker schedules the same jobs; this lets only one of them run a job per `ttl` seconds.
+    The lock is left to expire rather than released, which also spaces the runs out.
+    """
+    try:
+        return bool(get_sync_redis().set(f"job:lock:{name}", "1", nx=True, ex=ttl))
+    except Exception as e:
+        print(f"⚠️ Could not take job lock {name}: {e}")
+        return False
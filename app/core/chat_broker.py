@@ -0,0 +1,178 @@
+import asyncio
+import json
+import time
+import uuid
+from typing import Dict, Set
+from fastapi import WebSocket
+from app.core.redis_client import get_redis_client
+
+# -------------------------
+# CHAT BROKER (cross-worker fan-out)
+# -------------------------
+# Every worker keeps only its own sockets. Events for a user are PUBLISHed to
+# chat:user:{user_id}; the worker(s) holding that user's sockets are subscribed
+# to the channel and deliver locally. Presence lives in Redis so any worker can
+# answer "is this user online".
+
+USER_CHANNEL = "chat:user:{}"
+NODE_CHANNEL = "chat:node:{}"
+PRESENCE_KEY = "chat:online:{}"     # hash: node_id -> last heartbeat (epoch seconds)
+PRESENCE_TTL = 90                   # seconds; entries of a crashed worker go stale on their own
+HEARTBEAT_INTERVAL = 30
+
+
+class ChatBroker:
+    def __init__(self):
+        self.node_id = uuid.uuid4().hex
+        self.connections: Dict[str, Set[WebSocket]] = {}  # user_id -> sockets on this worker
+        self.redis_client = get_redis_client()
+        self.pubsub = None
+        self._tasks = []
+
+    # ----------------------------
+    # Lifecycle
+    # ----------------------------
+    async def start(self):
+        await self.redis_client.connect()
+        self.pubsub = self.redis_client.redis.pubsub(ignore_subscribe_messages=True)
+        # node channel keeps the pubsub connection open even with no users connected
+        try:
+            await self.pubsub.subscribe(NODE_CHANNEL.format(self.node_id))
+        except Exception as e:
+            # Redis down: start anyway; _listen keeps resubscribing and delivery stays local until then
+            print(f"⚠️ Chat broker subscribe failed, retrying in the background: {e}")
+        self._tasks = [
+            asyncio.create_task(self._listen()),
+            asyncio.create_task(self._heartbeat()),
+        ]
+        print(f"✅ Chat broker started on node {self.node_id}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        for user_id in list(self.connections):
+            await self._clear_presence(user_id)
+        if self.pubsub:
+            await self.pubsub.aclose()
+            self.pubsub = None
+        await self.redis_client.close()
+        print("🛑 Chat broker stopped")
+
+    # ----------------------------
+    # Connection registry
+    # ----------------------------
+    async def register(self, user_id: str, websocket: WebSocket):
+        sockets = self.connections.setdefault(user_id, set())
+        first = not sockets
+        sockets.add(websocket)
+        try:
+            if first and self.pubsub:
+                await self.pubsub.subscribe(USER_CHANNEL.format(user_id))
+            redis = self.redis_client.redis
+            if redis:
+                key = PRESENCE_KEY.format(user_id)
+                pipe = redis.pipeline()
+                pipe.hset(key, self.node_id, int(time.time()))
+                pipe.expire(key, PRESENCE_TTL)
+                await pipe.execute()
+        except Exception as e:
+            print(f"⚠️ Chat broker register failed for {user_id}: {e}")
+
+    async def unregister(self, user_id: str, websocket: WebSocket):
+        sockets = self.connections.get(user_id)
+        if sockets is None:
+            return
+        sockets.discard(websocket)
+        if sockets:
+            return
+        self.connections.pop(user_id, None)
+        try:
+            if self.pubsub:
+                await self.pubsub.unsubscribe(USER_CHANNEL.format(user_id))
+                if user_id in self.connections:
+                    # reconnected while we were unsubscribing
+                    await self.pubsub.subscribe(USER_CHANNEL.format(user_id))
+                    return
+            await self._clear_presence(user_id)
+        except Exception as e:
+            print(f"⚠️ Chat broker unregister failed for {user_id}: {e}")
+
+    async def _clear_presence(self, user_id: str):
+        if self.redis_client.redis:
+            await self.redis_client.redis.hdel(PRESENCE_KEY.format(user_id), self.node_id)
+
+    async def is_online(self, user_id: str) -> bool:
+        if user_id in self.connections:
+            return True
+        try:
+            beats = await self.redis_client.redis.hvals(PRESENCE_KEY.format(user_id))
+        except Exception:
+            return False
+        now = time.time()
+        return any(now - int(beat) < PRESENCE_TTL for beat in beats)
+
+    # ----------------------------
+    # Delivery
+    # ----------------------------
+    async def send_to_user(self, user_id: str, payload: dict):
+        """Deliver an event to every socket of `user_id`, whichever worker holds them."""
+        if not user_id:
+            return
+        try:
+            await self.redis_client.redis.publish(USER_CHANNEL.format(user_id), json.dumps(payload, default=str))
+        except Exception as e:
+            # Redis down: best effort on this worker only
+            print(f"⚠️ Chat publish failed, delivering locally: {e}")
+            await self._deliver_local(user_id, payload)
+
+    async def _deliver_local(self, user_id: str, payload: dict):
+        for websocket in list(self.connections.get(user_id, ())):
+            try:
+                await websocket.send_json(payload)
+            except Exception:
+                await self.unregister(user_id, websocket)
+
+    async def _listen(self):
+        prefix = USER_CHANNEL.format("")
+        while True:
+            try:
+                message = await self.pubsub.get_message(timeout=1.0)
+                if not message or message["type"] != "message":
+                    continue
+                channel = message["channel"]
+                if channel.startswith(prefix):
+                    await self._deliver_local(channel[len(prefix):], json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Chat broker listener error: {e}")
+                await asyncio.sleep(1)
+                await self._resubscribe()
+
+    async def _resubscribe(self):
+        try:
+            channels = [USER_CHANNEL.format(u) for u in self.connections]
+            await self.pubsub.subscribe(NODE_CHANNEL.format(self.node_id), *channels)
+        except Exception as e:
+            print(f"⚠️ Chat broker resubscribe failed: {e}")
+
+    async def _heartbeat(self):
+        """Keep presence of this worker's users alive; entries of dead workers expire."""
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            try:
+                pipe = self.redis_client.redis.pipeline()
+                now = int(time.time())
+                for user_id in self.connections:
+                    key = PRESENCE_KEY.format(user_id)
+                    pipe.hset(key, self.node_id, now)
+                    pipe.expire(key, PRESENCE_TTL)
+                await pipe.execute()
+            except Exception as e:
+                print(f"⚠️ Chat presence heartbeat failed: {e}")
+
+
+chat_broker = ChatBroker()
@@ -0,0 +1,127 @@
+import asyncio
+import traceback
+from app.crud import chat_crud
+from app.database import SessionLocal
+
+# -------------------------
+# CHAT WRITER (write-behind queue)
+# -------------------------
+# WebSocket handlers never touch the DB on the event loop. They enqueue writes
+# here and await a future; a single background task drains the queue in
+# micro-batches and group-commits each batch in a worker thread. The future
+# resolves only once the batch is committed, so an ack means "durable".
+
+MAX_QUEUE = 10000      # bounded: producers wait (backpressure) when the DB falls behind
+MAX_BATCH = 256
+LINGER = 0.005         # seconds to wait for more writes before flushing a partial batch
+
+
+class ChatWriter:
+    def __init__(self, session_factory=SessionLocal, max_queue: int = MAX_QUEUE,
+                 max_batch: int = MAX_BATCH, linger: float = LINGER):
+        self.session_factory = session_factory
+        self.max_queue = max_queue
+        self.max_batch = max_batch
+        self.linger = linger
+        self.queue = None
+        self._task = None
+
+    # ----------------------------
+    # Lifecycle
+    # ----------------------------
+    async def start(self):
+        self.queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run())
+        print("✅ Chat writer started")
+
+    async def stop(self):
+        """Flush everything already queued, then stop."""
+        if not self._task:
+            return
+        await self.queue.put(None)
+        await self._task
+        self._task = None
+        print("🛑 Chat writer stopped")
+
+    # ----------------------------
+    # Producers
+    # ----------------------------
+    async def _submit(self, kind: str, value):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((kind, value, future))
+        return future
+
+    async def save_message(self, row: dict):
+        """Queue a message row (see chat_crud.build_message_row); returns a future set on commit."""
+        return await self._submit("message", row)
+
+    async def mark_read(self, sender_id: str, receiver_id: str):
+        return await self._submit("read", (sender_id, receiver_id))
+
+    # ----------------------------
+    # Consumer
+    # ----------------------------
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self.queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + self.linger
+            while len(batch) < self.max_batch:
+                try:
+                    item = self.queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self.queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            results = await asyncio.to_thread(self._flush, [(kind, value) for kind, value, _ in batch])
+            for (_, value, future), error in zip(batch, results):
+                if future.done():
+                    continue
+                if error is None:
+                    future.set_result(value)
+                else:
+                    future.set_exception(error)
+
+    def _flush(self, ops: list) -> list:
+        """Runs in a worker thread. Returns one error (or None) per op."""
+        db = self.session_factory()
+        try:
+            try:
+                chat_crud.persist_chat_batch(db, ops)
+                return [None] * len(ops)
+            except Exception as e:
+                db.rollback()
+                if len(ops) == 1:
+                    print(f"❌ Chat write failed: {e}")
+                    return [e]
+                print(f"⚠️ Chat batch of {len(ops)} failed, retrying one by one: {e}")
+
+            # isolate the bad write(s) so one row can't fail the whole batch
+            errors = []
+            for op in ops:
+                try:
+                    chat_crud.persist_chat_batch(db, [op])
+                    errors.append(None)
+                except Exception as e:
+                    db.rollback()
+                    traceback.print_exc()
+                    errors.append(e)
+            return errors
+        finally:
+            db.close()
+
+
+chat_writer = ChatWriter()
@@ -0,0 +1,172 @@
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Iterable
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from app.models.models import MediaJob, MediaJobStatusEnum
+from app.core import media_storage
+from app.core.background import acquire_job_lock
+
+# -------------------------
+# MEDIA JOB QUEUE
+# -------------------------
+# Durable queue (media_jobs table) for remote media work that must not slow the request down:
+# destroying replaced/deleted images and orphans left behind by failed writes.
+#
+# Request path: enqueue_destroy(db, ...) in the same transaction as the DB change (so a rolled
+# back change never deletes its media), or destroy_later(...) when there is no transaction.
+# Worker: drain() claims due jobs with a lease (crashed workers' jobs are picked up again once
+# the lease runs out), runs them against media_storage and deletes them on success. Failures are
+# retried with exponential backoff; after MAX_ATTEMPTS a job is left "dead" for inspection.
+#
+# Run a dedicated worker with `python -m app.core.media_jobs`; the API process also drains the
+# queue every DRAIN_INTERVAL seconds as a fallback.
+
+BATCH_SIZE = 50
+LEASE = timedelta(minutes=5)
+BACKOFF_BASE = 30        # seconds, doubled after every failed attempt
+BACKOFF_MAX = 3600       # seconds
+MAX_ATTEMPTS = 8
+DRAIN_INTERVAL = 30      # seconds
+POLL_INTERVAL = 5        # seconds, dedicated worker when the queue is empty
+
+
+def enqueue_destroy(db: Session, public_ids: Iterable[str]):
+    """Queue deletion of stored media; committed by the caller together with its own change."""
+    for public_id in public_ids:
+        if public_id:
+            db.add(MediaJob(action="destroy", public_id=public_id))
+
+
+def destroy_later(public_ids: Iterable[str]):
+    """enqueue_destroy in its own transaction (e.g. orphans after a failed write)."""
+    from app.database import SessionLocal
+
+    public_ids = [p for p in public_ids if p]
+    if not public_ids:
+        return
+    db: Session = SessionLocal()
+    try:
+        enqueue_destroy(db, public_ids)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"⚠️ Could not queue media cleanup for {public_ids}: {e}")
+    finally:
+        db.close()
+
+
+def _backoff(attempts: int) -> timedelta:
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def _claim(db: Session, limit: int) -> list:
+    """Take a lease on up to `limit` due jobs (pending, or running with an expired lease)."""
+    now = datetime.utcnow()
+    jobs = (
+        db.query(MediaJob)
+        .filter(or_(MediaJob.status == MediaJobStatusEnum.pending.value,
+                    MediaJob.status == MediaJobStatusEnum.running.value),
+                MediaJob.run_after <= now)
+        .order_by(MediaJob.run_after)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    for job in jobs:
+        job.status = MediaJobStatusEnum.running.value
+        job.run_after = now + LEASE
+        job.attempts += 1
+    db.commit()
+    return jobs
+
+
+def _run(job: MediaJob):
+    if job.action == "destroy":
+        media_storage.get_storage().destroy(job.public_id)
+    else:
+        raise ValueError(f"Unknown media job action: {job.action}")
+
+
+def drain(db: Session, max_jobs: int = None) -> int:
+    """Run due jobs until none are left (or max_jobs were run). Returns the number run."""
+    done = 0
+    while max_jobs is None or done < max_jobs:
+        jobs = _claim(db, BATCH_SIZE if max_jobs is None else min(BATCH_SIZE, max_jobs - done))
+        if not jobs:
+            break
+        for job in jobs:
+            try:
+                _run(job)
+            except Exception as e:
+                job.last_error = str(e)[:2000]
+                if job.attempts >= MAX_ATTEMPTS:
+                    job.status = MediaJobStatusEnum.dead.value
+                    print(f"💀 Media job {job.action} {job.public_id} dead after {job.attempts} attempts: {e}")
+                else:
+                    job.status = MediaJobStatusEnum.pending.value
+                    job.run_after = datetime.utcnow() + _backoff(job.attempts)
+            else:
+                db.delete(job)
+            db.commit()
+            done += 1
+    return done
+
+
+def drain_media_jobs():
+    """Background job (API process fallback for the dedicated worker)."""
+    if not acquire_job_lock("drain_media_jobs", DRAIN_INTERVAL - 5):
+        return
+
+    from app.database import SessionLocal
+
+    db: Session = SessionLocal()
+    try:
+        count = drain(db)
+        if count:
+            print(f"🧹 Ran {count} media jobs")
+    finally:
+        db.close()
+
+
+def requeue_dead(db: Session) -> int:
+    """Give dead jobs a fresh set of attempts (after fixing whatever made them fail)."""
+    count = (
+        db.query(MediaJob)
+        .filter(MediaJob.status == MediaJobStatusEnum.dead.value)
+        .update({MediaJob.status: MediaJobStatusEnum.pending.value, MediaJob.attempts: 0,
+                 MediaJob.run_after: datetime.utcnow()}, synchronize_session=False)
+    )
+    db.commit()
+    return count
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Media job worker")
+    parser.add_argument("--once", action="store_true", help="drain the queue once and exit")
+    parser.add_argument("--requeue-dead", action="store_true", help="retry dead jobs, then exit")
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    try:
+        if args.requeue_dead:
+            print(f"Requeued {requeue_dead(session)} dead media jobs")
+        elif args.once:
+            print(f"Ran {drain(session)} media jobs")
+        else:
+            print("🧹 Media job worker started")
+            while True:
+                try:
+                    if not drain(session):
+                        time.sleep(POLL_INTERVAL)
+                except Exception as e:
+                    session.rollback()
+                    print(f"❌ Media job worker error: {e}")
+                    time.sleep(POLL_INTERVAL)
+    finally:
+        session.close()
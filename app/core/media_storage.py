@@ -0,0 +1,153 @@
+import os
+import shutil
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, List, Optional, Tuple
+from fastapi import HTTPException, UploadFile
+
+# -------------------------
+# MEDIA STORAGE
+# -------------------------
+# Where uploaded images go. MEDIA_STORAGE=cloudinary (default) or local; tests and benchmarks
+# can also swap in any backend with set_storage(). Backends are plain blocking objects;
+# upload_many() runs them concurrently on a shared thread pool so a request waits for the
+# slowest upload instead of the sum of all of them.
+
+MEDIA_STORAGE = os.getenv("MEDIA_STORAGE", "cloudinary")
+MEDIA_LOCAL_ROOT = os.getenv("MEDIA_LOCAL_ROOT", os.path.join("data", "media"))
+MEDIA_LOCAL_URL = os.getenv("MEDIA_LOCAL_URL", "/media")
+UPLOAD_WORKERS = int(os.getenv("MEDIA_UPLOAD_WORKERS", "8"))
+CHUNK_SIZE = 64 * 1024
+
+
+class CloudinaryStorage:
+    """Cloudinary, configured through the CLOUDINARY_* environment variables."""
+
+    def upload(self, fileobj, folder: str) -> dict:
+        import cloudinary.uploader
+
+        result = cloudinary.uploader.upload(fileobj, folder=folder)
+        if not result.get("secure_url") or not result.get("public_id"):
+            raise RuntimeError("Cloudinary upload failed")
+        return {"secure_url": result["secure_url"], "public_id": result["public_id"]}
+
+    def destroy(self, public_id: str):
+        import cloudinary.uploader
+
+        cloudinary.uploader.destroy(public_id)
+
+
+class LocalStorage:
+    """Files on local disk (development, tests, benchmarks). public_id is the path under root."""
+
+    def __init__(self, root: str = MEDIA_LOCAL_ROOT, base_url: str = MEDIA_LOCAL_URL):
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+
+    def upload(self, fileobj, folder: str) -> dict:
+        public_id = f"{folder}/{uuid.uuid4().hex}"
+        path = os.path.join(self.root, public_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as out:
+            shutil.copyfileobj(fileobj, out, CHUNK_SIZE)
+        return {"secure_url": f"{self.base_url}/{public_id}", "public_id": public_id}
+
+    def destroy(self, public_id: str):
+        try:
+            os.remove(os.path.join(self.root, public_id))
+        except FileNotFoundError:
+            pass
+
+
+_storage = None
+_executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="media-upload")
+
+
+def get_storage():
+    global _storage
+    if _storage is None:
+        _storage = LocalStorage() if MEDIA_STORAGE == "local" else CloudinaryStorage()
+    return _storage
+
+
+def set_storage(storage):
+    global _storage
+    _storage = storage
+
+
+# -------------------------
+# VALIDATION
+# -------------------------
+
+# leading bytes of each accepted format; SVG is text, so it only has to start with markup
+_SIGNATURES = {
+    "image/jpeg": (b"\xff\xd8\xff",),
+    "image/png": (b"\x89PNG\r\n\x1a\n",),
+    "image/webp": (b"RIFF",),
+    "image/svg+xml": (b"<", b"\xef\xbb\xbf<"),
+}
+_ALIASES = {"image/pjpeg": "image/jpeg"}
+
+
+def validate_image(file: UploadFile, allowed_types: set, max_bytes: int):
+    """
+    Reject unsupported or oversized images with a 400 before anything is uploaded.
+    The size is counted chunk by chunk (nothing is buffered) and stops as soon as it is over
+    the limit; the first bytes must match the declared content type. Rewinds the file.
+    """
+    if file.content_type not in allowed_types:
+        raise HTTPException(status_code=400, detail=f"Unsupported file type: {file.content_type}")
+    too_large = HTTPException(status_code=400, detail=f"File too large (max {max_bytes // (1024 * 1024)}MB)")
+    if file.size is not None and file.size > max_bytes:
+        raise too_large
+
+    fileobj = file.file
+    fileobj.seek(0)
+    head = fileobj.read(CHUNK_SIZE)
+    size = len(head)
+    while size <= max_bytes:
+        chunk = fileobj.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+    fileobj.seek(0)
+    if size > max_bytes:
+        raise too_large
+
+    signatures = _SIGNATURES.get(_ALIASES.get(file.content_type, file.content_type), ())
+    start = head.lstrip() if file.content_type == "image/svg+xml" else head
+    if signatures and not start.startswith(signatures):
+        raise HTTPException(status_code=400, detail=f"File content does not match {file.content_type}")
+    if file.content_type == "image/webp" and head[8:12] != b"WEBP":
+        raise HTTPException(status_code=400, detail=f"File content does not match {file.content_type}")
+
+
+# -------------------------
+# PARALLEL UPLOADS
+# -------------------------
+
+def upload_many(
+    fileobjs: List[Any],
+    folder: str,
+    before_upload: Optional[Callable[[Any], Any]] = None,
+) -> List[Tuple[dict, Any]]:
+    """
+    Upload every file concurrently. Returns [(upload result, before_upload(fileobj) or None)]
+    in input order; before_upload runs on the same worker thread, just before the upload.
+    If any upload fails, the ones that succeeded are queued for deletion and the first error is raised.
+    """
+    from app.core import media_jobs
+
+    storage = get_storage()
+
+    def task(fileobj):
+        extra = before_upload(fileobj) if before_upload else None
+        return storage.upload(fileobj, folder), extra
+
+    futures = [_executor.submit(task, fileobj) for fileobj in fileobjs]
+    wait(futures)
+    errors = [f.exception() for f in futures if f.exception() is not None]
+    if errors:
+        media_jobs.destroy_later([f.result()[0]["public_id"] for f in futures if f.exception() is None])
+        raise errors[0]
+    return [f.result() for f in futures]
@@ -1,4 +1,5 @@
 import os
+import redis
 from redis import asyncio as aioredis
 from dotenv import load_dotenv
 
@@ -46,5 +47,22 @@ class RedisClient:
 def get_redis_client() -> RedisClient:
     return RedisClient()
 
+
+_sync_redis = None
+
+def get_sync_redis() -> redis.Redis:
+    """
+    Shared blocking Redis client for sync CRUD code, which FastAPI runs in its threadpool.
+    The underlying connection pool is thread-safe.
+    """
+    global _sync_redis
+    if _sync_redis is None:
+        _sync_redis = redis.Redis.from_url(
+            os.getenv("REDIS_URL"),
+            encoding="utf-8",
+            decode_responses=True
+        )
+    return _sync_redis
+
 # print the redis url
 print(os.getenv("REDIS_URL"))
\ No newline at end of file
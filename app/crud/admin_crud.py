@@ -16,6 +16,8 @@ import cloudinary.uploader
 import random, string
 import re
 from sqlalchemy.exc import SQLAlchemyError
+from app.util import util_artwork_hooks, util_leaderboard, util_cache
+from app.core import media_jobs
 # from app.schemas.schemas import (likeArt)
 # from app.crud.user_crud import(calculate_completion)
 
@@ -45,6 +47,9 @@ def delete_user(db: Session, user_id):  # no UUID typing
         return False
     db.delete(user)
     db.commit()
+
+    util_leaderboard.remove_artist(user_id)
+    util_cache.invalidate(f"user:{user_id}", f"artist:{user_id}")
     return True
 
 def update_user_details_admin(db: Session, user_id: str, update_data: dict):
@@ -58,6 +63,7 @@ def update_user_details_admin(db: Session, user_id: str, update_data: dict):
 
     db.commit()
     db.refresh(user)
+    util_cache.invalidate(f"user:{user.id}", f"artist:{user.id}")
     return user
 
 def get_users_filters(
@@ -98,15 +104,19 @@ def list_artworks_admin(db: Session):
 def update_artwork(
     db: Session,
     artwork_id: str,
-    artwork_update: artworks_schemas.ArtworkUpdate,
-    files: Optional[List[UploadFile]] = None
+    artwork_update: artworks_schemas.ArtworkAdminUpdate,
+    files: Optional[List[UploadFile]] = None,
+    background_tasks=None
 ):
     db_artwork = db.query(models.Artwork).filter(models.Artwork.id == artwork_id).first()
 
     if not db_artwork:
         raise HTTPException(status_code=404, detail="Artwork not found")
 
+    previous_status = db_artwork.status
     update_data = artwork_update.dict(exclude_unset=True)
+    if update_data.get("status") is not None:
+        update_data["status"] = models.StatusENUM(update_data["status"]).value
     for key, value in update_data.items():
         setattr(db_artwork, key, value)
 
@@ -134,6 +144,8 @@ def update_artwork(
 
     db.commit()
     db.refresh(db_artwork)
+
+    util_artwork_hooks.artwork_saved(db, db_artwork, previous_status=previous_status, background_tasks=background_tasks)
     return db_artwork
 
 def delete_artwork_admin(db: Session, artwork_id: str):
@@ -148,16 +160,14 @@ def delete_artwork_admin(db: Session, artwork_id: str):
     if not artwork:
         raise HTTPException(status_code=404, detail="Artwork not found")
 
-    # ✅ Delete all images from Cloudinary
-    for img in artwork.images:   # ArtworkImage objects
-        try:
-            cloudinary.uploader.destroy(img.public_id)
-        except Exception as e:
-            print(f"⚠️ Cloudinary cleanup failed for {img.public_id}: {e}")
+    # ✅ Queue deletion of all images from Cloudinary (run by the media job worker)
+    media_jobs.enqueue_destroy(db, [img.public_id for img in artwork.images])
 
     db.delete(artwork)
     db.commit()
 
+    util_artwork_hooks.artwork_removed(db, artwork_id)
+
     return {
         "message": "Artwork deleted successfully",
         "artwork_id": artwork_id
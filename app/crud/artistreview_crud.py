@@ -8,7 +8,7 @@ from sqlalchemy.orm import Session
 from uuid import UUID
 from sqlalchemy import desc, func
 # from app.crud.user_crud import get_user_rating_info
-from app.util import util_artistrank
+from app.util import util_artistrank, util_leaderboard, util_cache
 from app.crud import moderation_crud
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -35,6 +35,11 @@ def create_artist_review(db: Session, item: artistreview_schemas.ArtistReviewCre
         db.commit()
         db.refresh(existing_review)
 
+        # Keep materialized rating/rank and the live leaderboard in sync
+        changed = util_artistrank.refresh_artist_rating(db, existing_review.artist_id)
+        util_leaderboard.update_scores(changed)
+        util_cache.invalidate(f"user:{existing_review.artist_id}")
+
          # Add to moderation queue
         moderation_crud.add_to_moderation(db, table_name="artist_reviews", content_id=existing_review.id)
 
@@ -51,6 +56,11 @@ def create_artist_review(db: Session, item: artistreview_schemas.ArtistReviewCre
     db.commit()
     db.refresh(db_review)
 
+    # Keep materialized rating/rank and the live leaderboard in sync
+    changed = util_artistrank.refresh_artist_rating(db, db_review.artist_id)
+    util_leaderboard.update_scores(changed)
+    util_cache.invalidate(f"user:{db_review.artist_id}")
+
     # Add to moderation queue
     moderation_crud.add_to_moderation(db, table_name="artist_reviews", content_id=db_review.id)
 
@@ -67,15 +77,20 @@ def reviews_for_artist(db: Session, artist_id: UUID):
 
 def list_artists_by_rating(db: Session):
     """
-    List all artists with their average rating, review count, and rank
-    using the get_user_rating_info() helper.
+    List all artists with their average rating, review count, and rank,
+    read in one pass from the materialized artist_rating_stats table.
     """
+    rows = (
+        db.query(models.User, models.ArtistRatingStats)
+        .outerjoin(models.ArtistRatingStats, models.ArtistRatingStats.artist_id == models.User.id)
+        .order_by(desc(func.coalesce(models.ArtistRatingStats.weighted_rating, 0.0)))
+        .all()
+    )
+    zero_rank = util_artistrank.unreviewed_rank(db)
 
-    artists = db.query(models.User).all()
     results = []
-
-    for artist in artists:
-        rating_info = util_artistrank.get_user_rating_info(db, artist.id)
+    for artist, stats in rows:
+        rating_info = util_artistrank.rating_info_from_stats(stats, zero_rank)
 
         results.append({
             "artistId": artist.id,
@@ -84,11 +99,8 @@ def list_artists_by_rating(db: Session):
             "profileImage": artist.profileImage,
             "avgRating": rating_info["avgRating"],
             "reviewCount": rating_info["reviewCount"],
-            "weightedRating": rating_info["weightedRating"],  # ✅ fixed
+            "weightedRating": rating_info["weightedRating"],
             "rank": rating_info["rank"]
         })
 
-    # Sort by weightedRating instead of avgRating (more fair)
-    results.sort(key=lambda x: x["weightedRating"], reverse=True)
-
     return results
@@ -1,21 +1,22 @@
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload, load_only, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from fastapi import HTTPException, UploadFile
 from uuid import UUID, uuid4
 from app.models import models
 from app.models.models import RoleEnum
 from app.schemas import artworks_schemas
 from passlib.context import CryptContext
-import cloudinary.uploader
-import cloudinary
 from typing import List, Optional, Dict
 from fastapi import UploadFile, HTTPException
-import cloudinary.uploader
 from sqlalchemy.exc import SQLAlchemyError
 from app.schemas.artworks_schemas import (likeArt) 
 from app.util import util
-from sqlalchemy import or_
+from sqlalchemy import or_, and_
 from app.crud import moderation_crud
+from app.util import util_artwork_hooks, util_randompool, util_visual, util_cache
+from app.util.util_cursor import encode_cursor
+from app.core import media_storage, media_jobs
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -56,8 +57,23 @@ def create_artwork(
         artwork_data.price = None
         artwork_data.quantity = None
 
+    # 3️⃣ Validate every file (streamed, nothing buffered) before anything is uploaded
+    for file in files:
+        media_storage.validate_image(file, ALLOWED_MIME_TYPES, MAX_FILE_SIZE_MB * 1024 * 1024)
+
+    # don't hold the DB transaction (opened by the user lookup) across the uploads
+    db.rollback()
+
+    # 4️⃣ Upload images concurrently (visual vectors computed on the same worker threads)
+    try:
+        uploaded = media_storage.upload_many(
+            [file.file for file in files], folder="artworks", before_upload=util_visual.image_vector
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Image upload failed: {str(e)}")
+
     try:
-        # 3️⃣ Create artwork record
+        # 5️⃣ Create artwork + ArtworkImage records in one short transaction
         db_artwork = models.Artwork(
             **artwork_data.dict(exclude={"images"}),  # exclude images from schema
             artistId=str(user_id),
@@ -66,36 +82,23 @@ def create_artwork(
         db.add(db_artwork)
         db.flush()  # flush to get artwork ID before images
 
-        # 4️⃣ Upload images to Cloudinary
-        for file in files:
-            if file.content_type not in ALLOWED_MIME_TYPES:
-                raise HTTPException(
-                    status_code=400, detail=f"Unsupported file type: {file.content_type}"
-                )
-
-            contents = file.file.read()
-            if len(contents) > MAX_FILE_SIZE_MB * 1024 * 1024:
-                raise HTTPException(
-                    status_code=400, detail=f"File too large (max {MAX_FILE_SIZE_MB}MB)"
-                )
-            file.file.seek(0)
-
-            result = cloudinary.uploader.upload(file.file, folder="artworks")
-            secure_url = result.get("secure_url")
-            public_id = result.get("public_id")
-            if not secure_url or not public_id:
-                raise HTTPException(status_code=500, detail="Cloudinary upload failed")
-
-            # 5️⃣ Create ArtworkImage record
-            db_image = models.ArtworkImage(
+        for result, visual_vector in uploaded:
+            db.add(models.ArtworkImage(
                 artwork_id=db_artwork.id,
-                url=secure_url,
-                public_id=public_id,
-            )
-            db.add(db_image)
+                url=result["secure_url"],
+                public_id=result["public_id"],
+                visual_vector=visual_vector,
+            ))
 
         db.commit()
         db.refresh(db_artwork)
+    except Exception as e:
+        db.rollback()
+        media_jobs.destroy_later([result["public_id"] for result, _ in uploaded])
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    try:
+        util_visual.mark_dirty()
 
         # Add to moderation queue
         moderation_crud.add_to_moderation(db, table_name="artworks", content_id=db_artwork.id)
@@ -104,6 +107,8 @@ def create_artwork(
         db.commit()
         db.refresh(user)
 
+        util_artwork_hooks.artwork_saved(db, db_artwork)
+
     except SQLAlchemyError as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
@@ -209,6 +214,8 @@ def update_artwork(
     db.commit()
     db.refresh(db_artwork)
 
+    util_artwork_hooks.artwork_saved(db, db_artwork)
+
     return db_artwork
 
 # --------------------
@@ -223,23 +230,37 @@ def add_artwork_images(db, artwork_id: str, user_id: str, files: list):
     if not artwork:
         raise HTTPException(status_code=404, detail="Artwork not found")
 
-    new_images = []
     for file in files:
-        upload_result = cloudinary.uploader.upload(file.file, folder="artworks")
+        media_storage.validate_image(file, ALLOWED_MIME_TYPES, MAX_FILE_SIZE_MB * 1024 * 1024)
 
-        # create SQLAlchemy model, not dict
-        db_image = models.ArtworkImage(
-            artwork_id=artwork.id,
-            url=upload_result["secure_url"],
-            public_id=upload_result["public_id"],
+    # same pipeline as create_artwork: no DB transaction held across the uploads
+    artwork_id = artwork.id
+    db.rollback()
+    try:
+        uploaded = media_storage.upload_many(
+            [file.file for file in files], folder="artworks", before_upload=util_visual.image_vector
         )
-        db.add(db_image)
-        new_images.append(db_image)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Image upload failed: {str(e)}")
 
-    artwork.images.extend(new_images)
+    try:
+        for upload_result, visual_vector in uploaded:
+            # create SQLAlchemy model, not dict
+            db.add(models.ArtworkImage(
+                artwork_id=artwork_id,
+                url=upload_result["secure_url"],
+                public_id=upload_result["public_id"],
+                visual_vector=visual_vector,
+            ))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        media_jobs.destroy_later([upload_result["public_id"] for upload_result, _ in uploaded])
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
-    db.commit()
     db.refresh(artwork)
+    util_visual.mark_dirty()
+    util_cache.invalidate(f"artwork:{artwork.id}")
     return artwork
 
 # --------------------
@@ -263,16 +284,43 @@ def update_artwork_image(db, artwork_id: str, user_id: str, old_public_id: str,
     if not db_image:
         raise HTTPException(status_code=404, detail="Image not found")
     
-    # destroy image from db
-    cloudinary.uploader.destroy(old_public_id)
-    
-    # update the image
-    upload_result = cloudinary.uploader.upload(file.file, folder="artworks")
-    db_image.url = upload_result["secure_url"]
-    db_image.public_id = upload_result["public_id"]
+    # upload the new image first, the old one is only destroyed (out-of-band) once the row points elsewhere
+    media_storage.validate_image(file, ALLOWED_MIME_TYPES, MAX_FILE_SIZE_MB * 1024 * 1024)
+
+    # same pipeline as create_artwork: no DB transaction held across the upload
+    image_id = db_image.id
+    db.rollback()
+    try:
+        [(upload_result, visual_vector)] = media_storage.upload_many(
+            [file.file], folder="artworks", before_upload=util_visual.image_vector
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Image upload failed: {str(e)}")
+
+    try:
+        # the image may have been replaced or deleted while uploading
+        db_image = (
+            db.query(models.ArtworkImage)
+            .filter_by(id=image_id, public_id=old_public_id)
+            .first()
+        )
+        if not db_image:
+            raise HTTPException(status_code=404, detail="Image not found")
+        db_image.url = upload_result["secure_url"]
+        db_image.public_id = upload_result["public_id"]
+        db_image.visual_vector = visual_vector
+        media_jobs.enqueue_destroy(db, [old_public_id])
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        media_jobs.destroy_later([upload_result["public_id"]])
+        if isinstance(e, HTTPException):
+            raise
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
-    db.commit()
     db.refresh(artwork)
+    util_visual.mark_dirty()
+    util_cache.invalidate(f"artwork:{artwork.id}")
     return artwork
 
 # --------------------
@@ -296,13 +344,13 @@ def delete_artwork_image(db, artwork_id: str, user_id: str, public_id: str):
     if not db_image:
         raise HTTPException(status_code=404, detail="Image not found")
 
-    # Delete from Cloudinary
-    cloudinary.uploader.destroy(public_id)
-
-    # Remove from DB
+    # Remove from DB; the stored file is deleted out-of-band
     db.delete(db_image)
+    media_jobs.enqueue_destroy(db, [public_id])
     db.commit()
     db.refresh(artwork)
+    util_visual.mark_dirty()
+    util_cache.invalidate(f"artwork:{artwork.id}")
 
     return artwork
 #------------------------------------------------------------------------------------------------------------
@@ -332,27 +380,134 @@ def delete_artwork(db: Session, artwork_id: UUID, user_id: UUID):
 
     db.commit()
     db.refresh(artwork)
+
+    util_artwork_hooks.artwork_removed(db, artwork.id)
     return {"message": "Artwork marked as deleted successfully", "artwork_id": artwork_id}
 
                                         # GET ARTWORK LIST                                 
 def list_artworks(db: Session) -> List[models.Artwork]:
-    artworks = (
+    # random order comes from the random pool (util_randompool), not ORDER BY RAND()
+    ids = util_randompool.sample(db)
+    arts = {
+        art.id: art
+        for art in db.query(models.Artwork)
+        .options(joinedload(models.Artwork.artist))
+        .filter(models.Artwork.id.in_(ids))
+        .all()
+    } if ids else {}
+    return [arts[i] for i in ids if i in arts]
+
+                                      # GET ARTWORK PAGE (keyset)
+LIST_COLUMNS = (
+    models.Artwork.id, models.Artwork.title, models.Artwork.description, models.Artwork.category,
+    models.Artwork.price, models.Artwork.tags, models.Artwork.quantity, models.Artwork.isSold,
+    models.Artwork.createdAt, models.Artwork.artistId, models.Artwork.forSale, models.Artwork.status,
+    models.Artwork.like_count,
+)
+
+def list_artworks_page(
+    db: Session,
+    cursor: Optional[tuple] = None,
+    limit: int = 20,
+    category: Optional[str] = None,
+    for_sale: Optional[bool] = None,
+):
+    """
+    Newest-first page of artworks ordered by (createdAt, id), served by the
+    (createdAt, id) / (category, createdAt, id) / (forSale, createdAt, id) indexes.
+    Loads only the columns ArtworkRead needs; like counts come from the like_count column.
+    cursor: (createdAt, id) of the last artwork of the previous page.
+    Returns (artworks, next_cursor).
+    """
+    query = (
         db.query(models.Artwork)
-        .options(joinedload(models.Artwork.artist), joinedload(models.Artwork.likes))
-        .order_by(func.random())  # PostgreSQL; use func.rand() for MySQL
+        .options(
+            load_only(*LIST_COLUMNS),
+            joinedload(models.Artwork.artist).load_only(
+                models.User.id, models.User.username, models.User.profileImage
+            ),
+            selectinload(models.Artwork.images),
+        )
+        .filter(or_(models.Artwork.isDeleted == False, models.Artwork.isDeleted.is_(None)))
+    )
+    if category:
+        query = query.filter(models.Artwork.category == category)
+    if for_sale is not None:
+        query = query.filter(models.Artwork.forSale == for_sale)
+    if cursor:
+        created_at, artwork_id = cursor
+        query = query.filter(or_(
+            models.Artwork.createdAt < created_at,
+            and_(models.Artwork.createdAt == created_at, models.Artwork.id < artwork_id)
+        ))
+
+    artworks = (
+        query.order_by(models.Artwork.createdAt.desc(), models.Artwork.id.desc())
+        .limit(limit + 1)
         .all()
     )
-    return artworks
+
+    next_cursor = None
+    if len(artworks) > limit:
+        artworks = artworks[:limit]
+        next_cursor = encode_cursor(artworks[-1].createdAt, artworks[-1].id)
+
+    return artworks, next_cursor
 
                                            # GET SPECIFIC ARTWORK
 def get_artwork(db: Session, artwork_id: UUID):
     return (
         db.query(models.Artwork)
-        .options(joinedload(models.Artwork.artist), joinedload(models.Artwork.likes))
+        .options(joinedload(models.Artwork.artist))
         .filter(models.Artwork.id == str(artwork_id))
         .first()
     )
 
+ARTWORK_CACHE_TTL = 600        # seconds
+ARTWORK_CACHE_STALE_TTL = 300  # seconds served stale while one request reloads
+
+@util_cache.cached(
+    key="artwork:{artwork_id}",
+    ttl=ARTWORK_CACHE_TTL,
+    stale_ttl=ARTWORK_CACHE_STALE_TTL,
+    tags=lambda art: [f"artist:{art.artistId}"],
+    model=artworks_schemas.ArtworkRead,
+)
+async def aget_artwork_detail(db: AsyncSession, artwork_id: UUID) -> Optional[artworks_schemas.ArtworkRead]:
+    """
+    Viewer-independent artwork detail, cached (invalidated through util_artwork_hooks).
+    Like count and viewer flags are live data and are filled in by the route.
+    """
+    art = await db.scalar(
+        select(models.Artwork)
+        .options(joinedload(models.Artwork.artist), selectinload(models.Artwork.images))
+        .where(models.Artwork.id == str(artwork_id))
+    )
+    if not art:
+        return None
+
+    return artworks_schemas.ArtworkRead(
+        id=art.id,
+        title=art.title,
+        description=art.description,
+        category=art.category,
+        price=art.price,
+        tags=art.tags,
+        quantity=art.quantity,
+        isSold=art.isSold,
+        images=art.images,
+        createdAt=art.createdAt,
+        artistId=art.artistId,
+        artist=artworks_schemas.ArtworkArtist(
+            id=art.artist.id,
+            username=art.artist.username,
+            profileImage=art.artist.profileImage
+        ),
+        how_many_like=likeArt(like_count=art.like_count or 0),
+        forSale=art.forSale,
+        status=art.status
+    )
+
                                           # GET MY ARTWORK
 
 # def get_artworks_by_me(db: Session, user_id: str):
@@ -380,7 +535,7 @@ def get_artworks_by_me(db: Session, user_id: str):
     # Only fetch non-deleted artworks (isDeleted False or NULL)
     artworksme = (
         db.query(models.Artwork)
-        .options(joinedload(models.Artwork.images), joinedload(models.Artwork.likes))
+        .options(joinedload(models.Artwork.images))
         .filter(
             models.Artwork.artistId == user_id,
             or_(
@@ -393,7 +548,7 @@ def get_artworks_by_me(db: Session, user_id: str):
     )
 
     for artwork in artworksme:
-        artwork.how_many_like = {"like_count": len(artwork.likes)}  
+        artwork.how_many_like = {"like_count": artwork.like_count}
 
     return artworksme
 
@@ -416,7 +571,6 @@ def get_artworks_by_user(db: Session, user_id: str):
     # Query artworks for user, excluding deleted (isDeleted=True)
     artworks = (
         db.query(models.Artwork)
-        .options(joinedload(models.Artwork.likes))
         .filter(
             models.Artwork.artistId == str(user_id),
             or_(
@@ -429,6 +583,6 @@ def get_artworks_by_user(db: Session, user_id: str):
 
     # Add like count to each artwork
     for artwork in artworks:
-        artwork.how_many_like = {"like_count": len(artwork.likes)}  
+        artwork.how_many_like = {"like_count": artwork.like_count}
 
     return artworks
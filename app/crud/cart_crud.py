@@ -7,6 +7,7 @@ from app.models import models
 # from app.models.models import RoleEnum
 from app.schemas import cart_schemas
 from passlib.context import CryptContext
+from app.util import util_feedcache
 # import cloudinary.uploader
 # import cloudinary
 # from typing import List, Optional, Dict
@@ -60,6 +61,7 @@ def add_to_cart(db: Session, cart_data: cart_schemas.CartCreate):
         db.add(cart_item)
         db.commit()
         db.refresh(cart_item)
+        util_feedcache.bump(cart_item.userId)  # isInCart flag on the feed
         return cart_item
 
 #--------------------------------------------------------
@@ -81,4 +83,5 @@ def remove_cart_item(db: Session, user_id: UUID, artwork_id: UUID):
         raise HTTPException(status_code=404, detail="Cart item not found")
     db.delete(item)
     db.commit()
+    util_feedcache.bump(str(user_id))
     return {"status": "success", "message": "Item removed from cart"}
@@ -1,10 +1,15 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, or_, insert, case, select
+from sqlalchemy.dialects import mysql, sqlite
 from app.models.models import Message
 from app.schemas.chat_schemas import MessageCreate
 from datetime import datetime
+import uuid
 from sqlalchemy import func, or_, desc, and_
-from app.models.models import Message, User
+from app.models.models import Message, User, Conversation
+from app.util.util_cursor import encode_cursor
+from app.util import util_unread
 
 
 
@@ -12,114 +17,235 @@ from app.models.models import Message, User
 # CHAT HELPERS
 # -------------------------
 
-def create_message(db: Session, sender_id: str, msg: MessageCreate) -> Message:
+def _message_timestamp(msg: MessageCreate) -> datetime:
     if isinstance(msg.timestamp, str):
-        timestamp = datetime.fromisoformat(msg.timestamp)
-    else:
-        timestamp = msg.timestamp or datetime.utcnow()  # fallback if not provided
-
-    message = Message(
-        sender_id=sender_id,
-        receiver_id=msg.receiver_id,
-        content=msg.content,
-        timestamp=timestamp,
-        message_type="text",
-    )
-    db.add(message)
+        return datetime.fromisoformat(msg.timestamp)
+    return msg.timestamp or datetime.utcnow()  # fallback if not provided
+
+def create_message(db: Session, sender_id: str, msg: MessageCreate) -> Message:
+    row = build_message_row(sender_id, msg)
+    _insert_messages(db, [row])
     db.commit()
-    db.refresh(message)
-    return message
+    util_unread.apply_chat_ops([("message", row)])
+    return db.get(Message, row["id"])
+
+def build_message_row(sender_id: str, msg: MessageCreate) -> dict:
+    """Column values for a new message, id preassigned so it can be acked before the insert."""
+    return {
+        "id": str(uuid.uuid4()),
+        "sender_id": sender_id,
+        "receiver_id": msg.receiver_id,
+        "conversation_key": pair_key(sender_id, msg.receiver_id),
+        "content": msg.content,
+        "timestamp": _message_timestamp(msg),
+        "is_read": False,
+        "message_type": "text",
+    }
 
 def mark_messages_as_read(db: Session, sender_id: str, receiver_id: str):
+    _mark_read(db, sender_id, receiver_id)
+    db.commit()
+    util_unread.apply_chat_ops([("read", (sender_id, receiver_id))])
+
+def _mark_read(db: Session, sender_id: str, receiver_id: str):
+    unread = (
+        db.query(Conversation.unread_count)
+        .filter(Conversation.owner_id == receiver_id, Conversation.partner_id == sender_id)
+        .scalar()
+    )
+    if unread == 0:
+        return  # clients send "read" on every open; nothing to update
     db.query(Message).filter(
         Message.sender_id == sender_id,
         Message.receiver_id == receiver_id,
         Message.is_read == False
-    ).update({Message.is_read: True})
+    ).update({Message.is_read: True}, synchronize_session=False)
+    db.query(Conversation).filter(
+        Conversation.owner_id == receiver_id,
+        Conversation.partner_id == sender_id
+    ).update({Conversation.unread_count: 0}, synchronize_session=False)
+
+def _insert_messages(db: Session, rows: list):
+    db.execute(insert(Message), rows)
+    _touch_conversations(db, rows)
+
+def persist_chat_batch(db: Session, ops: list):
+    """
+    Apply a micro-batch of chat writes in ONE transaction.
+    ops: ("message", row_dict) or ("read", (sender_id, receiver_id)), applied in order;
+    consecutive messages go in as a single executemany INSERT.
+    """
+    pending = []
+    for kind, value in ops:
+        if kind == "message":
+            pending.append(value)
+            continue
+        if pending:
+            _insert_messages(db, pending)
+            pending = []
+        _mark_read(db, *value)
+    if pending:
+        _insert_messages(db, pending)
     db.commit()
+    util_unread.apply_chat_ops(ops)
 
-def get_unread_count(db: Session, receiver_id: str, sender_id: str) -> int:
-    return db.query(Message).filter(
-        Message.sender_id == sender_id,
-        Message.receiver_id == receiver_id,
-        Message.is_read == False
-    ).count()
+# -------------------------
+# CONVERSATION SUMMARIES
+# -------------------------
 
-def get_messages_between(db: Session, user1_id: str, user2_id: str, limit: int = 50):
-    return db.query(Message).filter(
-        or_(
-            and_(Message.sender_id == user1_id, Message.receiver_id == user2_id),
-            and_(Message.sender_id == user2_id, Message.receiver_id == user1_id)
+def pair_key(user1_id: str, user2_id: str) -> str:
+    a, b = sorted((str(user1_id), str(user2_id)))
+    return f"{a}:{b}"
+
+def _touch_conversations(db: Session, rows: list):
+    """Upsert both participants' summary rows for newly inserted messages."""
+    summaries = {}
+    for row in rows:
+        for owner, partner, unread in (
+            (row["sender_id"], row["receiver_id"], 0),
+            (row["receiver_id"], row["sender_id"], int(row["sender_id"] != row["receiver_id"])),
+        ):
+            current = summaries.get((owner, partner))
+            if current is None:
+                current = summaries[(owner, partner)] = {
+                    "owner_id": owner,
+                    "partner_id": partner,
+                    "pair_key": pair_key(owner, partner),
+                    "last_message_at": None,
+                    "unread_count": 0,
+                }
+            current["unread_count"] += unread
+            if current["last_message_at"] is None or row["timestamp"] >= current["last_message_at"]:
+                current["last_message_id"] = row["id"]
+                current["last_message_preview"] = (row["content"] or "")[:255]
+                current["last_message_type"] = row["message_type"]
+                current["last_message_at"] = row["timestamp"]
+
+    for summary in summaries.values():
+        summary["id"] = str(uuid.uuid4())
+    db.execute(_conversation_upsert(db), list(summaries.values()))
+
+def _conversation_upsert(db: Session):
+    """INSERT ... ON DUPLICATE KEY (MySQL) / ON CONFLICT (SQLite) for Conversation rows."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        stmt = mysql.insert(Conversation)
+        new = stmt.inserted
+    else:
+        stmt = sqlite.insert(Conversation)
+        new = stmt.excluded
+
+    is_newer = new.last_message_at >= Conversation.last_message_at
+    updates = [
+        ("unread_count", Conversation.unread_count + new.unread_count),
+        ("last_message_id", case((is_newer, new.last_message_id), else_=Conversation.last_message_id)),
+        ("last_message_preview", case((is_newer, new.last_message_preview), else_=Conversation.last_message_preview)),
+        ("last_message_type", case((is_newer, new.last_message_type), else_=Conversation.last_message_type)),
+        # MySQL applies assignments left to right, so the compared column goes last
+        ("last_message_at", case((is_newer, new.last_message_at), else_=Conversation.last_message_at)),
+    ]
+    if dialect == "mysql":
+        return stmt.on_duplicate_key_update(updates)
+    return stmt.on_conflict_do_update(index_elements=["owner_id", "partner_id"], set_=dict(updates))
+
+def get_unread_count(db: Session, receiver_id: str, sender_id: str) -> int:
+    """Served from the Redis counters; falls back to the conversation summary."""
+    try:
+        return util_unread.get_counts(receiver_id).get(str(sender_id), 0)
+    except Exception:
+        unread = (
+            db.query(Conversation.unread_count)
+            .filter(Conversation.owner_id == receiver_id, Conversation.partner_id == sender_id)
+            .scalar()
         )
-    ).order_by(Message.timestamp.desc()).limit(limit).all()
+        return unread or 0
 
-# -------------------------
-# CHAT LIST ENDPOINT
-# ------------------------
+def _messages_between_query(user1_id: str, user2_id: str, limit: int, before: tuple = None):
+    query = select(Message).where(Message.conversation_key == pair_key(user1_id, user2_id))
+    if before:
+        before_at, before_id = before
+        query = query.where(or_(
+            Message.timestamp < before_at,
+            and_(Message.timestamp == before_at, Message.id < before_id)
+        ))
+    return query.order_by(Message.timestamp.desc(), Message.id.desc()).limit(limit + 1)
+
+
+def _message_page(messages: list, limit: int):
+    next_cursor = None
+    if len(messages) > limit:
+        messages = messages[:limit]
+        next_cursor = encode_cursor(messages[-1].timestamp, messages[-1].id)
+    return messages, next_cursor
 
-def get_chat_users(db: Session, current_user_id: str):
+
+def get_messages_between(db: Session, user1_id: str, user2_id: str, limit: int = 50, before: tuple = None):
     """
-    Return a list of users the current user has chatted with,
-    including last message, timestamp, and unread count.
+    One page of history, newest first, as a range read on (conversation_key, timestamp, id).
+    before: (timestamp, id) of the oldest message already loaded.
+    Returns (messages, next_cursor).
     """
+    messages = db.execute(_messages_between_query(user1_id, user2_id, limit, before)).scalars().all()
+    return _message_page(messages, limit)
 
-    # Subquery: get latest timestamp per conversation pair
-    last_messages = (
-        db.query(
-            func.greatest(Message.sender_id, Message.receiver_id).label("user_a"),
-            func.least(Message.sender_id, Message.receiver_id).label("user_b"),
-            func.max(Message.timestamp).label("last_time")
-        )
-        .filter(
-            or_(
-                Message.sender_id == current_user_id,
-                Message.receiver_id == current_user_id
-            )
-        )
-        .group_by("user_a", "user_b")
-        .subquery()
-    )
 
-    # Join with message table to fetch latest message data
-    latest_msgs = (
-        db.query(Message)
-        .join(
-            last_messages,
-            and_(
-                func.greatest(Message.sender_id, Message.receiver_id) == last_messages.c.user_a,
-                func.least(Message.sender_id, Message.receiver_id) == last_messages.c.user_b,
-                Message.timestamp == last_messages.c.last_time
-            )
-        )
-        .order_by(desc(Message.timestamp))
-        .all()
+async def aget_messages_between(db: AsyncSession, user1_id: str, user2_id: str, limit: int = 50, before: tuple = None):
+    """get_messages_between on the async session."""
+    messages = (await db.execute(_messages_between_query(user1_id, user2_id, limit, before))).scalars().all()
+    return _message_page(messages, limit)
+
+# -------------------------
+# CHAT LIST ENDPOINT
+# ------------------------
+
+def _chat_users_query(current_user_id: str, cursor: tuple, limit: int):
+    query = (
+        select(Conversation, User)
+        .join(User, User.id == Conversation.partner_id)
+        .where(Conversation.owner_id == str(current_user_id))
     )
+    if cursor:
+        last_at, last_id = cursor
+        query = query.where(or_(
+            Conversation.last_message_at < last_at,
+            and_(Conversation.last_message_at == last_at, Conversation.id < last_id)
+        ))
+    return query.order_by(desc(Conversation.last_message_at), desc(Conversation.id)).limit(limit + 1)
 
-    chat_list = []
-    for msg in latest_msgs:
-        # Determine chat partner
-        partner = msg.receiver if msg.sender_id == current_user_id else msg.sender
-
-        # Count unread messages from partner → current user
-        unread_count = (
-            db.query(func.count(Message.id))
-            .filter(
-                Message.sender_id == partner.id,
-                Message.receiver_id == current_user_id,
-                Message.is_read == False
-            )
-            .scalar()
-        )
 
+def _chat_list_page(rows: list, limit: int):
+    chat_list = []
+    for conversation, partner in rows[:limit]:
         chat_list.append({
             "user_id": str(partner.id),
             "username": partner.username,
             "name": partner.name,
             "profileImage": partner.profileImage,
-            "lastMessage": msg.content,
-            "lastMessageType": msg.message_type,
-            "lastMessageAt": msg.timestamp,
-            "unreadCount": unread_count,
+            "lastMessage": conversation.last_message_preview,
+            "lastMessageType": conversation.last_message_type,
+            "lastMessageAt": conversation.last_message_at,
+            "unreadCount": conversation.unread_count,
         })
 
-    return chat_list
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1][0]
+        next_cursor = encode_cursor(last.last_message_at, last.id)
+    return chat_list, next_cursor
+
+
+def get_chat_users(db: Session, current_user_id: str, cursor: tuple = None, limit: int = 30):
+    """
+    Conversations of the current user, most recent activity first, read straight from
+    the conversations summary table (owner_id, last_message_at, id) index.
+    cursor: (last_message_at, id) of the last row of the previous page.
+    Returns (chat_list, next_cursor).
+    """
+    rows = db.execute(_chat_users_query(current_user_id, cursor, limit)).all()
+    return _chat_list_page(rows, limit)
+
+
+async def aget_chat_users(db: AsyncSession, current_user_id: str, cursor: tuple = None, limit: int = 30):
+    """get_chat_users on the async session."""
+    rows = (await db.execute(_chat_users_query(current_user_id, cursor, limit))).all()
+    return _chat_list_page(rows, limit)
@@ -12,6 +12,7 @@ from sqlalchemy.exc import SQLAlchemyError
 import uuid
 import cloudinary.uploader
 from app.models import models
+from app.core import media_jobs
 from typing import List
 
 # -----------------------------
@@ -176,13 +177,6 @@ def update_community(
             )
         banner_file.file.seek(0)
 
-        # Delete old Cloudinary banner
-        if old_public_id:
-            try:
-                cloudinary.uploader.destroy(old_public_id)
-            except Exception:
-                pass   # Do not block request
-
         # Upload new banner
         try:
             upload_result = cloudinary.uploader.upload(
@@ -198,9 +192,10 @@ def update_community(
         if not new_url or not new_public_id:
             raise HTTPException(500, "Cloudinary upload returned no URL")
 
-        # Save new image info
+        # Save new image info; the old banner is deleted out-of-band once this commits
         community.bannerImage = new_url
         community.bannerImagePublicId = new_public_id
+        media_jobs.enqueue_destroy(db, [old_public_id])
 
     # -------------------------
     # 3️⃣ SAVE CHANGES
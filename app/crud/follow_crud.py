@@ -17,7 +17,7 @@ from passlib.context import CryptContext
 # from sqlalchemy.exc import SQLAlchemyError
 # from app.schemas.schemas import (likeArt)
 # from app.crud.user_crud import(calculate_completion)
-from app.util import util
+from app.util import util, util_timeline, util_feedcache, util_cache
 
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -80,6 +80,10 @@ def follow_user(db: Session, follower_id: str, followed_id: str):
         db.rollback()
         raise e
 
+    util_timeline.invalidate(follower_id)
+    util_feedcache.bump(follower_id)
+    util_cache.invalidate(f"user:{follower_id}", f"user:{followed_id}")
+
     return {
         "status": "followed",
         "profile_completion": follower.profile_completion
@@ -97,6 +101,9 @@ def unfollow_user(db: Session, follower_id: str, followed_id: str):
 
     follower.unfollow(followed)
     db.commit()
+    util_timeline.invalidate(follower_id)
+    util_feedcache.bump(follower_id)
+    util_cache.invalidate(f"user:{follower_id}", f"user:{followed_id}")
     return {"status": "unfollowed"}
 
 
@@ -7,7 +7,7 @@ from app.models import models
 from app.core import auth
 from app.schemas.user_schema import UserRead
 # from app.crud.user_crud import calculate_completion, suggest_usernames
-from app.util import util
+from app.util import util, util_leaderboard
 from dotenv import load_dotenv
 import os
 from datetime import timedelta
@@ -73,6 +73,8 @@ def authenticate_with_google(db: Session, id_token_str: str):
         db.commit()
         db.refresh(user)
 
+        util_leaderboard.add_artist(user.id)
+
     else:
         # ✅ Existing normal user logging in via Google
         # Just allow Google login, skip password checks
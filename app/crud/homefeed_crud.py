@@ -1,11 +1,14 @@
 from sqlalchemy.orm import Session, joinedload
 from app.models.models import RoleEnum
-import pandas as pd
-import numpy as np
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
+from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, or_, select
 from app.models import models
 from app.schemas.artworks_schemas import likeArt
+from app.util import util_tagindex, util_timeline
+from app.core.redis_client import get_sync_redis
+import json
 
 from passlib.context import CryptContext
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -149,136 +152,194 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 #     return feed
 
 # --------------------------------------------------------
-# 1️⃣ Load artworks and prepare tag matrix
+# 1️⃣ Recommend artworks based on tag similarity + createdAt
 # --------------------------------------------------------
-def get_artworks_and_tags(db: Session):
-    artworks = (
-        db.query(models.Artwork.id, models.Artwork.tags)
-        .filter(models.Artwork.isDeleted == False)
-        .all()
-    )
-    if not artworks:
-        return None, None
+def recommend_artworks(db: Session, current_user, limit: int = 10):
+    """Rank artworks against the ones the user liked using the shared sparse tag index."""
+    liked_ids = [
+        like.artworkId
+        for like in db.query(models.ArtworkLike.artworkId).filter_by(userId=str(current_user.id)).all()
+    ]
+    if not liked_ids:
+        return []
 
-    df = pd.DataFrame(artworks, columns=["artwork_id", "tags"])
-    df["tags"] = df["tags"].apply(lambda x: ",".join(x) if isinstance(x, list) else (x or ""))
+    index = util_tagindex.get_tag_index(db)
+    return index.similar_to(liked_ids, limit=limit)
 
-    tags_split = df["tags"].apply(lambda x: [t.strip().lower() for t in x.split(",") if t])
-    vocab = sorted({t for tags in tags_split for t in tags})
-    vocab_index = {t: i for i, t in enumerate(vocab)}
 
-    matrix = np.zeros((len(df), len(vocab)))
-    for i, tags in enumerate(tags_split):
-        for tag in tags:
-            matrix[i, vocab_index[tag]] += 1
+# --------------------------------------------------------
+# 2️⃣ Build personalized home feed (now sorted by createdAt properly)
+# --------------------------------------------------------
+# def get_home_feed(db: Session, current_user):
+#     LIMIT_FOLLOWING = 6
+#     LIMIT_TAGS = 4
+#     TOTAL_FEED = 10
 
-    row_sums = np.linalg.norm(matrix, axis=1, keepdims=True)
-    row_sums[row_sums == 0] = 1
-    matrix = matrix / row_sums
+#     following_ids = [u.id for u in current_user.following]
+#     following_artworks = (
+#         db.query(models.Artwork)
+#         .options(joinedload(models.Artwork.artist),
+#                  joinedload(models.Artwork.images))
+#         .filter(models.Artwork.artistId.in_(following_ids),
+#                 models.Artwork.artistId != current_user.id)
+#         .order_by(models.Artwork.createdAt.desc())  # newest following
+#         .limit(LIMIT_FOLLOWING)
+#         .all()
+#     )
 
-    return df, matrix
+#     seen_ids = {a.id for a in following_artworks}
 
+#     rec_ids = recommend_artworks(db, current_user, limit=LIMIT_TAGS * 2)
+#     rec_artworks = []
+#     if rec_ids:
+#         rec_artworks = (
+#             db.query(models.Artwork)
+#             .options(joinedload(models.Artwork.artist),
+#                      joinedload(models.Artwork.images))
+#             .filter(models.Artwork.id.in_(rec_ids),
+#                     models.Artwork.artistId != current_user.id,
+#                     ~models.Artwork.id.in_(seen_ids))
+#             .order_by(models.Artwork.createdAt.desc())  # newest recommended
+#             .limit(LIMIT_TAGS)
+#             .all()
+#         )
 
-# --------------------------------------------------------
-# 2️⃣ Recommend artworks based on tag similarity + createdAt
-# --------------------------------------------------------
-def recommend_artworks(db: Session, current_user, limit: int = 10):
-    df, matrix = get_artworks_and_tags(db)
-    if df is None:
-        return []
+#     # combine sections
+#     feed = following_artworks + rec_artworks
 
-    liked_ids = [like.artworkId for like in current_user.liked_artworks]
-    if not liked_ids:
-        return []
+#     # ⭐ ADD THIS → sort combined feed by createdAt DESC
+#     feed.sort(key=lambda a: a.createdAt, reverse=True)
 
-    liked_idx = df[df["artwork_id"].isin(liked_ids)].index.tolist()
-    if not liked_idx:
-        return []
+#     seen_ids.update({a.id for a in feed})
 
-    liked_matrix = matrix[liked_idx]
-    sim = liked_matrix @ matrix.T
-    avg_sim = sim.mean(axis=0)
+#     remaining = TOTAL_FEED - len(feed)
+#     if remaining > 0:
+#         extra_artworks = (
+#             db.query(models.Artwork)
+#             .options(joinedload(models.Artwork.artist),
+#                      joinedload(models.Artwork.images))
+#             .filter(models.Artwork.artistId != current_user.id,
+#                     ~models.Artwork.id.in_(seen_ids))
+#             .order_by(models.Artwork.createdAt.desc())  # newest fallback
+#             .limit(remaining)
+#             .all()
+#         )
+#         feed += extra_artworks
 
-    df["score"] = avg_sim
+#     for art in feed:
+#         art.how_many_like = likeArt(like_count=art.like_count)
 
-    rec_ids = df[~df["artwork_id"].isin(liked_ids)].copy()
+#     return feed
 
-    created_dates = dict(
-        db.query(models.Artwork.id, models.Artwork.createdAt)
-        .filter(models.Artwork.id.in_(rec_ids["artwork_id"].tolist()))
+LIMIT_FOLLOWING = 6
+LIMIT_TAGS = 4
+TOTAL_FEED = 10
+FEED_FILL_KEY = "feed:fill:{}"
+FEED_FILL_TTL = 300  # seconds
+
+
+def _feed_fill(db: Session, current_user) -> dict:
+    """Recommended + newest artwork ids used to top up the feed, cached briefly per user."""
+    key = FEED_FILL_KEY.format(current_user.id)
+    try:
+        cached = get_sync_redis().get(key)
+        if cached:
+            return json.loads(cached)
+    except Exception as e:
+        print(f"⚠️ Feed fill cache read failed: {e}")
+
+    rec_ids = recommend_artworks(db, current_user, limit=LIMIT_TAGS * 2)
+    fill = {"rec": list(rec_ids), "recent": [
+        row.id
+        for row in db.query(models.Artwork.id)
+        .filter(models.Artwork.artistId != current_user.id,
+                or_(models.Artwork.isDeleted == False, models.Artwork.isDeleted.is_(None)),
+                or_(models.Artwork.status != models.StatusENUM.hidden.value, models.Artwork.status.is_(None)))
+        .order_by(models.Artwork.createdAt.desc())
+        .limit(TOTAL_FEED + LIMIT_FOLLOWING + LIMIT_TAGS)
         .all()
+    ]}
+    try:
+        get_sync_redis().set(key, json.dumps(fill), ex=FEED_FILL_TTL)
+    except Exception:
+        pass
+    return fill
+
+
+def _feed_artworks_query(artwork_ids: list, user_id: str):
+    return (
+        select(models.Artwork)
+        .options(joinedload(models.Artwork.artist), selectinload(models.Artwork.images))
+        .where(models.Artwork.id.in_(artwork_ids),
+               models.Artwork.artistId != user_id,
+               or_(models.Artwork.isDeleted == False, models.Artwork.isDeleted.is_(None)),
+               or_(models.Artwork.status != models.StatusENUM.hidden.value, models.Artwork.status.is_(None)))
     )
 
-    rec_ids["createdAt"] = rec_ids["artwork_id"].map(created_dates)
 
-    rec_ids = rec_ids.sort_values(by=["score", "createdAt"], ascending=[False, False])
+def _load_feed_artworks(db: Session, artwork_ids: list, user_id: str) -> dict:
+    return {art.id: art for art in db.scalars(_feed_artworks_query(artwork_ids, user_id)).unique()}
 
-    return rec_ids["artwork_id"].head(limit).tolist()
 
+def _in_feed_order(arts: dict, artwork_ids: list):
+    feed = [arts[i] for i in artwork_ids if i in arts]
+    for art in feed:
+        art.how_many_like = likeArt(like_count=art.like_count)
+    return feed
 
-# --------------------------------------------------------
-# 3️⃣ Build personalized home feed (now sorted by createdAt properly)
-# --------------------------------------------------------
-def get_home_feed(db: Session, current_user):
-    LIMIT_FOLLOWING = 6
-    LIMIT_TAGS = 4
-    TOTAL_FEED = 10
-
-    following_ids = [u.id for u in current_user.following]
-    following_artworks = (
-        db.query(models.Artwork)
-        .options(joinedload(models.Artwork.artist),
-                 joinedload(models.Artwork.likes),
-                 joinedload(models.Artwork.images))
-        .filter(models.Artwork.artistId.in_(following_ids),
-                models.Artwork.artistId != current_user.id)
-        .order_by(models.Artwork.createdAt.desc())  # newest following
-        .limit(LIMIT_FOLLOWING)
-        .all()
-    )
 
-    seen_ids = {a.id for a in following_artworks}
+def hydrate_feed(db: Session, artwork_ids: list, user_id: str):
+    """Artworks of a previously computed feed, in feed order (see util_feedcache)."""
+    if not artwork_ids:
+        return []
+    return _in_feed_order(_load_feed_artworks(db, artwork_ids, user_id), artwork_ids)
 
-    rec_ids = recommend_artworks(db, current_user, limit=LIMIT_TAGS * 2)
-    rec_artworks = []
-    if rec_ids:
-        rec_artworks = (
-            db.query(models.Artwork)
-            .options(joinedload(models.Artwork.artist),
-                     joinedload(models.Artwork.likes),
-                     joinedload(models.Artwork.images))
-            .filter(models.Artwork.id.in_(rec_ids),
-                    models.Artwork.artistId != current_user.id,
-                    ~models.Artwork.id.in_(seen_ids))
-            .order_by(models.Artwork.createdAt.desc())  # newest recommended
-            .limit(LIMIT_TAGS)
-            .all()
-        )
-
-    # combine sections
-    feed = following_artworks + rec_artworks
-
-    # ⭐ ADD THIS → sort combined feed by createdAt DESC
+
+async def ahydrate_feed(db: AsyncSession, artwork_ids: list, user_id: str):
+    """hydrate_feed on the async session."""
+    if not artwork_ids:
+        return []
+    result = await db.scalars(_feed_artworks_query(artwork_ids, user_id))
+    return _in_feed_order({art.id: art for art in result.unique()}, artwork_ids)
+
+
+def get_home_feed(db: Session, current_user):
+    """
+    Followed artists' newest artworks (Redis timeline, see util_timeline), then tag
+    recommendations, topped up with the newest artworks. All candidates are hydrated
+    in one query.
+    """
+    following_ids = util_timeline.get_timeline_ids(db, current_user.id, LIMIT_FOLLOWING * 2)
+    fill = _feed_fill(db, current_user)
+
+    candidate_ids = list(dict.fromkeys(following_ids + fill["rec"] + fill["recent"]))
+    if not candidate_ids:
+        return []
+    arts = _load_feed_artworks(db, candidate_ids, current_user.id)
+
+    # followed artists: only what passed moderation (and was not hidden since)
+    feed = [
+        arts[i] for i in following_ids
+        if i in arts and arts[i].status == models.StatusENUM.visible.value
+    ][:LIMIT_FOLLOWING]
+    seen_ids = {a.id for a in feed}
+
+    rec_artworks = sorted(
+        (arts[i] for i in fill["rec"] if i in arts and i not in seen_ids),
+        key=lambda a: a.createdAt, reverse=True
+    )[:LIMIT_TAGS]
+    feed += rec_artworks
     feed.sort(key=lambda a: a.createdAt, reverse=True)
+    seen_ids.update(a.id for a in rec_artworks)
 
-    seen_ids.update({a.id for a in feed})
-
-    remaining = TOTAL_FEED - len(feed)
-    if remaining > 0:
-        extra_artworks = (
-            db.query(models.Artwork)
-            .options(joinedload(models.Artwork.artist),
-                     joinedload(models.Artwork.likes),
-                     joinedload(models.Artwork.images))
-            .filter(models.Artwork.artistId != current_user.id,
-                    ~models.Artwork.id.in_(seen_ids))
-            .order_by(models.Artwork.createdAt.desc())  # newest fallback
-            .limit(remaining)
-            .all()
-        )
-        feed += extra_artworks
+    for i in fill["recent"]:
+        if len(feed) >= TOTAL_FEED:
+            break
+        if i in arts and i not in seen_ids:
+            feed.append(arts[i])
+            seen_ids.add(i)
 
     for art in feed:
-        art.how_many_like = likeArt(like_count=len(art.likes))
+        art.how_many_like = likeArt(like_count=art.like_count)
 
     return feed
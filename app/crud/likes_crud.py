@@ -7,6 +7,8 @@ from app.models import models
 from app.models.models import RoleEnum
 # from app.schemas import schemas
 from passlib.context import CryptContext
+from sqlalchemy.exc import IntegrityError
+from app.util import util_likecount, util_feedcache
 # import cloudinary.uploader
 # import cloudinary
 # from typing import List, Optional, Dict
@@ -34,7 +36,15 @@ def like_artwork(db, user_id, artwork_id):
 
     new_like = models.ArtworkLike(userId=user_id, artworkId=artwork_id)
     db.add(new_like)
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()  # a concurrent request liked it first
+        return {"message": "Artwork already liked."}
+    _add_to_like_count(db, artwork_id, 1)
     db.commit()
+    util_likecount.bump(artwork_id, 1)
+    util_feedcache.bump(user_id)
     return {"message": "Artwork liked successfully."}
 
 
@@ -42,18 +52,30 @@ def unlike_artwork(db, user_id, artwork_id):
     user_id = str(user_id)
     artwork_id = str(artwork_id)
 
-    like = db.query(models.ArtworkLike).filter_by(userId=user_id, artworkId=artwork_id).first()
-    if not like:
+    deleted = (
+        db.query(models.ArtworkLike)
+        .filter_by(userId=user_id, artworkId=artwork_id)
+        .delete(synchronize_session=False)
+    )
+    if not deleted:
         return {"message": "Artwork not liked yet."}
 
-    db.delete(like)
+    _add_to_like_count(db, artwork_id, -1)
     db.commit()
+    util_likecount.bump(artwork_id, -1)
+    util_feedcache.bump(user_id)
     return {"message": "Artwork unliked successfully."}
 
 
+def _add_to_like_count(db, artwork_id: str, delta: int):
+    """Atomic in-place UPDATE (no read-modify-write), committed together with the like row."""
+    db.query(models.Artwork).filter(models.Artwork.id == artwork_id).update(
+        {models.Artwork.like_count: models.Artwork.like_count + delta}, synchronize_session=False
+    )
+
+
 def get_like_count(db, artwork_id):
-    artwork_id = str(artwork_id)
-    return db.query(models.ArtworkLike).filter_by(artworkId=artwork_id).count()
+    return util_likecount.get_count(db, str(artwork_id))
 
 
 def has_user_liked_artwork(db, user_id, artwork_id):
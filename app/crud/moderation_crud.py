@@ -12,8 +12,8 @@ from uuid import UUID
 from pydantic import BaseModel, Field, model_validator
 
 from app.models.models import (
-    Artwork, Comment, Review, ArtistReview,
-    ModerationQueue, User
+    Artwork, Comment, Review, ArtistReview, BlogComment,
+    ModerationQueue, User, StatusENUM
 )
 
 # -------------------------------
@@ -82,7 +82,8 @@ MODEL_CLASS_MAPPING = {
     "artworks": Artwork,
     "comments": Comment,
     "reviews": Review,
-    "artist_reviews": ArtistReview
+    "artist_reviews": ArtistReview,
+    "blog_comment": BlogComment
 }
 
 def add_to_moderation(db: Session, table_name: str, content_id: str):
@@ -97,6 +98,25 @@ def add_to_moderation(db: Session, table_name: str, content_id: str):
     db.refresh(queue_item)
     return queue_item
 
+def review_content(db: Session, queue_id: str, approved: bool) -> Optional[ModerationQueue]:
+    """
+    Close a moderation queue item: the content becomes visible (approved) or hidden.
+    Returns the queue item, or None if it does not exist.
+    """
+    queue_item = db.query(ModerationQueue).filter_by(id=str(queue_id)).first()
+    if not queue_item:
+        return None
+
+    ModelClass = MODEL_CLASS_MAPPING.get(queue_item.table_name)
+    content = db.query(ModelClass).filter_by(id=queue_item.content_id).first() if ModelClass else None
+    if content is not None:
+        content.status = StatusENUM.visible.value if approved else StatusENUM.hidden.value
+
+    queue_item.checked = True
+    db.commit()
+    db.refresh(queue_item)
+    return queue_item
+
 def create_content_generic(db: Session, data: GenericContentCreate):
     """
     Generic content creation function for all types.
@@ -1,12 +1,13 @@
 from fastapi import Depends
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import or_, literal, select, union_all
 from uuid import UUID
 from app.database import get_db
 from app.models import models
 from app.schemas.artworks_schemas import ArtworkRead
 from typing import List, Set
 from app.schemas.artworks_schemas import ArtworkRead, ArtworkArtist, ArtworkOnly
+from app.util import util_tagindex, util_randompool, util_visual
 
 def parse_tags(tags) -> set:
     """Safely parse tags (list or comma-separated string) into lowercase set."""
@@ -20,191 +21,305 @@ def parse_tags(tags) -> set:
         tag_set.update([tag.strip().lower() for tag in tags.split(",") if tag.strip()])
     return tag_set
 
-# RECOMMENDATION BY ARTWORK TAGS AND CATEGORY
+# # RECOMMENDATION BY ARTWORK TAGS AND CATEGORY
+# def recommend_artworks(db: Session, artwork_id: UUID, limit: int = 10) -> List[ArtworkRead]:
+#     """
+#     Recommend artworks based primarily on category and tags.
+#     Falls back to random artworks if no strong matches are found.
+#     Returns a list of validated ArtworkRead Pydantic models.
+#     """
+#     artwork_id_str = str(artwork_id)
+
+#     # 1️⃣ Fetch target artwork
+#     target = (
+#         db.query(models.Artwork)
+#         .options(
+#             joinedload(models.Artwork.artist),
+#             joinedload(models.Artwork.images),
+#         )
+#         .filter(models.Artwork.id == artwork_id_str, models.Artwork.isDeleted == False)
+#         .first()
+#     )
+#     if not target:
+#         return []
+
+#     # 2️⃣ Extract category and tags (ignore missing)
+#     target_category = target.category.lower() if target.category else None
+#     target_tags = parse_tags(target.tags)
+#     target_title_words = set(target.title.lower().split()) if target.title else set()
+
+#     # 3️⃣ Fetch all candidate artworks except target
+#     candidates = (
+#         db.query(models.Artwork)
+#         .options(
+#             joinedload(models.Artwork.artist),
+#             joinedload(models.Artwork.images),
+#         )
+#         .filter(models.Artwork.id != artwork_id_str, models.Artwork.isDeleted == False)
+#         .all()
+#     )
+
+#     # 4️⃣ Score candidates
+#     scored = {}
+#     for art in candidates:
+#         score = 0
+
+#         # ✅ Category match — strong weight
+#         if target_category and art.category and target_category == art.category.lower():
+#             score += 3
+
+#         # ✅ Tag overlap — medium weight
+#         art_tags = parse_tags(art.tags)
+#         score += len(target_tags & art_tags) * 2  # each shared tag adds weight
+
+#         # ✅ Title word similarity — weak fallback
+#         if art.title:
+#             art_words = set(art.title.lower().split())
+#             score += len(target_title_words & art_words)
+
+#         if score > 0:
+#             scored[art] = score
+
+#     # 5️⃣ Sort by descending score
+#     sorted_artworks = sorted(scored.keys(), key=lambda a: scored[a], reverse=True)
+
+#     # 6️⃣ Fallback: random if no matches
+#     if not sorted_artworks:
+#         sorted_artworks = (
+#             db.query(models.Artwork)
+#             .filter(models.Artwork.id != artwork_id_str, models.Artwork.isDeleted == False)
+#             .order_by(func.random())
+#             .limit(limit)
+#             .all()
+#         )
+
+#     # 7️⃣ Limit results and return as Pydantic models
+#     top_artworks = sorted_artworks[:limit]
+#     return [ArtworkRead.model_validate(art, from_attributes=True) for art in top_artworks]
+
+# RECOMMENDATION BY ARTWORK TAGS AND CATEGORY (precomputed, see util_similarity)
 def recommend_artworks(db: Session, artwork_id: UUID, limit: int = 10) -> List[ArtworkRead]:
     """
-    Recommend artworks based primarily on category and tags.
-    Falls back to random artworks if no strong matches are found.
+    Most similar artworks (category, tags, title words) read from artwork_similarities.
+    Falls back to random artworks if none were found.
     Returns a list of validated ArtworkRead Pydantic models.
     """
     artwork_id_str = str(artwork_id)
 
-    # 1️⃣ Fetch target artwork
-    target = (
-        db.query(models.Artwork)
-        .options(
-            joinedload(models.Artwork.artist),
-            joinedload(models.Artwork.likes),
-            joinedload(models.Artwork.images),
-        )
-        .filter(models.Artwork.id == artwork_id_str, models.Artwork.isDeleted == False)
-        .first()
-    )
-    if not target:
-        return []
-
-    # 2️⃣ Extract category and tags (ignore missing)
-    target_category = target.category.lower() if target.category else None
-    target_tags = parse_tags(target.tags)
-    target_title_words = set(target.title.lower().split()) if target.title else set()
-
-    # 3️⃣ Fetch all candidate artworks except target
-    candidates = (
-        db.query(models.Artwork)
-        .options(
-            joinedload(models.Artwork.artist),
-            joinedload(models.Artwork.likes),
-            joinedload(models.Artwork.images),
-        )
-        .filter(models.Artwork.id != artwork_id_str, models.Artwork.isDeleted == False)
+    similar_ids = [
+        row.similar_id
+        for row in db.query(models.ArtworkSimilarity.similar_id)
+        .filter(models.ArtworkSimilarity.artwork_id == artwork_id_str)
+        .order_by(models.ArtworkSimilarity.rank)
+        .limit(limit)
         .all()
-    )
+    ]
 
-    # 4️⃣ Score candidates
-    scored = {}
-    for art in candidates:
-        score = 0
-
-        # ✅ Category match — strong weight
-        if target_category and art.category and target_category == art.category.lower():
-            score += 3
-
-        # ✅ Tag overlap — medium weight
-        art_tags = parse_tags(art.tags)
-        score += len(target_tags & art_tags) * 2  # each shared tag adds weight
-
-        # ✅ Title word similarity — weak fallback
-        if art.title:
-            art_words = set(art.title.lower().split())
-            score += len(target_title_words & art_words)
-
-        if score > 0:
-            scored[art] = score
-
-    # 5️⃣ Sort by descending score
-    sorted_artworks = sorted(scored.keys(), key=lambda a: scored[a], reverse=True)
-
-    # 6️⃣ Fallback: random if no matches
-    if not sorted_artworks:
-        sorted_artworks = (
-            db.query(models.Artwork)
-            .filter(models.Artwork.id != artwork_id_str, models.Artwork.isDeleted == False)
-            .order_by(func.random())
-            .limit(limit)
+    if similar_ids:
+        arts = {
+            art.id: art
+            for art in db.query(models.Artwork)
+            .options(joinedload(models.Artwork.artist), selectinload(models.Artwork.images))
+            .filter(models.Artwork.id.in_(similar_ids),
+                    or_(models.Artwork.isDeleted == False, models.Artwork.isDeleted.is_(None)))
             .all()
-        )
+        }
+        recommended = [arts[i] for i in similar_ids if i in arts]
+        if recommended:
+            return [ArtworkRead.model_validate(art, from_attributes=True) for art in recommended]
+
+    # Fallback: random if no matches (or not computed yet)
+    recommended = _random_artworks(db, limit, exclude=[artwork_id_str])
+    return [ArtworkRead.model_validate(art, from_attributes=True) for art in recommended]
+
+# # RECOMMENDATION BY USERS INTERRACTION FOR PERSONALIZED DISCOVER FEED
+# def list_recommendations(db: Session, current_user, limit: int | None = None) -> List[models.Artwork]:
+#     """
+#     Personalized recommendations:
+#       - If user logged in: based on liked/saved/commented artworks (tags + categories)
+#       - If no user: random artworks
+#       - If no interactions yet: random artworks
+#     """
+#     # Guest user → random artworks
+#     if not current_user:
+#         query = (
+#             db.query(models.Artwork)
+#             .filter(models.Artwork.isDeleted == False)
+#             .order_by(func.random())
+#         )
+#         if limit:
+#             query = query.limit(limit)
+#         return query.options(
+#             joinedload(models.Artwork.artist),
+#             joinedload(models.Artwork.images)
+#         ).all()
+
+#     user_id = str(current_user.id)
+
+#     # 1️⃣ Fetch interacted artworks (liked, saved, commented)
+#     liked_ids = [x.artworkId for x in db.query(models.ArtworkLike.artworkId).filter_by(userId=user_id).all()]
+#     saved_ids = [x.artworkId for x in db.query(models.Saved.artworkId).filter_by(userId=user_id).all()]
+#     commented_ids = []
+#     if hasattr(models, "ArtworkComment"):
+#         commented_ids = [x.artworkId for x in db.query(models.ArtworkComment.artworkId).filter_by(userId=user_id).all()]
+
+#     interacted_ids = set(liked_ids + saved_ids + commented_ids)
+
+#     # 🩶 If user hasn’t interacted → show random
+#     if not interacted_ids:
+#         query = (
+#             db.query(models.Artwork)
+#             .filter(models.Artwork.isDeleted == False)
+#             .order_by(func.random())
+#         )
+#         if limit:
+#             query = query.limit(limit)
+#         return query.options(
+#             joinedload(models.Artwork.artist),
+#             joinedload(models.Artwork.images)
+#         ).all()
+
+#     # 2️⃣ Extract categories and tags
+#     interacted_artworks = (
+#         db.query(models.Artwork)
+#         .filter(models.Artwork.id.in_(list(interacted_ids)))
+#         .all()
+#     )
+
+#     user_tags = set()
+#     user_categories = set()
+#     for art in interacted_artworks:
+#         user_tags |= parse_tags(art.tags)
+#         if art.category:
+#             user_categories.add(art.category.lower())
+
+#     # 3️⃣ Fetch candidate artworks
+#     candidates = (
+#         db.query(models.Artwork)
+#         .filter(models.Artwork.id.notin_(list(interacted_ids)),
+#                 models.Artwork.isDeleted == False)
+#         .options(
+#             joinedload(models.Artwork.artist),
+#             joinedload(models.Artwork.images)
+#         )
+#         .all()
+#     )
+
+#     # 4️⃣ Score each candidate based on tag/category match
+#     scored = {}
+#     for art in candidates:
+#         score = 0
+#         if art.category and art.category.lower() in user_categories:
+#             score += 3
+#         art_tags = parse_tags(art.tags)
+#         score += len(user_tags & art_tags) * 2
+#         if score > 0:
+#             scored[art] = score
+
+#     # 5️⃣ Sort by relevance
+#     sorted_artworks = sorted(scored.keys(), key=lambda a: scored[a], reverse=True)
+
+#     # 6️⃣ Fallback to random if no matches
+#     if not sorted_artworks:
+#         query = (
+#             db.query(models.Artwork)
+#             .filter(models.Artwork.isDeleted == False)
+#             .order_by(func.random())
+#         )
+#         if limit:
+#             query = query.limit(limit)
+#         return query.options(
+#             joinedload(models.Artwork.artist),
+#             joinedload(models.Artwork.images)
+#         ).all()
+
+#     # ✅ Optional limit if specified
+#     if limit:
+#         sorted_artworks = sorted_artworks[:limit]
+
+#     return sorted_artworks
+
+# VISUALLY SIMILAR ARTWORKS (colour / layout vectors, see util_visual)
+def recommend_visual(db: Session, artwork_id: UUID, limit: int = 10) -> List[ArtworkRead]:
+    """
+    Artworks whose images look most like the given artwork's.
+    Falls back to the tag / category recommendations if the artwork has no image vectors yet.
+    """
+    artwork_id_str = str(artwork_id)
+    similar_ids = util_visual.similar_artworks(db, artwork_id_str, limit=limit)
+    if not similar_ids:
+        return recommend_artworks(db, artwork_id, limit=limit)
+
+    arts = {
+        art.id: art
+        for art in db.query(models.Artwork)
+        .options(joinedload(models.Artwork.artist), selectinload(models.Artwork.images))
+        .filter(models.Artwork.id.in_(similar_ids),
+                or_(models.Artwork.isDeleted == False, models.Artwork.isDeleted.is_(None)))
+        .all()
+    }
+    return [ArtworkRead.model_validate(arts[i], from_attributes=True) for i in similar_ids if i in arts]
+
+# RECOMMENDATION BY USERS INTERRACTION FOR PERSONALIZED DISCOVER FEED (vectorised, see util_tagindex)
+INTERACTION_WEIGHTS = {"like": 1.0, "save": 2.0, "comment": 1.5}
+
+
+def _random_artworks(db: Session, limit: int | None, exclude=()) -> List[models.Artwork]:
+    """Random artworks from the random pool (see util_randompool), in pick order."""
+    ids = util_randompool.sample(db, limit or None, exclude=exclude)
+    if not ids:
+        return []
+    arts = {
+        art.id: art
+        for art in db.query(models.Artwork)
+        .options(joinedload(models.Artwork.artist), selectinload(models.Artwork.images))
+        .filter(models.Artwork.id.in_(ids), models.Artwork.isDeleted == False)
+        .all()
+    }
+    return [arts[i] for i in ids if i in arts]
+
+
+def _interaction_weights(db: Session, user_id: str) -> dict:
+    """{artwork_id: summed weight} over the user's likes, saves and comments, in one query."""
+    interactions = union_all(
+        select(models.ArtworkLike.artworkId.label("artworkId"), literal("like").label("kind"))
+        .where(models.ArtworkLike.userId == user_id),
+        select(models.Saved.artworkId.label("artworkId"), literal("save").label("kind"))
+        .where(models.Saved.userId == user_id),
+        select(models.Comment.artwork_id.label("artworkId"), literal("comment").label("kind"))
+        .where(models.Comment.user_id == user_id),
+    )
+    weights = {}
+    for artwork_id, kind in db.execute(interactions):
+        weights[artwork_id] = weights.get(artwork_id, 0.0) + INTERACTION_WEIGHTS[kind]
+    return weights
 
-    # 7️⃣ Limit results and return as Pydantic models
-    top_artworks = sorted_artworks[:limit]
-    return [ArtworkRead.model_validate(art, from_attributes=True) for art in top_artworks]
 
-# RECOMMENDATION BY USERS INTERRACTION FOR PERSONALIZED DISCOVER FEED
 def list_recommendations(db: Session, current_user, limit: int | None = None) -> List[models.Artwork]:
     """
     Personalized recommendations:
-      - If user logged in: based on liked/saved/commented artworks (tags + categories)
+      - If user logged in: artworks sharing tags / category with the ones they liked, saved
+        or commented on (weighted by INTERACTION_WEIGHTS), scored in one sparse product
       - If no user: random artworks
       - If no interactions yet: random artworks
     """
     # Guest user → random artworks
     if not current_user:
-        query = (
-            db.query(models.Artwork)
-            .filter(models.Artwork.isDeleted == False)
-            .order_by(func.random())
-        )
-        if limit:
-            query = query.limit(limit)
-        return query.options(
-            joinedload(models.Artwork.artist),
-            joinedload(models.Artwork.likes),
-            joinedload(models.Artwork.images)
-        ).all()
-
-    user_id = str(current_user.id)
-
-    # 1️⃣ Fetch interacted artworks (liked, saved, commented)
-    liked_ids = [x.artworkId for x in db.query(models.ArtworkLike.artworkId).filter_by(userId=user_id).all()]
-    saved_ids = [x.artworkId for x in db.query(models.Saved.artworkId).filter_by(userId=user_id).all()]
-    commented_ids = []
-    if hasattr(models, "ArtworkComment"):
-        commented_ids = [x.artworkId for x in db.query(models.ArtworkComment.artworkId).filter_by(userId=user_id).all()]
-
-    interacted_ids = set(liked_ids + saved_ids + commented_ids)
-
-    # 🩶 If user hasn’t interacted → show random
-    if not interacted_ids:
-        query = (
-            db.query(models.Artwork)
-            .filter(models.Artwork.isDeleted == False)
-            .order_by(func.random())
-        )
-        if limit:
-            query = query.limit(limit)
-        return query.options(
-            joinedload(models.Artwork.artist),
-            joinedload(models.Artwork.likes),
-            joinedload(models.Artwork.images)
-        ).all()
-
-    # 2️⃣ Extract categories and tags
-    interacted_artworks = (
-        db.query(models.Artwork)
-        .filter(models.Artwork.id.in_(list(interacted_ids)))
-        .all()
-    )
+        return _random_artworks(db, limit)
 
-    user_tags = set()
-    user_categories = set()
-    for art in interacted_artworks:
-        user_tags |= parse_tags(art.tags)
-        if art.category:
-            user_categories.add(art.category.lower())
-
-    # 3️⃣ Fetch candidate artworks
-    candidates = (
-        db.query(models.Artwork)
-        .filter(models.Artwork.id.notin_(list(interacted_ids)),
-                models.Artwork.isDeleted == False)
-        .options(
-            joinedload(models.Artwork.artist),
-            joinedload(models.Artwork.likes),
-            joinedload(models.Artwork.images)
-        )
-        .all()
-    )
+    weights = _interaction_weights(db, str(current_user.id))
+    if not weights:
+        return _random_artworks(db, limit)
+
+    ranked_ids = util_tagindex.get_tag_index(db).score_profile(weights, limit=limit or None)
+    if not ranked_ids:
+        return _random_artworks(db, limit)
 
-    # 4️⃣ Score each candidate based on tag/category match
-    scored = {}
-    for art in candidates:
-        score = 0
-        if art.category and art.category.lower() in user_categories:
-            score += 3
-        art_tags = parse_tags(art.tags)
-        score += len(user_tags & art_tags) * 2
-        if score > 0:
-            scored[art] = score
-
-    # 5️⃣ Sort by relevance
-    sorted_artworks = sorted(scored.keys(), key=lambda a: scored[a], reverse=True)
-
-    # 6️⃣ Fallback to random if no matches
-    if not sorted_artworks:
-        query = (
-            db.query(models.Artwork)
-            .filter(models.Artwork.isDeleted == False)
-            .order_by(func.random())
-        )
-        if limit:
-            query = query.limit(limit)
-        return query.options(
-            joinedload(models.Artwork.artist),
-            joinedload(models.Artwork.likes),
-            joinedload(models.Artwork.images)
-        ).all()
-
-    # ✅ Optional limit if specified
-    if limit:
-        sorted_artworks = sorted_artworks[:limit]
-
-    return sorted_artworks
\ No newline at end of file
+    arts = {
+        art.id: art
+        for art in db.query(models.Artwork)
+        .options(joinedload(models.Artwork.artist), selectinload(models.Artwork.images))
+        .filter(models.Artwork.id.in_(ranked_ids), models.Artwork.isDeleted == False)
+        .all()
+    }
+    return [arts[i] for i in ranked_ids if i in arts]
@@ -7,6 +7,7 @@ from app.models import models
 from app.models.models import RoleEnum
 from app.schemas import saved_schemas
 from passlib.context import CryptContext
+from app.util import util_feedcache
 # import cloudinary.uploader
 # import cloudinary
 # from typing import List, Optional, Dict
@@ -31,6 +32,7 @@ def add_to_Saved(db: Session, item: saved_schemas.SavedCreate, user_id: UUID):
     db.add(db_Saved)
     db.commit()
     db.refresh(db_Saved)
+    util_feedcache.bump(db_Saved.userId)  # isSaved flag on the feed
     return db_Saved
 
 def get_user_Saved(db: Session, user_id: UUID):
@@ -51,4 +53,5 @@ def remove_Saved_item(db: Session, user_id: UUID, artwork_id: UUID):
         )
     db.delete(item)
     db.commit()
+    util_feedcache.bump(str(user_id))
     return {"status": "success", "message": "Item removed from Saved"}
\ No newline at end of file
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_ , and_, func, text, desc
+from sqlalchemy import or_ , and_, func, text, desc, case
 # from fastapi import HTTPException, UploadFile, File, status
 # from uuid import UUID
 # from uuid import UUID, uuid4
@@ -23,7 +23,7 @@ from sqlalchemy import func
 from sqlalchemy.orm import Session
 from app.models import models
 # from app.crud.user_crud import get_user_rating_info
-from app.util import util_artistrank
+from app.util import util_artistrank, util_search
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -31,17 +31,51 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 # SEARCH OPERATIONS
 # -------------------------
 
-def search_artworks(db: Session, query: str):  # ilike is use for searh in MYSQL
-    return db.query(models.Artwork).filter(
-        or_(
-            models.Artwork.title.ilike(f"%{query}%"),
-            models.Artwork.description.ilike(f"%{query}%"),
-            models.Artwork.category.ilike(f"%{query}%"),
-            models.Artwork.tags.ilike(f"%{query}%")
-            )).all()
-
-def search_users(db: Session, query: str):
-    # Fetch users matching the query
+# def search_artworks(db: Session, query: str):  # ilike is use for searh in MYSQL
+#     return db.query(models.Artwork).filter(
+#         or_(
+#             models.Artwork.title.ilike(f"%{query}%"),
+#             models.Artwork.description.ilike(f"%{query}%"),
+#             models.Artwork.category.ilike(f"%{query}%"),
+#             models.Artwork.tags.ilike(f"%{query}%")
+#             )).all()
+
+def search_artworks(db: Session, query: str, skip: int = 0, limit: int = 20):
+    """Ranked page from the inverted index (util_search), hydrated with one query."""
+    live = or_(models.Artwork.isDeleted == False, models.Artwork.isDeleted.is_(None))
+    result = util_search.search(db, query, skip, limit)
+    if result is None:
+        # index not built yet on this host (first seconds after a deploy): plain scan
+        pattern = f"%{query}%"
+        return (
+            db.query(models.Artwork)
+            .options(joinedload(models.Artwork.images))
+            .filter(live, or_(
+                models.Artwork.title.ilike(pattern),
+                models.Artwork.description.ilike(pattern),
+                models.Artwork.category.ilike(pattern),
+                models.Artwork.tags.ilike(pattern),
+            ))
+            .order_by(models.Artwork.createdAt.desc())
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+    ids, _ = result
+    if not ids:
+        return []
+    artworks = (
+        db.query(models.Artwork)
+        .options(joinedload(models.Artwork.images))
+        .filter(models.Artwork.id.in_(ids), live)
+        .all()
+    )
+    by_id = {art.id: art for art in artworks}
+    return [by_id[i] for i in ids if i in by_id]
+
+def search_users(db: Session, query: str, skip: int = 0, limit: int = 20):
+    # Fetch one page of users matching the query, username prefix matches first
+    pattern = f"%{query}%"
     users = (
         db.query(
             models.User.id,
@@ -55,18 +89,26 @@ def search_users(db: Session, query: str):
         )
         .filter(
             or_(
-                models.User.username.ilike(f"%{query}%"),
-                models.User.name.ilike(f"%{query}%")
+                models.User.username.ilike(pattern),
+                models.User.name.ilike(pattern)
             )
         )
+        .order_by(
+            case((models.User.username.ilike(f"{query}%"), 0), else_=1),
+            models.User.username
+        )
+        .offset(skip)
+        .limit(limit)
         .all()
     )
 
+    # ✅ Rating info for the whole page in one go
+    ratings = util_artistrank.get_rating_info_bulk(db, [u.id for u in users])
+
     result = []
 
     for u in users:
-        # ✅ Fetch rating info per user
-        rating_info = util_artistrank.get_user_rating_info(db, u.id)  
+        rating_info = ratings[str(u.id)]
 
         result.append({
             "id": str(u.id),
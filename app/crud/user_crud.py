@@ -22,8 +22,9 @@ from app.models.models import User
 from typing import Optional
 from sqlalchemy import func, desc
 from decimal import Decimal
-from app.util import util, util_artistrank
+from app.util import util, util_artistrank, util_leaderboard, util_cache
 from app.crud import follow_crud
+from app.core import media_jobs
 from uuid import UUID
 
 
@@ -85,44 +86,21 @@ def get_user_by_email(db: Session, email: str):
 #         "following": following_data
 #     }
 
-def get_user(db: Session, user_id: str, current_user=None):
-    # Convert to UUID if possible
-    try:
-        uid = UUID(str(user_id))
-    except ValueError:
-        return None
-
-    # Detect column type and compare correctly
-    if isinstance(User.id.type.python_type(), type) and User.id.type.python_type() is UUID:
-        # DB stores UUID natively
-        user = db.query(User).filter(User.id == uid).first()
-    else:
-        # DB stores UUID as string
-        user = db.query(User).filter(User.id == str(uid)).first()
+USER_PROFILE_CACHE_TTL = 120        # seconds; rank and follower usernames/avatars may lag by this much
+USER_PROFILE_CACHE_STALE_TTL = 600  # seconds served stale while one request reloads
 
+@util_cache.cached(key="user:{user_id}", ttl=USER_PROFILE_CACHE_TTL, stale_ttl=USER_PROFILE_CACHE_STALE_TTL)
+def get_user_profile(db: Session, user_id: str) -> Optional[dict]:
+    """
+    Viewer-independent public profile (rating, rank, followers), cached under user:{id}.
+    user_id must be a canonical UUID string.
+    """
+    user = db.query(User).filter(User.id == user_id).first()
     if not user:
         return None
 
     rating_info = util_artistrank.get_user_rating_info(db, str(user.id))
 
-    # Reviewed?
-    is_reviewed = False
-    if current_user:
-        review_exists = db.query(models.ArtistReview).filter(
-            models.ArtistReview.artist_id == str(user.id),
-            models.ArtistReview.reviewer_id == str(current_user.id)
-        ).first()
-        is_reviewed = review_exists is not None
-        
-    # isFollowing?
-    is_following = False
-    if current_user:
-        is_following = follow_crud.is_user_following(
-            db,
-            follower_id=current_user.id,
-            following_id=user.id
-        )
-    
     # Follow
     followers = follow_crud.get_followers(db, user.id)
     following = follow_crud.get_following(db, user.id)
@@ -140,8 +118,6 @@ def get_user(db: Session, user_id: str, current_user=None):
         "weightedRating": rating_info["weightedRating"],
         "reviewCount": rating_info["reviewCount"],
         "rank": rating_info["rank"],
-        "is_reviewed": is_reviewed,
-        "is_following": is_following,  
         "followers": {
             "users": [follow_crud.serialize_user(u) for u in followers],
             "count": len(followers),
@@ -152,6 +128,51 @@ def get_user(db: Session, user_id: str, current_user=None):
         },
     }
 
+
+@util_cache.cached(key="username:{username}", ttl=USER_PROFILE_CACHE_TTL, tags=lambda row: [f"user:{row['id']}"])
+def get_user_id_by_username(db: Session, username: str) -> Optional[dict]:
+    user_id = db.query(User.id).filter(User.username == username).scalar()
+    return {"id": str(user_id)} if user_id else None
+
+
+@util_cache.cached(key="userref:{user_id}", ttl=USER_PROFILE_CACHE_TTL, tags=lambda row: [f"user:{row['id']}"])
+def get_username_by_id(db: Session, user_id: str) -> Optional[dict]:
+    """id -> username only; user_id must be a canonical UUID string."""
+    username = db.query(User.username).filter(User.id == user_id).scalar()
+    return {"id": user_id, "username": username} if username else None
+
+
+def get_user(db: Session, user_id: str, viewer_id: Optional[str] = None):
+    # Convert to UUID if possible
+    try:
+        uid = UUID(str(user_id))
+    except ValueError:
+        return None
+
+    profile = get_user_profile(db, str(uid))
+    if not profile:
+        return None
+
+    # Reviewed?
+    is_reviewed = False
+    if viewer_id:
+        review_exists = db.query(models.ArtistReview.id).filter(
+            models.ArtistReview.artist_id == profile["id"],
+            models.ArtistReview.reviewer_id == str(viewer_id)
+        ).first()
+        is_reviewed = review_exists is not None
+        
+    # isFollowing?
+    is_following = False
+    if viewer_id:
+        is_following = follow_crud.is_user_following(
+            db,
+            follower_id=str(viewer_id),
+            following_id=profile["id"]
+        )
+
+    return {**profile, "is_reviewed": is_reviewed, "is_following": is_following}
+
 def get_user_by_username(db: Session, username: str):
     return db.query(models.User).filter(models.User.username == username).first()
 
@@ -180,6 +201,8 @@ def create_user(db: Session, user: user_schema.UserCreate):
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+
+    util_leaderboard.add_artist(db_user.id)
     return db_user
 
 # Update User (progressive registration)
@@ -209,6 +232,7 @@ def update_user_details(db: Session, user_id: int, user_update: user_schema.User
 
     db.commit()
     db.refresh(db_user)
+    util_cache.invalidate(f"user:{db_user.id}")
     return db_user
 
 ALLOWED_MIME_TYPES = {"image/jpeg", "image/png", "image/svg+xml"}
@@ -263,14 +287,6 @@ def update_user_profile_image(db: Session, user_id: UUID, file: UploadFile):
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Delete previous image if present
-    if user.profileImagePublicId:
-        try:
-            deletion_result = cloudinary.uploader.destroy(user.profileImagePublicId)
-            print("[DEBUG] Deleted old image:", deletion_result)
-        except Exception as e:
-            print("[ERROR] Could not delete old image:", str(e))
-
     # Upload new image
     try:
         result = cloudinary.uploader.upload(file.file, folder="user_profiles")
@@ -279,11 +295,14 @@ def update_user_profile_image(db: Session, user_id: UUID, file: UploadFile):
         print("[ERROR] Cloudinary upload failed:", str(e))
         raise HTTPException(status_code=500, detail=f"Cloudinary error: {str(e)}")
 
-    # Save new image URL and public_id
+    # Save new image URL and public_id; the previous image is deleted out-of-band
+    old_public_id = user.profileImagePublicId
     user.profileImage = result["secure_url"]
     user.profileImagePublicId = result["public_id"]
+    media_jobs.enqueue_destroy(db, [old_public_id])
     db.commit()
     db.refresh(user)
+    util_cache.invalidate(f"user:{user.id}", f"artist:{user.id}")
 
     return {
         "message": "Profile image uploaded successfully",
@@ -0,0 +1,48 @@
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import literal, select, union_all
+from typing import Dict, Iterable, Optional
+from app.models import models
+
+# -------------------------
+# VIEWER STATE (liked / saved / in cart)
+# -------------------------
+
+
+def _viewer_state_query(user_id: str, ids: list):
+    return union_all(
+        select(models.ArtworkLike.artworkId.label("artworkId"), literal("isLike").label("flag"))
+        .where(models.ArtworkLike.userId == user_id, models.ArtworkLike.artworkId.in_(ids)),
+        select(models.Saved.artworkId.label("artworkId"), literal("isSaved").label("flag"))
+        .where(models.Saved.userId == user_id, models.Saved.artworkId.in_(ids)),
+        select(models.Cart.artworkId.label("artworkId"), literal("isInCart").label("flag"))
+        .where(models.Cart.userId == user_id, models.Cart.artworkId.in_(ids)),
+    )
+
+
+def _viewer_state(ids: list, rows) -> Dict[str, dict]:
+    state = {artwork_id: {"isLike": False, "isSaved": False, "isInCart": False} for artwork_id in ids}
+    for artwork_id, flag in rows:
+        state[artwork_id][flag] = True
+    return state
+
+
+def get_viewer_state(db: Session, user_id: Optional[str], artwork_ids: Iterable[str]) -> Dict[str, dict]:
+    """
+    For the given artwork ids, which ones `user_id` has liked, saved or put in the cart,
+    answered with a single UNION ALL over artwork_likes / saved / cart.
+    Returns {artwork_id: {"isLike": bool, "isSaved": bool, "isInCart": bool}} for every requested id,
+    or {} for anonymous viewers (callers then leave the flags as None).
+    """
+    ids = list(dict.fromkeys(str(artwork_id) for artwork_id in artwork_ids))
+    if not user_id or not ids:
+        return {}
+    return _viewer_state(ids, db.execute(_viewer_state_query(str(user_id), ids)))
+
+
+async def aget_viewer_state(db: AsyncSession, user_id: Optional[str], artwork_ids: Iterable[str]) -> Dict[str, dict]:
+    """get_viewer_state on the async session."""
+    ids = list(dict.fromkeys(str(artwork_id) for artwork_id in artwork_ids))
+    if not user_id or not ids:
+        return {}
+    return _viewer_state(ids, await db.execute(_viewer_state_query(str(user_id), ids)))
@@ -1,4 +1,6 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -25,4 +27,38 @@ def get_db():
     finally:
         db.close()
 
+# -------------------------
+# ASYNC ENGINE
+# -------------------------
+# For I/O-bound `async def` routes (feed, artwork detail, chat): queries are awaited on the
+# event loop instead of holding a threadpool thread each. Same database as DATABASE_URL
+# through the matching async driver (mysql -> aiomysql, sqlite -> aiosqlite), unless
+# ASYNC_DATABASE_URL says otherwise.
+
+ASYNC_DRIVERS = {"mysql": "aiomysql", "sqlite": "aiosqlite"}
+
+def async_database_url(url: str) -> str:
+    url = make_url(url)
+    backend = url.get_backend_name()
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS.get(backend, url.get_driver_name())}").render_as_string(
+        hide_password=False
+    )
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_database_url(DATABASE_URL)
+_async_pool_options = {} if ASYNC_DATABASE_URL.startswith("sqlite") else {
+    "pool_size": int(os.getenv("ASYNC_DB_POOL_SIZE", "20")),
+    "max_overflow": int(os.getenv("ASYNC_DB_MAX_OVERFLOW", "20")),
+    "pool_recycle": 1800,   # below MySQL's wait_timeout
+    "pool_pre_ping": True,
+}
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_async_pool_options)
+
+# expire_on_commit=False: attributes stay readable after commit without an implicit (sync) refresh
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+# Dependency for async FastAPI routes
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 print(os.getenv("DATABASE_URL"))
\ No newline at end of file
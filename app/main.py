@@ -3,18 +3,23 @@ from fastapi import FastAPI
 # from app.api.routes import admin_router, user_router
 from app.api.public_routes import router
 from app.api.admin_routes import admin_router
-from app.api.protected_routes import user_router
+from app.api.protected_routes import user_router, feed_router
 from app.api.chat_routes import chat_router
-from app.database import engine, Base
+from app.database import engine, async_engine, Base
 from app.models import models
 from fastapi.middleware.cors import CORSMiddleware
 # from config import settings
 from app.core.redis_client import get_redis_client
+from app.core.chat_broker import chat_broker
+from app.core.chat_writer import chat_writer
+from app.core import background, media_jobs
+from app.util import util_unread, util_likecount, util_similarity, util_randompool, util_visual, util_cache, util_tagindex, util_search, util_artistrank
 from contextlib import asynccontextmanager
+import asyncio
 import os
 from dotenv import load_dotenv
 import json
-from app.core.admin_logger import AdminLoggerMiddleware
+from app.core.admin_logger import AdminAuditMiddleware, audit_writer
 
 load_dotenv(dotenv_path=r"C:\Users\ghara\OneDrive\Desktop\parth\FastAPI\app\.env")
 
@@ -28,9 +33,32 @@ async def lifespan(app: FastAPI):
     redis_client = get_redis_client()
     await redis_client.connect()
     print("✅ Redis connected successfully")
+    await chat_broker.start()
+    await chat_writer.start()
+    await audit_writer.start()
+    background.start_periodic("reconcile_unread", util_unread.RECONCILE_INTERVAL, util_unread.reconcile_unread)
+    background.start_periodic("reconcile_like_counts", util_likecount.RECONCILE_INTERVAL, util_likecount.reconcile_like_counts)
+    background.start_periodic("refresh_similarities", util_similarity.REFRESH_INTERVAL, util_similarity.refresh_similarities)
+    background.start_periodic("refresh_random_pool", util_randompool.REFRESH_INTERVAL, util_randompool.refresh_pool)
+    background.start_periodic("refresh_visual_index", util_visual.REFRESH_INTERVAL, util_visual.refresh_visual_index)
+    background.start_periodic("drain_media_jobs", media_jobs.DRAIN_INTERVAL, media_jobs.drain_media_jobs)
+    background.start_periodic("refresh_tag_index", util_tagindex.REFRESH_INTERVAL, util_tagindex.refresh_tag_index)
+    background.start_periodic("refresh_search_index", util_search.REFRESH_INTERVAL, util_search.refresh_search_index)
+    background.start_periodic("rerank_artists", util_artistrank.RERANK_INTERVAL, util_artistrank.rerank_artists)
+    background.start_task("cache_invalidation_listener", util_cache.listen())
 
     yield
 
+    await background.stop_all()
+    for name, flush in (("Tag", util_tagindex.refresh_tag_index), ("Search", util_search.refresh_search_index)):
+        try:
+            await asyncio.to_thread(flush)  # write queued artwork changes
+        except Exception as e:
+            print(f"⚠️ {name} index flush failed: {e}")
+    await chat_writer.stop()
+    await audit_writer.stop()
+    await chat_broker.stop()
+    await async_engine.dispose()
     await redis_client.close()
     print("🛑 Redis connection closed")
 
@@ -50,10 +78,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
-# Add the admin logger middleware
-app.add_middleware(AdminLoggerMiddleware)
+# Audit log of admin calls (pure ASGI, batched writes)
+app.add_middleware(AdminAuditMiddleware)
 
 @app.get("/")
 def root():
@@ -75,6 +104,7 @@ async def redis_health():
 app.include_router(router, prefix="/api", tags=["public"])
 app.include_router(admin_router, prefix="/api/admin", tags=["admin"])
 app.include_router(user_router, prefix="/api/auth", tags=["authorized"])
+app.include_router(feed_router, prefix="/api/auth", tags=["authorized"])
 app.include_router(chat_router, prefix="/api/auth/chat", tags=["Chat"])
 
 print(os.getenv("ALLOWED_ORIGIN"))
\ No newline at end of file
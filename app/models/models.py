@@ -1,8 +1,8 @@
 from sqlalchemy import (
     Column, String, Float, Text, Enum, Boolean, ForeignKey,
-    Integer, DateTime, CHAR, Table, JSON
+    Integer, DateTime, CHAR, Table, JSON, UniqueConstraint, Index, LargeBinary
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, backref
 from datetime import datetime
 import uuid
 import enum
@@ -73,6 +73,15 @@ class FeedbackStatusEnum(str, enum.Enum):
     reviewed = "reviewed"
     resolved = "resolved"
 
+# -------------------------
+# MEDIA JOB ENUM
+# -------------------------
+
+class MediaJobStatusEnum(str, enum.Enum):
+    pending = "pending"
+    running = "running"
+    dead = "dead"
+
 # -------------------------
 # FOLLOWERS ASSOCIATION TABLE
 # -------------------------
@@ -153,6 +162,12 @@ class User(Base):
 
 class Artwork(Base):
     __tablename__ = "artworks"
+    __table_args__ = (
+        # keyset listing (artworks_crud.list_artworks_page), optionally filtered
+        Index("ix_artworks_created_id", "createdAt", "id"),
+        Index("ix_artworks_category_created_id", "category", "createdAt", "id"),
+        Index("ix_artworks_forsale_created_id", "forSale", "createdAt", "id"),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     title = Column(String(200), nullable=False)
@@ -172,6 +187,7 @@ class Artwork(Base):
     isSold = Column(Boolean, default=False)
     isDeleted = Column(Boolean, default=False)    
     forSale = Column(Boolean, default=False)     
+    like_count = Column(Integer, nullable=False, default=0, server_default="0")  # kept in step with artwork_likes by likes_crud
 
     # Relationships
     artist = relationship("User", back_populates="artworks")
@@ -196,11 +212,31 @@ class ArtworkImage(Base):
     artwork_id = Column(String(36), ForeignKey("artworks.id"))
     url = Column(String(500), nullable=False)       # Cloudinary URLs can be long
     public_id = Column(String(255), nullable=False) # public_id is shorter
+    visual_vector = Column(LargeBinary, nullable=True) # float16 features, see util_visual
 
 
     # Relationships
     artwork = relationship("Artwork", back_populates="images")
 
+# -------------------------
+# ARTWORK SIMILARITIES
+# -------------------------
+# Top-K most similar artworks per artwork, precomputed by util_similarity
+# for the artwork page recommendations.
+
+class ArtworkSimilarity(Base):
+    __tablename__ = "artwork_similarities"
+    __table_args__ = (
+        Index("ix_artwork_similarities_lookup", "artwork_id", "rank"),
+        Index("ix_artwork_similarities_similar", "similar_id"),
+    )
+
+    # no foreign keys: derived data, rows of removed artworks are cleared by the refresh job
+    artwork_id = Column(String(36), primary_key=True)
+    similar_id = Column(String(36), primary_key=True)
+    score = Column(Float, nullable=False)
+    rank = Column(Integer, nullable=False)  # 0 = most similar
+
 # -------------------------
 # ARTWORK LIKES
 # -------------------------
@@ -297,6 +333,25 @@ class ArtistReview(Base):
     reviewer = relationship("User", foreign_keys=[reviewer_id], backref="artist_reviews_made")
     artist = relationship("User", foreign_keys=[artist_id], backref="artist_reviews_received")
 
+# -------------------------
+# ARTIST RATING STATS MODEL
+# -------------------------
+
+class ArtistRatingStats(Base):
+    __tablename__ = "artist_rating_stats"
+
+    # One row per artist with at least one review, kept in sync by util_artistrank
+    artist_id = Column(String(36), ForeignKey("users.id"), primary_key=True)
+    rating_sum = Column(Integer, nullable=False, default=0)
+    review_count = Column(Integer, nullable=False, default=0)
+    avg_rating = Column(Float, nullable=False, default=0.0)
+    weighted_rating = Column(Float, nullable=False, default=0.0, index=True)  # Bayesian average
+    rank = Column(Integer, nullable=True, index=True)                         # dense rank by weighted_rating
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    artist = relationship("User", backref=backref("rating_stats", uselist=False))
+
 # -------------------------
 # SAVED MODEL
 # -------------------------
@@ -338,10 +393,15 @@ class Cart(Base):
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # history pages are range reads on this index (see chat_crud.get_messages_between)
+        Index("ix_messages_conversation_history", "conversation_key", "timestamp", "id"),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     sender_id = Column(String(36), ForeignKey("users.id"), nullable=False)
     receiver_id = Column(String(36), ForeignKey("users.id"), nullable=False)
+    conversation_key = Column(String(73), nullable=False)  # chat_crud.pair_key(sender_id, receiver_id)
     content = Column(Text, nullable=True)  # Can be empty for typing
     # timestamp = Column(DateTime, default=datetime.utcnow)
     timestamp = Column(DateTime, nullable=False)
@@ -352,6 +412,33 @@ class Message(Base):
     sender = relationship("User", foreign_keys=[sender_id])
     receiver = relationship("User", foreign_keys=[receiver_id])
 
+# -------------------------
+# CONVERSATION MODEL
+# -------------------------
+# One summary row per participant of a chat (owner -> partner), kept up to date
+# by chat_crud on every message insert and read, so the chat list is a single
+# indexed range read.
+
+class Conversation(Base):
+    __tablename__ = "conversations"
+    __table_args__ = (
+        UniqueConstraint("owner_id", "partner_id", name="uq_conversations_owner_partner"),
+        Index("ix_conversations_owner_activity", "owner_id", "last_message_at", "id"),
+    )
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    owner_id = Column(String(36), ForeignKey("users.id"), nullable=False)
+    partner_id = Column(String(36), ForeignKey("users.id"), nullable=False)
+    pair_key = Column(String(73), nullable=False, index=True)  # "<smaller id>:<larger id>"
+    last_message_id = Column(String(36), nullable=True)
+    last_message_preview = Column(String(255), nullable=True)
+    last_message_type = Column(String(20), default="text")
+    last_message_at = Column(DateTime, nullable=False)
+    unread_count = Column(Integer, nullable=False, default=0)  # partner's messages unread by owner
+
+    # Relationships
+    partner = relationship("User", foreign_keys=[partner_id])
+
 # -------------------------
 # PAYMENT MODEL
 # -------------------------
@@ -407,6 +494,28 @@ class ModerationQueue(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     checked = Column(Boolean, default=False)
 
+# -------------------------
+# MEDIA JOB QUEUE MODEL
+# -------------------------
+# Remote media operations (Cloudinary destroys) run out-of-band by app.core.media_jobs.
+# Rows are enqueued in the same transaction as the DB change they belong to and deleted
+# once the job succeeds; jobs that keep failing end up "dead" with their last error.
+
+class MediaJob(Base):
+    __tablename__ = "media_jobs"
+    __table_args__ = (
+        Index("ix_media_jobs_status_run_after", "status", "run_after"),
+    )
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    action = Column(String(20), nullable=False)       # "destroy"
+    public_id = Column(String(255), nullable=False)
+    status = Column(String(20), nullable=False, default=MediaJobStatusEnum.pending.value)
+    attempts = Column(Integer, nullable=False, default=0)
+    run_after = Column(DateTime, nullable=False, default=datetime.utcnow)  # next attempt / lease expiry
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
 # ============================================================
 #                COMMUNITY SYSTEM (ONLY THESE TABLES)
 # ============================================================
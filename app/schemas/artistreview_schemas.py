@@ -38,7 +38,13 @@ class ArtistRatingSummary(BaseModel): # for calculating average rating
     reviewCount: int
     username: Optional[str] = None
     profileImage: Optional[str] = None
+    rank: Optional[int] = None
 
     model_config = {
         "from_attributes": True
-    }    
\ No newline at end of file
+    }
+
+class ArtistLeaderboardPosition(BaseModel): # position = dense rank, same as ArtistRatingSummary.rank
+    artistId: UUID
+    position: int
+    weightedRating: float
\ No newline at end of file
@@ -115,6 +115,9 @@ class ArtworkUpdate(BaseModel):
     isSold: Optional[bool] = None
     images: List[ArtworkImageRead] = Field(default_factory=list)
 
+class ArtworkAdminUpdate(ArtworkUpdate): # ADMINS CAN ALSO MODERATE
+    status: Optional[StatusENUM] = None
+
 class ArtworkCreateResponse(BaseModel): # MESSAGE AFTER CREATION
     message: str
     artwork: ArtworkRead
@@ -158,3 +161,12 @@ class ArtworkCommunityJoin(BaseModel):
 
     class Config:
         from_attributes = True 
+
+class ArtworkStateRequest(BaseModel):
+    artworkIds: List[str] = Field(..., min_length=1, max_length=200)
+
+class ArtworkState(BaseModel):
+    artworkId: str
+    isLike: bool
+    isSaved: bool
+    isInCart: bool
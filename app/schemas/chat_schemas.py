@@ -103,6 +103,7 @@ class MessageCreate(MessageBase):
 # Schema for returning messages
 # -------------------------
 class MessageOut(BaseModel):
+    id: Optional[str] = None
     sender_id: str
     receiver_id: str
     content: Optional[str] = None
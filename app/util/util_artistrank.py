@@ -1,5 +1,8 @@
+from datetime import datetime
 from sqlalchemy import or_ , and_, func, text, desc
+from sqlalchemy.dialects import mysql, sqlite
 from app.models import models
+from app.core.background import acquire_job_lock
 
 # 4)HELPER CLASS FOR AVGRATING, REVIEW COUNT AND CALCULATING RANK
 
@@ -62,71 +65,192 @@ from app.models import models
 #         "rank": rank
 #     }
 
-def get_user_rating_info(db, user_id, m=5):
+# Bayesian prior weight: an artist needs about this many reviews before their own average dominates
+BAYESIAN_M = 5
+RERANK_INTERVAL = 60  # seconds; other artists' weighted ratings/ranks follow a review within this
+
+
+def _weighted(avg_rating: float, review_count: int, global_avg: float, m: int = BAYESIAN_M) -> float:
+    if review_count <= 0:
+        return 0.0   # no-review artists get 0
+    return (review_count / (review_count + m)) * avg_rating + (m / (review_count + m)) * global_avg
+
+
+def _rerank(db, global_avg: float) -> dict:
     """
-    Compute fair artist rating using Bayesian average.
-    Fixes incorrect ranking of artists with no reviews.
+    Recompute weighted ratings and dense ranks of every reviewed artist from their stored sums.
+    Returns {artist_id: weighted_rating} for the artists whose weighted rating moved.
     """
+    stats = db.query(models.ArtistRatingStats).filter(models.ArtistRatingStats.review_count > 0).all()
+
+    changed = {}
+    for row in stats:
+        weighted = _weighted(row.avg_rating, row.review_count, global_avg)
+        if row.weighted_rating != weighted:
+            row.weighted_rating = weighted
+            changed[row.artist_id] = weighted
+
+    distinct = sorted({row.weighted_rating for row in stats}, reverse=True)
+    dense = {w: idx for idx, w in enumerate(distinct, start=1)}
+    for row in stats:
+        if row.rank != dense[row.weighted_rating]:
+            row.rank = dense[row.weighted_rating]
+
+    return changed
+
+
+def _global_avg(db) -> float:
+    totals = db.query(
+        func.sum(models.ArtistRatingStats.rating_sum),
+        func.sum(models.ArtistRatingStats.review_count)
+    ).first()
+    total_sum, total_count = totals
+    return float(total_sum) / int(total_count) if total_count else 0.0
+
 
-    # Step 1: Get avg rating and review count for this artist
-    rating_data = (
+def _stats_upsert(db):
+    """INSERT ... ON DUPLICATE KEY (MySQL) / ON CONFLICT (SQLite) for ArtistRatingStats rows."""
+    columns = ("rating_sum", "review_count", "avg_rating", "updated_at")
+    if db.get_bind().dialect.name == "mysql":
+        stmt = mysql.insert(models.ArtistRatingStats)
+        return stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in columns})
+    stmt = sqlite.insert(models.ArtistRatingStats)
+    return stmt.on_conflict_do_update(index_elements=["artist_id"], set_={c: stmt.excluded[c] for c in columns})
+
+
+def refresh_artist_rating(db, artist_id):
+    """
+    Update one artist's materialized stats, weighted rating and rank after a review write.
+    Only that artist's row is written; the shift of the global average on everyone else is
+    applied by rerank_artists() (background job). Returns {artist_id: weighted_rating}.
+    """
+    artist_id = str(artist_id)
+    total, count = (
         db.query(
-            func.avg(models.ArtistReview.rating).label("avgRating"),
-            func.count(models.ArtistReview.id).label("reviewCount")
+            func.sum(models.ArtistReview.rating),
+            func.count(models.ArtistReview.id)
         )
-        .filter(models.ArtistReview.artist_id == str(user_id))
+        .filter(models.ArtistReview.artist_id == artist_id)
         .first()
     )
+    count = int(count or 0)
+    avg_rating = float(total or 0) / count if count else 0.0
 
-    avg_rating = float(rating_data.avgRating or 0.0)
-    review_count = int(rating_data.reviewCount or 0)
+    # upsert: two concurrent first reviews of an artist must not collide on the primary key
+    db.execute(_stats_upsert(db), [{
+        "artist_id": artist_id,
+        "rating_sum": int(total or 0),
+        "review_count": count,
+        "avg_rating": avg_rating,
+        "updated_at": datetime.utcnow(),
+    }])
 
-    # Step 2: Global average rating (C) — only from artists who have reviews
-    global_avg = (
-        db.query(func.avg(models.ArtistReview.rating))
-        .filter(models.ArtistReview.rating.isnot(None))
+    weighted = _weighted(avg_rating, count, _global_avg(db))
+    higher = (
+        db.query(func.count(func.distinct(models.ArtistRatingStats.weighted_rating)))
+        .filter(models.ArtistRatingStats.review_count > 0,
+                models.ArtistRatingStats.weighted_rating > weighted,
+                models.ArtistRatingStats.artist_id != artist_id)
         .scalar()
     )
-    global_avg = float(global_avg or 0.0)
-
-    # Step 3: Weighted rating (Bayesian formula)
-    weighted_rating = (
-        (review_count / (review_count + m)) * avg_rating
-        + (m / (review_count + m)) * global_avg
-        if review_count > 0 else 0.0   # ✅ zero if no reviews
+    db.query(models.ArtistRatingStats).filter(models.ArtistRatingStats.artist_id == artist_id).update(
+        {"weighted_rating": weighted, "rank": int(higher or 0) + 1}, synchronize_session=False
     )
+    db.commit()
+    return {artist_id: weighted}
+
+
+def rerank_artists():
+    """Background job: re-weight and re-rank every reviewed artist; only moved rows are written."""
+    if not acquire_job_lock("rerank_artists", RERANK_INTERVAL - 5):
+        return
+
+    from app.database import SessionLocal
+    from app.util import util_leaderboard
+
+    db = SessionLocal()
+    try:
+        changed = _rerank(db, _global_avg(db))
+        db.commit()
+    finally:
+        db.close()
+    util_leaderboard.update_scores(changed)
 
-    # Step 4: Compute weighted ratings for all artists to rank
-    artist_stats = (
+
+def rebuild_artist_ratings(db):
+    """Recompute the whole artist_rating_stats table from artist_reviews (recovery / backfill)."""
+    aggregates = (
         db.query(
-            models.User.id.label("artist_id"),
-            func.avg(models.ArtistReview.rating).label("avgRating"),
-            func.count(models.ArtistReview.id).label("reviewCount")
+            models.ArtistReview.artist_id,
+            func.sum(models.ArtistReview.rating).label("total"),
+            func.count(models.ArtistReview.id).label("count")
         )
-        .outerjoin(models.ArtistReview, models.User.id == models.ArtistReview.artist_id)
-        .group_by(models.User.id)
+        .group_by(models.ArtistReview.artist_id)
         .all()
     )
 
-    ranked_artists = []
-    for artist in artist_stats:
-        R = float(artist.avgRating or 0.0)
-        v = int(artist.reviewCount or 0)
-        w_rating = (
-            (v / (v + m)) * R + (m / (v + m)) * global_avg
-            if v > 0 else 0.0   # ✅ no-review artists get 0
-        )
-        ranked_artists.append((artist.artist_id, w_rating))
+    db.query(models.ArtistRatingStats).delete()
+    for row in aggregates:
+        db.add(models.ArtistRatingStats(
+            artist_id=row.artist_id,
+            rating_sum=int(row.total or 0),
+            review_count=int(row.count),
+            avg_rating=float(row.total or 0) / int(row.count) if row.count else 0.0,
+        ))
+    db.flush()
+
+    _rerank(db, _global_avg(db))
+    db.commit()
 
-    # Step 5: Sort descending by weighted rating
-    ranked_artists.sort(key=lambda x: x[1], reverse=True)
 
-    # Step 6: Find this artist's rank
-    rank = next((idx for idx, (a_id, _) in enumerate(ranked_artists, start=1) if str(a_id) == str(user_id)), None)
+def unreviewed_rank(db) -> int:
+    """Dense rank shared by every artist whose weighted rating is 0 (i.e. no reviews)."""
+    top = (
+        db.query(func.max(models.ArtistRatingStats.rank))
+        .filter(models.ArtistRatingStats.weighted_rating > 0)
+        .scalar()
+    )
+    return int(top or 0) + 1
 
+
+def rating_info_from_stats(stats, zero_rank: int) -> dict:
+    if not stats or not stats.review_count:
+        return {"avgRating": 0.0, "reviewCount": 0, "weightedRating": 0.0, "rank": zero_rank}
     return {
-        "avgRating": avg_rating,
-        "reviewCount": review_count,
-        "weightedRating": weighted_rating,
-        "rank": rank
+        "avgRating": stats.avg_rating,
+        "reviewCount": stats.review_count,
+        "weightedRating": stats.weighted_rating,
+        "rank": stats.rank,
     }
+
+
+def get_user_rating_info(db, user_id):
+    """
+    Fair artist rating (Bayesian average) and dense rank, read from the
+    materialized artist_rating_stats table.
+    """
+    stats = db.get(models.ArtistRatingStats, str(user_id))
+    if stats and stats.review_count:
+        return rating_info_from_stats(stats, zero_rank=0)
+    return rating_info_from_stats(None, zero_rank=unreviewed_rank(db))
+
+
+def get_rating_info_bulk(db, user_ids) -> dict:
+    """
+    Rating info for many users at once: one IN query on artist_rating_stats, plus one
+    more for the shared rank of unreviewed artists if any user has no reviews.
+    Returns {user_id: rating_info}.
+    """
+    user_ids = [str(u) for u in user_ids]
+    if not user_ids:
+        return {}
+
+    stats = (
+        db.query(models.ArtistRatingStats)
+        .filter(models.ArtistRatingStats.artist_id.in_(user_ids))
+        .all()
+    )
+    by_id = {row.artist_id: row for row in stats if row.review_count}
+
+    zero_rank = unreviewed_rank(db) if len(by_id) < len(set(user_ids)) else 0
+    return {uid: rating_info_from_stats(by_id.get(uid), zero_rank) for uid in user_ids}
@@ -0,0 +1,60 @@
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.models import models
+from app.util import util_tagindex, util_search, util_similarity, util_randompool, util_cache, util_timeline
+
+# -------------------------
+# ARTWORK CHANGE HOOKS
+# -------------------------
+# Called by the CRUD layer after an artwork write is committed so that derived
+# indexes stay in sync. A failing index must never fail the request itself.
+
+def artwork_saved(db: Session, artwork: models.Artwork, previous_status: Optional[str] = None, background_tasks=None):
+    """
+    Artwork created or updated (soft-deleted artworks are dropped from the indexes).
+    `previous_status` is the status before the write, when the caller changed it: an
+    artwork that just became visible is fanned out to its followers' timelines, through
+    `background_tasks` when given so the request does not wait for it.
+    """
+    try:
+        util_tagindex.index_artwork(db, artwork)
+    except Exception as e:
+        print(f"⚠️ Tag index update failed for {artwork.id}: {e}")
+    try:
+        util_search.index_artwork(db, artwork)
+    except Exception as e:
+        print(f"⚠️ Search index update failed for {artwork.id}: {e}")
+    util_similarity.mark_dirty(artwork.id)
+    status_changed = previous_status is not None and previous_status != artwork.status
+    if status_changed:
+        util_cache.invalidate(f"artwork:{artwork.id}", f"artist:{artwork.artistId}")
+    else:
+        util_cache.invalidate(f"artwork:{artwork.id}")
+    if artwork.isDeleted or artwork.status == models.StatusENUM.hidden.value:
+        util_randompool.remove(artwork.id)
+    else:
+        util_randompool.add(artwork.id)
+
+    if status_changed and artwork.status == models.StatusENUM.visible.value and not artwork.isDeleted:
+        if background_tasks is not None:
+            background_tasks.add_task(util_timeline.fan_out_artwork, artwork.id)
+        else:
+            try:
+                util_timeline.fan_out_artwork(artwork.id)
+            except Exception as e:
+                print(f"⚠️ Timeline fan-out failed for {artwork.id}: {e}")
+
+
+def artwork_removed(db: Session, artwork_id: str):
+    """Artwork soft-deleted or hard-deleted."""
+    try:
+        util_tagindex.remove_artwork(db, str(artwork_id))
+    except Exception as e:
+        print(f"⚠️ Tag index removal failed for {artwork_id}: {e}")
+    try:
+        util_search.remove_artwork(db, str(artwork_id))
+    except Exception as e:
+        print(f"⚠️ Search index removal failed for {artwork_id}: {e}")
+    util_similarity.mark_dirty(artwork_id)
+    util_randompool.remove(artwork_id)
+    util_cache.invalidate(f"artwork:{artwork_id}")
@@ -1,30 +1,626 @@
+import asyncio
+import functools
+import inspect
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta
-import json
-from app.core.redis_client import get_redis_client
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+import orjson
+from pydantic import BaseModel
+from app.core.redis_client import get_redis_client, get_sync_redis
 
 redis_client = get_redis_client()  # shared singleton instance
 
+# -------------------------
+# TWO-TIER CACHE
+# -------------------------
+# L1: per-process TTL/LRU (LocalCache), bounded by L1_MAX_ENTRIES, holding the serialized
+#     bytes so callers can never mutate a cached value. Entries live at most L1_TTL seconds,
+#     which bounds staleness if an invalidation message is missed.
+# L2: Redis, shared by every worker.
+#     cache:{key}        orjson envelope {"v": value, "x": fresh until (epoch), "d": load time (s)},
+#                        kept for ttl + stale_ttl seconds
+#     cache:tag:{tag}    SET of the keys tagged with tag
+#     cache:lock:{name}  single-flight lock of a recomputation
+#
+# Every entry is tagged with its own key, so invalidate("artwork:<id>") drops the artwork
+# detail and invalidate("artist:<id>") everything that embeds that artist. invalidate() deletes
+# the L2 keys and PUBLISHes the tags on INVALIDATE_CHANNEL; listen() (started in the app
+# lifespan) drops the matching L1 entries in every worker.
+#
+# Stampede protection (cached() and get_or_load()):
+#   - a missing entry is loaded once: concurrent callers in a process share the leader's result
+#     (single_flight), and across processes only the cache:lock holder loads while the others
+#     poll for its result;
+#   - an expired entry still inside its stale_ttl window is served stale while the one caller
+#     that takes the lock reloads it (stale-while-revalidate);
+#   - before expiry each read reloads early with probability growing as expiry nears, scaled by
+#     how long the load took (XFetch), so hot keys are normally refreshed before they expire.
+#
+# If Redis is unavailable reads fall through to L1 and then to the loader; nothing raises.
 
-async def get_cache(key: str):
-    """Retrieve a cached value from Redis (as a Python object)."""
+KEY_PREFIX = "cache:"
+TAG_PREFIX = "cache:tag:"
+INVALIDATE_CHANNEL = "cache:invalidate"
+DEFAULT_TTL = 300                                              # seconds, L2
+TAG_TTL = 24 * 3600                                            # seconds, never shorter than a tagged entry
+L1_TTL = int(os.getenv("CACHE_L1_TTL", "30"))                  # seconds
+L1_MAX_ENTRIES = int(os.getenv("CACHE_L1_MAX_ENTRIES", "10000"))
+LOCK_PREFIX = "cache:lock:"
+LOCK_TTL = 10           # seconds a loader may hold a single-flight lock
+LOCK_POLL = 0.05        # seconds between checks while another worker loads
+EARLY_BETA = 1.0        # XFetch: > 1 refreshes earlier, 0 disables early refresh
+
+_node_id = uuid.uuid4().hex  # own invalidation messages were already applied locally
+
+
+# -------------------------
+# SERIALIZATION
+# -------------------------
+
+def _default(value):
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Cannot cache value of type {type(value).__name__}")
+
+
+def dumps(value) -> bytes:
+    return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def loads(data):
+    return orjson.loads(data)
+
+
+# -------------------------
+# L1 (IN-PROCESS)
+# -------------------------
+
+class LocalCache:
+    """Thread-safe TTL + LRU map of key -> serialized bytes, with a tag index for invalidation."""
+
+    def __init__(self, max_entries: int = L1_MAX_ENTRIES, ttl: int = L1_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, bytes, Tuple[str, ...]]]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= time.monotonic():
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, data: bytes, tags: Iterable[str] = (), ttl: Optional[int] = None):
+        tags = tuple(dict.fromkeys((key, *tags)))
+        expires_at = time.monotonic() + min(ttl or self.ttl, self.ttl)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (expires_at, data, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        dropped = 0
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._drop(key)
+                    dropped += 1
+        self.invalidations += dropped
+        return dropped
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+    def _drop(self, key: str):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+local_cache = LocalCache()
+
+
+def stats() -> dict:
+    return {"l1": local_cache.stats()}
+
+
+# -------------------------
+# L2 (REDIS)
+# -------------------------
+
+def _pack(value, ttl: int, delta: float) -> bytes:
+    return dumps({"v": value, "x": round(time.time() + ttl, 3), "d": round(delta, 4)})
+
+
+def _needs_refresh(entry: dict, beta: float) -> bool:
+    """XFetch: true once expired, and increasingly often in the last few load-times before that."""
+    return time.time() - entry["d"] * beta * math.log(1.0 - random.random()) >= entry["x"]
+
+
+def _l2_set(pipe, key: str, data: bytes, tags: Tuple[str, ...], ttl: int):
+    pipe.set(KEY_PREFIX + key, data, ex=ttl)
+    for tag in tags:
+        pipe.sadd(TAG_PREFIX + tag, key)
+        pipe.expire(TAG_PREFIX + tag, max(ttl, TAG_TTL))
+
+
+def get_raw(key: str) -> Optional[bytes]:
+    """The stored envelope (bytes) from L1, else L2."""
+    data = local_cache.get(key)
+    if data is not None:
+        return data
+    try:
+        data = get_sync_redis().get(KEY_PREFIX + key)
+    except Exception as e:
+        print(f"⚠️ Cache read failed for {key}: {e}")
+        return None
+    if data is None:
+        return None
+    data = data.encode() if isinstance(data, str) else data
+    local_cache.set(key, data)
+    return data
+
+
+def get(key: str, default=None):
+    data = get_raw(key)
+    return default if data is None else loads(data)["v"]
+
+
+def put(key: str, value, ttl: int = DEFAULT_TTL, tags: Iterable[str] = (), stale_ttl: int = 0, delta: float = 0.0) -> bytes:
+    data = _pack(value, ttl, delta)
+    tags = tuple(dict.fromkeys((key, *tags)))
+    local_cache.set(key, data, tags, ttl + stale_ttl)
+    try:
+        pipe = get_sync_redis().pipeline(transaction=False)
+        _l2_set(pipe, key, data, tags, ttl + stale_ttl)
+        pipe.execute()
+    except Exception as e:
+        print(f"⚠️ Cache write failed for {key}: {e}")
+    return data
+
+
+def invalidate(*tags: str):
+    """Drop every entry tagged with any of `tags` (an entry's key is one of its tags), everywhere."""
+    tags = [t for t in tags if t]
+    if not tags:
+        return
+    local_cache.invalidate(tags)
+    try:
+        r = get_sync_redis()
+        pipe = r.pipeline(transaction=False)
+        for tag in tags:
+            pipe.smembers(TAG_PREFIX + tag)
+        # L1 entries filled from L2 only know their own key, so the tagged keys are dropped by name too
+        keys = sorted({k for members in pipe.execute() for k in members} - {""})
+        local_cache.invalidate(keys)
+        r.delete(*(KEY_PREFIX + k for k in (*keys, *tags)), *(TAG_PREFIX + t for t in tags))
+        r.publish(INVALIDATE_CHANNEL, dumps({"node": _node_id, "tags": [*tags, *keys]}))
+    except Exception as e:
+        print(f"⚠️ Cache invalidation failed for {tags}: {e}")
+
+
+# async variants for routes running on the event loop
+
+async def _async_redis():
     if not redis_client.redis:
         await redis_client.connect()
+    return redis_client.redis
+
+
+async def aget_raw(key: str) -> Optional[bytes]:
+    data = local_cache.get(key)
+    if data is not None:
+        return data
+    try:
+        data = await (await _async_redis()).get(KEY_PREFIX + key)
+    except Exception as e:
+        print(f"⚠️ Cache read failed for {key}: {e}")
+        return None
+    if data is None:
+        return None
+    data = data.encode() if isinstance(data, str) else data
+    local_cache.set(key, data)
+    return data
+
+
+async def aget(key: str, default=None):
+    data = await aget_raw(key)
+    return default if data is None else loads(data)["v"]
+
+
+async def aput(key: str, value, ttl: int = DEFAULT_TTL, tags: Iterable[str] = (), stale_ttl: int = 0, delta: float = 0.0) -> bytes:
+    data = _pack(value, ttl, delta)
+    tags = tuple(dict.fromkeys((key, *tags)))
+    local_cache.set(key, data, tags, ttl + stale_ttl)
+    try:
+        pipe = (await _async_redis()).pipeline(transaction=False)
+        _l2_set(pipe, key, data, tags, ttl + stale_ttl)
+        await pipe.execute()
+    except Exception as e:
+        print(f"⚠️ Cache write failed for {key}: {e}")
+    return data
+
+
+async def ainvalidate(*tags: str):
+    await asyncio.to_thread(invalidate, *tags)
+
+
+# -------------------------
+# SINGLE-FLIGHT
+# -------------------------
+
+# compare-and-delete: a lock that outlived LOCK_TTL and was taken over is never released by its old owner
+_RELEASE_LOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_flights: Dict[str, _Flight] = {}
+_flights_lock = threading.Lock()
+_async_flights: Dict[str, "asyncio.Future"] = {}
 
-    data = await redis_client.redis.get(key)
-    if data:
+
+def _acquire(name: str) -> Optional[str]:
+    """Token if this caller may load `name`, None if another worker holds the lock."""
+    token = uuid.uuid4().hex
+    try:
+        return token if get_sync_redis().set(LOCK_PREFIX + name, token, nx=True, ex=LOCK_TTL) else None
+    except Exception as e:
+        print(f"⚠️ Cache lock unavailable for {name}: {e}")
+        return ""  # no Redis: in-process coalescing only
+
+
+def _release(name: str, token: Optional[str]):
+    if not token:
+        return
+    try:
+        get_sync_redis().eval(_RELEASE_LOCK, 1, LOCK_PREFIX + name, token)
+    except Exception as e:
+        print(f"⚠️ Cache lock release failed for {name}: {e}")
+
+
+def _run_locked(name: str, compute: Callable[[], Any], ready: Optional[Callable[[], Any]], wait: float):
+    deadline = time.monotonic() + wait
+    while True:
+        token = _acquire(name)
+        if token is not None or time.monotonic() >= deadline:  # past the deadline the holder is presumed dead
+            try:
+                return compute()
+            finally:
+                _release(name, token)
+        time.sleep(LOCK_POLL)
+        value = ready() if ready else None
+        if value:
+            return value
+
+
+def single_flight(name: str, compute: Callable[[], Any], ready: Optional[Callable[[], Any]] = None, wait: float = LOCK_TTL):
+    """
+    Run compute() for `name` once at a time, cluster-wide.
+    Concurrent callers in this process wait for the leader and share its result. In other
+    processes only the holder of cache:lock:{name} computes; the rest poll ready() and return
+    its first truthy result, or compute themselves after `wait` seconds.
+    Results shared between threads must be immutable (cached() shares serialized bytes).
+    """
+    with _flights_lock:
+        flight = _flights.get(name)
+        leader = flight is None
+        if leader:
+            flight = _flights[name] = _Flight()
+
+    if not leader:
+        if flight.done.wait(wait) and flight.error is None:
+            return flight.result
+        return _run_locked(name, compute, ready, wait)
+
+    try:
+        flight.result = _run_locked(name, compute, ready, wait)
+        return flight.result
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(name, None)
+        flight.done.set()
+
+
+async def _aacquire(name: str) -> Optional[str]:
+    token = uuid.uuid4().hex
+    try:
+        return token if await (await _async_redis()).set(LOCK_PREFIX + name, token, nx=True, ex=LOCK_TTL) else None
+    except Exception as e:
+        print(f"⚠️ Cache lock unavailable for {name}: {e}")
+        return ""
+
+
+async def _arelease(name: str, token: Optional[str]):
+    if not token:
+        return
+    try:
+        await (await _async_redis()).eval(_RELEASE_LOCK, 1, LOCK_PREFIX + name, token)
+    except Exception as e:
+        print(f"⚠️ Cache lock release failed for {name}: {e}")
+
+
+async def _arun_locked(name: str, compute, ready, wait: float):
+    deadline = time.monotonic() + wait
+    while True:
+        token = await _aacquire(name)
+        if token is not None or time.monotonic() >= deadline:
+            try:
+                return await compute()
+            finally:
+                await _arelease(name, token)
+        await asyncio.sleep(LOCK_POLL)
+        value = await ready() if ready else None
+        if value:
+            return value
+
+
+async def asingle_flight(name: str, compute, ready=None, wait: float = LOCK_TTL):
+    """single_flight for coroutines: compute and ready are async callables."""
+    flight = _async_flights.get(name)
+    if flight is not None:
         try:
-            return json.loads(data)
-        except json.JSONDecodeError:
-            return data
-    return None
+            return await asyncio.wait_for(asyncio.shield(flight), wait)
+        except asyncio.CancelledError:
+            if not flight.cancelled():  # this caller was cancelled, not the leader
+                raise
+        except Exception:
+            pass
+        return await _arun_locked(name, compute, ready, wait)
 
+    flight = _async_flights[name] = asyncio.get_running_loop().create_future()
+    try:
+        result = await _arun_locked(name, compute, ready, wait)
+        flight.set_result(result)
+        return result
+    except Exception as e:
+        flight.set_exception(e)
+        flight.exception()  # retrieved: no "never retrieved" warning when nobody was waiting
+        raise
+    except BaseException:
+        flight.cancel()
+        raise
+    finally:
+        _async_flights.pop(name, None)
 
-async def set_cache(key: str, value, ttl: int = 300):
-    """Store a Python object in Redis as JSON, with optional TTL (seconds)."""
-    if not redis_client.redis:
-        await redis_client.connect()
 
-    await redis_client.redis.setex(key, ttl, json.dumps(value))
+# -------------------------
+# GET OR LOAD
+# -------------------------
+
+def get_or_load(key: str, load: Callable[[], Optional[bytes]], beta: float = EARLY_BETA) -> Optional[dict]:
+    """
+    The entry for `key` ({"v", "x", "d"}, decoded for this caller), loading it with load()
+    (which stores the entry and returns put()'s bytes, or None for "nothing to cache") when it
+    is missing, expired or due for an early refresh.
+    """
+    data = get_raw(key)
+    if data is not None:
+        entry = loads(data)
+        if not _needs_refresh(entry, beta):
+            return entry
+        # stale or early: whoever takes the lock reloads, everybody else keeps serving this entry
+        token = _acquire(key)
+        if token is None:
+            return entry
+        try:
+            data = load()
+        finally:
+            _release(key, token)
+        return loads(data) if data is not None else None
+
+    data = single_flight(key, load, ready=lambda: get_raw(key))
+    return loads(data) if data is not None else None
+
+
+async def aget_or_load(key: str, load, beta: float = EARLY_BETA) -> Optional[dict]:
+    """get_or_load for coroutines: load is an async callable."""
+    data = await aget_raw(key)
+    if data is not None:
+        entry = loads(data)
+        if not _needs_refresh(entry, beta):
+            return entry
+        token = await _aacquire(key)
+        if token is None:
+            return entry
+        try:
+            data = await load()
+        finally:
+            await _arelease(key, token)
+        return loads(data) if data is not None else None
+
+    data = await asingle_flight(key, load, ready=lambda: aget_raw(key))
+    return loads(data) if data is not None else None
+
+
+# -------------------------
+# DECORATOR
+# -------------------------
+
+def cached(
+    key: str,
+    ttl: int = DEFAULT_TTL,
+    tags: Optional[Callable[[Any], Iterable[str]]] = None,
+    model: Optional[type] = None,
+    stale_ttl: int = 0,
+    beta: float = EARLY_BETA,
+):
+    """
+    Cache a function's result in L1 + L2, with stampede protection. Works on sync functions
+    (CRUD, run in the threadpool) and on async ones (routes).
+
+    key:       format string filled from the call's arguments, e.g. "artwork:{artwork_id}"
+    tags:      optional callable(result) -> extra tags, e.g. lambda a: [f"artist:{a.artistId}"]
+    model:     pydantic model to rebuild on a hit (otherwise the decoded JSON is returned)
+    stale_ttl: seconds an expired entry may still be served while one caller reloads it
+    beta:      XFetch early-refresh factor (0 disables)
+
+    None results are not cached. Arguments that are not part of the key (db sessions, ...)
+    are simply passed through; the caller that runs the function gets its own result back,
+    every other caller a fresh copy rebuilt from the cache.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        def make_key(args, kwargs) -> str:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return key.format(**bound.arguments)
+
+        def hydrate(entry: Optional[dict]):
+            if entry is None:
+                return None
+            return model.model_validate(entry["v"]) if model is not None else entry["v"]
+
+        def extra_tags(result) -> Tuple[str, ...]:
+            return tuple(tags(result)) if tags else ()
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                cache_key = make_key(args, kwargs)
+                mine = []
+
+                async def load():
+                    start = time.perf_counter()
+                    result = await func(*args, **kwargs)
+                    mine.append(result)
+                    if result is None:
+                        return None
+                    return await aput(cache_key, result, ttl, extra_tags(result), stale_ttl,
+                                      time.perf_counter() - start)
+
+                entry = await aget_or_load(cache_key, load, beta)
+                return mine[0] if mine else hydrate(entry)
+
+            async_wrapper.cache_key = key
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache_key = make_key(args, kwargs)
+            mine = []
+
+            def load():
+                start = time.perf_counter()
+                result = func(*args, **kwargs)
+                mine.append(result)
+                if result is None:
+                    return None
+                return put(cache_key, result, ttl, extra_tags(result), stale_ttl, time.perf_counter() - start)
+
+            entry = get_or_load(cache_key, load, beta)
+            return mine[0] if mine else hydrate(entry)
+
+        wrapper.cache_key = key
+        return wrapper
+
+    return decorator
+
+
+# -------------------------
+# CROSS-WORKER L1 INVALIDATION
+# -------------------------
+
+async def listen():
+    """Long-running task: apply other workers' invalidations to this worker's L1."""
+    while True:
+        pubsub = None
+        try:
+            pubsub = (await _async_redis()).pubsub(ignore_subscribe_messages=True)
+            await pubsub.subscribe(INVALIDATE_CHANNEL)
+            while True:
+                message = await pubsub.get_message(timeout=1.0)
+                if not message or message["type"] != "message":
+                    continue
+                payload = loads(message["data"])
+                if payload.get("node") != _node_id:
+                    local_cache.invalidate(payload.get("tags", ()))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ Cache invalidation listener error: {e}")
+            local_cache.clear()  # messages may have been missed while disconnected
+            await asyncio.sleep(1)
+        finally:
+            if pubsub is not None:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+
+# -------------------------
+# LEGACY HELPERS
+# -------------------------
+
+async def get_cache(key: str):
+    """Retrieve a cached value (as a Python object)."""
+    return await aget(key)
+
+
+async def set_cache(key: str, value, ttl: int = 300):
+    """Store a Python object as JSON, with optional TTL (seconds)."""
+    await aput(key, value, ttl)
 
 # helper function for se time for refresh at 12
 def seconds_until_midnight() -> int:
@@ -0,0 +1,24 @@
+import base64
+import json
+from datetime import datetime
+
+# -------------------------
+# KEYSET CURSORS
+# -------------------------
+# Opaque page cursors for (timestamp, id) keyset pagination:
+# the client gets the sort key of the last row it saw and sends it back.
+
+
+def encode_cursor(timestamp: datetime, row_id: str) -> str:
+    raw = json.dumps([timestamp.isoformat(), str(row_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """Returns (timestamp, id). Raises ValueError for anything that isn't a cursor we issued."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(timestamp), str(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
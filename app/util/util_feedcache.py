@@ -0,0 +1,125 @@
+import json
+import hashlib
+from typing import Iterable, List, Optional, Tuple
+from app.core.redis_client import get_redis_client, get_sync_redis
+from app.util import util_timeline
+
+# -------------------------
+# HOME FEED CACHE (Redis)
+# -------------------------
+# feed:version:{user_id}         counter bumped by anything that can change the user's feed
+#                                (follow/unfollow, like/unlike, saved/cart, new artwork fanned out)
+# feed:version:artist:{artist}   same, for a celebrity's posts (their followers are not fanned out to)
+# feed:cache:{user_id}           {"tag", "etag", "ids"}: the last computed feed, valid while the tag
+#                                still matches the counters and at most FEED_CACHE_TTL seconds
+#
+# The tag is read from Redis only, so a conditional request for an unchanged feed is answered
+# with 304 without touching the DB.
+
+FEED_VERSION_KEY = "feed:version:{}"
+ARTIST_VERSION_KEY = "feed:version:artist:{}"
+FEED_CACHE_KEY = "feed:cache:{}"
+FEED_CACHE_TTL = 60  # seconds
+
+redis_client = get_redis_client()  # async client for aget_cached
+
+
+def bump(*user_ids: str):
+    """Invalidate the cached feed of these users."""
+    if not user_ids:
+        return
+    try:
+        pipe = get_sync_redis().pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.incr(FEED_VERSION_KEY.format(user_id))
+        pipe.execute()
+    except Exception as e:
+        print(f"⚠️ Feed version bump failed: {e}")
+
+
+def bump_many(user_ids: Iterable[str], pipe):
+    """Queue version bumps on an existing pipeline (used by the timeline fan-out)."""
+    for user_id in user_ids:
+        pipe.incr(FEED_VERSION_KEY.format(user_id))
+
+
+def bump_artist(artist_id: str):
+    try:
+        get_sync_redis().incr(ARTIST_VERSION_KEY.format(artist_id))
+    except Exception as e:
+        print(f"⚠️ Artist feed version bump failed: {e}")
+
+
+def _feed_tag(version: Optional[str], celebs, artist_versions) -> str:
+    tag = version or "0"
+    if celebs:
+        tag += ":" + ",".join(v or "0" for v in artist_versions)
+    return tag
+
+
+def _cached_feed(tag: str, cached: Optional[str]) -> Optional[dict]:
+    cached = json.loads(cached) if cached else None
+    if cached and cached["tag"] != tag:
+        cached = None
+    return cached
+
+
+def get_cached(user_id: str) -> Tuple[Optional[str], Optional[dict]]:
+    """(current version tag, cached feed if it was computed at that tag). (None, None) if Redis is unavailable."""
+    try:
+        r = get_sync_redis()
+        pipe = r.pipeline(transaction=False)
+        pipe.get(FEED_VERSION_KEY.format(user_id))
+        pipe.smembers(util_timeline.FOLLOWED_CELEBS_KEY.format(user_id))
+        pipe.get(FEED_CACHE_KEY.format(user_id))
+        version, celebs, cached = pipe.execute()
+
+        celebs = sorted(c for c in celebs if c)
+        artist_versions = r.mget([ARTIST_VERSION_KEY.format(c) for c in celebs]) if celebs else []
+        tag = _feed_tag(version, celebs, artist_versions)
+    except Exception as e:
+        print(f"⚠️ Feed cache read failed: {e}")
+        return None, None
+
+    return tag, _cached_feed(tag, cached)
+
+
+async def aget_cached(user_id: str) -> Tuple[Optional[str], Optional[dict]]:
+    """get_cached on the async Redis client, for async routes."""
+    try:
+        if not redis_client.redis:
+            await redis_client.connect()
+        r = redis_client.redis
+        pipe = r.pipeline(transaction=False)
+        pipe.get(FEED_VERSION_KEY.format(user_id))
+        pipe.smembers(util_timeline.FOLLOWED_CELEBS_KEY.format(user_id))
+        pipe.get(FEED_CACHE_KEY.format(user_id))
+        version, celebs, cached = await pipe.execute()
+
+        celebs = sorted(c for c in celebs if c)
+        artist_versions = await r.mget([ARTIST_VERSION_KEY.format(c) for c in celebs]) if celebs else []
+        tag = _feed_tag(version, celebs, artist_versions)
+    except Exception as e:
+        print(f"⚠️ Feed cache read failed: {e}")
+        return None, None
+
+    return tag, _cached_feed(tag, cached)
+
+
+def store(user_id: str, tag: Optional[str], artwork_ids: List[str], like_counts: List[int]) -> str:
+    """
+    Cache the feed's artwork ids under `tag`; returns its ETag. Like counts are part of the
+    ETag so that a recompute after FEED_CACHE_TTL picks up other users' likes.
+    """
+    fingerprint = f"{tag}|{','.join(artwork_ids)}|{','.join(map(str, like_counts))}"
+    etag = '"' + hashlib.sha1(fingerprint.encode()).hexdigest() + '"'
+    if tag is not None:
+        try:
+            get_sync_redis().set(
+                FEED_CACHE_KEY.format(user_id),
+                json.dumps({"tag": tag, "etag": etag, "ids": artwork_ids}),
+                ex=FEED_CACHE_TTL,
+            )
+        except Exception as e:
+            print(f"⚠️ Feed cache write failed: {e}")
+    return etag
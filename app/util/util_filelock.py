@@ -0,0 +1,35 @@
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of this process are serialised
+    fcntl = None
+
+# -------------------------
+# FILE LOCK
+# -------------------------
+# Exclusive lock around a read-modify-save of an index file on local disk, shared by
+# every worker process on the host through flock() on "<path>.lock".
+
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+def _thread_lock(path: str) -> threading.Lock:
+    with _thread_locks_guard:
+        return _thread_locks.setdefault(path, threading.Lock())
+
+
+@contextmanager
+def file_lock(path: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with _thread_lock(path), open(f"{path}.lock", "a") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
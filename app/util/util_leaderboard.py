@@ -0,0 +1,143 @@
+from sqlalchemy.orm import Session
+from app.models import models
+from app.core.redis_client import get_sync_redis
+from app.util import util_artistrank, util_cache
+
+# -------------------------
+# ARTIST LEADERBOARD (Redis ZSET)
+# -------------------------
+# member = artist id, score = Bayesian weighted rating.
+# Written on every artist review, so /artists/top is always live. LEADERBOARD_BUILT_KEY
+# marks a board built from the DB; incremental writes only go to a built board (a ZADD
+# into a lost key would otherwise create a board holding just that one artist). If the
+# board is lost (Redis restart/flush) the first reader rebuilds it; concurrent readers
+# wait for that rebuild instead of each running their own (util_cache.single_flight).
+
+LEADERBOARD_KEY = "leaderboard:artists"
+LEADERBOARD_BUILT_KEY = "leaderboard:artists:built"
+
+
+def update_scores(scores: dict):
+    """ZADD the {artist_id: weighted_rating} pairs that moved after a review write (built board only)."""
+    if not scores:
+        return
+    try:
+        r = get_sync_redis()
+        if r.exists(LEADERBOARD_BUILT_KEY):
+            r.zadd(LEADERBOARD_KEY, scores)
+    except Exception as e:
+        print(f"⚠️ Leaderboard update failed: {e}")
+
+
+def add_artist(artist_id: str):
+    """New users enter a built board at 0 (never overwrites an existing score)."""
+    try:
+        r = get_sync_redis()
+        if r.exists(LEADERBOARD_BUILT_KEY):
+            r.zadd(LEADERBOARD_KEY, {str(artist_id): 0.0}, nx=True)
+    except Exception as e:
+        print(f"⚠️ Leaderboard insert failed for {artist_id}: {e}")
+
+
+def remove_artist(artist_id: str):
+    try:
+        get_sync_redis().zrem(LEADERBOARD_KEY, str(artist_id))
+    except Exception as e:
+        print(f"⚠️ Leaderboard removal failed for {artist_id}: {e}")
+
+
+def rebuild_leaderboard(db: Session) -> int:
+    """Recreate the ZSET from the DB (recovery). Swapped in atomically with RENAME."""
+    rows = (
+        db.query(models.User.id, models.ArtistRatingStats.weighted_rating)
+        .outerjoin(models.ArtistRatingStats, models.ArtistRatingStats.artist_id == models.User.id)
+        .all()
+    )
+    r = get_sync_redis()
+    if not rows:
+        pipe = r.pipeline()
+        pipe.delete(LEADERBOARD_KEY)
+        pipe.set(LEADERBOARD_BUILT_KEY, 1)
+        pipe.execute()
+        return 0
+
+    tmp_key = f"{LEADERBOARD_KEY}:rebuild"
+    pipe = r.pipeline()
+    pipe.delete(tmp_key)
+    pipe.zadd(tmp_key, {row.id: float(row.weighted_rating or 0.0) for row in rows})
+    pipe.rename(tmp_key, LEADERBOARD_KEY)
+    pipe.set(LEADERBOARD_BUILT_KEY, 1)
+    pipe.execute()
+    print(f"✅ Leaderboard rebuilt with {len(rows)} artists")
+    return len(rows)
+
+
+def _ensure_leaderboard(db: Session, r):
+    """Rebuild a lost ZSET once; concurrent readers wait for that rebuild."""
+    if not r.exists(LEADERBOARD_BUILT_KEY):
+        util_cache.single_flight(
+            "leaderboard:rebuild",
+            lambda: rebuild_leaderboard(db),
+            ready=lambda: r.exists(LEADERBOARD_BUILT_KEY),
+        )
+
+
+def get_top_artists(db: Session, skip: int = 0, limit: int = 50) -> list:
+    """Paginated ZREVRANGE read, hydrated with one query for the page's artists."""
+    r = get_sync_redis()
+    _ensure_leaderboard(db, r)
+
+    entries = r.zrevrange(LEADERBOARD_KEY, skip, skip + limit - 1, withscores=True)
+    if not entries:
+        return []
+
+    ids = [artist_id for artist_id, _ in entries]
+    rows = (
+        db.query(models.User, models.ArtistRatingStats)
+        .outerjoin(models.ArtistRatingStats, models.ArtistRatingStats.artist_id == models.User.id)
+        .filter(models.User.id.in_(ids))
+        .all()
+    )
+    by_id = {artist.id: (artist, stats) for artist, stats in rows}
+    zero_rank = util_artistrank.unreviewed_rank(db)
+
+    results = []
+    for artist_id, score in entries:
+        if artist_id not in by_id:
+            continue  # deleted user still on the board until the next rebuild
+        artist, stats = by_id[artist_id]
+        rating_info = util_artistrank.rating_info_from_stats(stats, zero_rank)
+        results.append({
+            "artistId": artist.id,
+            "name": artist.name,
+            "username": artist.username,
+            "profileImage": artist.profileImage,
+            "avgRating": rating_info["avgRating"],
+            "reviewCount": rating_info["reviewCount"],
+            "weightedRating": score,
+            "rank": rating_info["rank"]
+        })
+    return results
+
+
+def get_artist_position(db: Session, artist_id: str):
+    """
+    An artist's dense rank by weighted rating, read from artist_rating_stats: the same `rank`
+    that /artists/top, /user/{id} and /me report (ties share a position). None if there is no such user.
+    """
+    artist_id = str(artist_id)
+    if not db.query(models.User.id).filter(models.User.id == artist_id).first():
+        return None
+    rating_info = util_artistrank.get_user_rating_info(db, artist_id)
+    return {"artistId": artist_id, "position": rating_info["rank"], "weightedRating": rating_info["weightedRating"]}
+
+
+if __name__ == "__main__":
+    # Recovery command: python -m app.util.util_leaderboard
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        rebuild_leaderboard(db)
+    finally:
+        db.close()
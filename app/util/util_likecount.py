@@ -0,0 +1,131 @@
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import models
+from app.core.redis_client import get_redis_client, get_sync_redis
+from app.core.background import acquire_job_lock
+
+# -------------------------
+# LIKE COUNTERS
+# -------------------------
+# artworks.like_count is the durable counter (atomic UPDATE in likes_crud).
+# The "artwork:likes" Redis hash caches it for the count endpoints; a field is only
+# ever incremented if it is already cached, otherwise it is filled from the DB on read.
+# reconcile_like_counts() repairs drift against artwork_likes in the background.
+
+LIKE_COUNT_KEY = "artwork:likes"
+RECONCILE_INTERVAL = 600  # seconds
+
+# HINCRBY only when the field is cached, so a miss can never be turned into a wrong small number
+_INCR_IF_CACHED = """
+if redis.call('HEXISTS', KEYS[1], ARGV[1]) == 1 then
+    return redis.call('HINCRBY', KEYS[1], ARGV[1], ARGV[2])
+end
+return nil
+"""
+_incr_script = None
+redis_client = get_redis_client()  # async client for aget_count
+
+
+def bump(artwork_id: str, delta: int):
+    global _incr_script
+    try:
+        r = get_sync_redis()
+        if _incr_script is None:
+            _incr_script = r.register_script(_INCR_IF_CACHED)
+        _incr_script(keys=[LIKE_COUNT_KEY], args=[str(artwork_id), delta])
+    except Exception as e:
+        print(f"⚠️ Like counter update failed for {artwork_id}: {e}")
+        try:
+            get_sync_redis().hdel(LIKE_COUNT_KEY, str(artwork_id))  # refilled from the DB on next read
+        except Exception:
+            pass
+
+
+def get_count(db: Session, artwork_id: str) -> int:
+    artwork_id = str(artwork_id)
+    try:
+        cached = get_sync_redis().hget(LIKE_COUNT_KEY, artwork_id)
+        if cached is not None:
+            return max(int(cached), 0)
+    except Exception as e:
+        print(f"⚠️ Like counter read failed for {artwork_id}: {e}")
+        cached = None
+
+    count = (
+        db.query(models.Artwork.like_count)
+        .filter(models.Artwork.id == artwork_id)
+        .scalar()
+    ) or 0
+    try:
+        get_sync_redis().hsetnx(LIKE_COUNT_KEY, artwork_id, count)
+    except Exception:
+        pass
+    return count
+
+
+async def aget_count(db: AsyncSession, artwork_id: str) -> int:
+    """get_count for async routes (async Redis client + async session)."""
+    artwork_id = str(artwork_id)
+    try:
+        if not redis_client.redis:
+            await redis_client.connect()
+        cached = await redis_client.redis.hget(LIKE_COUNT_KEY, artwork_id)
+        if cached is not None:
+            return max(int(cached), 0)
+    except Exception as e:
+        print(f"⚠️ Like counter read failed for {artwork_id}: {e}")
+
+    count = (await db.scalar(
+        select(models.Artwork.like_count).where(models.Artwork.id == artwork_id)
+    )) or 0
+    try:
+        await redis_client.redis.hsetnx(LIKE_COUNT_KEY, artwork_id, count)
+    except Exception:
+        pass
+    return count
+
+
+def reconcile_like_counts():
+    """Reset artworks.like_count wherever it drifted from COUNT(artwork_likes) and drop their cached values."""
+    if not acquire_job_lock("reconcile_like_counts", RECONCILE_INTERVAL - 5):
+        return
+
+    from app.database import SessionLocal
+
+    db: Session = SessionLocal()
+    try:
+        actual = (
+            select(func.count())
+            .where(models.ArtworkLike.artworkId == models.Artwork.id)
+            .correlate(models.Artwork)
+            .scalar_subquery()
+        )
+        drifted = [row.id for row in db.query(models.Artwork.id).filter(models.Artwork.like_count != actual).all()]
+        for start in range(0, len(drifted), 500):
+            chunk = drifted[start:start + 500]
+            db.query(models.Artwork).filter(models.Artwork.id.in_(chunk)).update(
+                {models.Artwork.like_count: actual}, synchronize_session=False
+            )
+        db.commit()
+
+        # cached values that no longer match the (now repaired) column are dropped and refilled on read
+        r = get_sync_redis()
+        stale = set(drifted)
+        cursor = 0
+        while True:
+            cursor, cached = r.hscan(LIKE_COUNT_KEY, cursor, count=500)
+            if cached:
+                durable = dict(
+                    db.query(models.Artwork.id, models.Artwork.like_count)
+                    .filter(models.Artwork.id.in_(list(cached)))
+                    .all()
+                )
+                stale.update(aid for aid, n in cached.items() if durable.get(aid) != int(n))
+            if cursor == 0:
+                break
+        if stale:
+            r.hdel(LIKE_COUNT_KEY, *stale)
+            print(f"🔧 Reconciled like counts for {len(drifted)} artworks, {len(stale)} cached counters dropped")
+    finally:
+        db.close()
@@ -0,0 +1,143 @@
+import time
+import uuid
+import random
+import threading
+from typing import Iterable, List, Optional
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from app.models import models
+from app.core.redis_client import get_sync_redis
+from app.core.background import acquire_job_lock
+
+# -------------------------
+# RANDOM ARTWORK POOL
+# -------------------------
+# Random picks for guests, cold-start users and empty recommendation results without
+# ORDER BY RAND() (a full table sort on every request).
+#
+# artworks:random_pool   SET of up to POOL_SIZE eligible artwork ids (always holds a "" sentinel,
+#                        so an empty catalogue is still a built pool). SRANDMEMBER serves picks.
+#
+# Artwork ids are uuid4 strings, so the POOL_SIZE ids following a random uuid in primary-key
+# order are a uniform random subset of the catalogue; refresh_pool() takes a new window every
+# REFRESH_INTERVAL (the pool rotates). Approved/created artworks are added right away, removed
+# or rejected ones dropped. If Redis is unavailable an in-process copy of the pool is used.
+
+POOL_KEY = "artworks:random_pool"
+POOL_SIZE = 10000
+REFRESH_INTERVAL = 300           # seconds
+POOL_TTL = 3 * REFRESH_INTERVAL  # a stopped refresh job never leaves a stale pool behind
+SADD_CHUNK = 1000
+
+
+def _eligible():
+    return (
+        or_(models.Artwork.isDeleted == False, models.Artwork.isDeleted.is_(None)),
+        or_(models.Artwork.status != models.StatusENUM.hidden.value, models.Artwork.status.is_(None)),
+    )
+
+
+def _load_window(db: Session) -> List[str]:
+    """POOL_SIZE eligible ids starting at a random point of the primary key (wrapping around)."""
+    start = str(uuid.uuid4())
+    query = db.query(models.Artwork.id).filter(*_eligible()).order_by(models.Artwork.id)
+    ids = [row.id for row in query.filter(models.Artwork.id >= start).limit(POOL_SIZE)]
+    if len(ids) < POOL_SIZE:
+        ids += [row.id for row in query.filter(models.Artwork.id < start).limit(POOL_SIZE - len(ids))]
+    return ids
+
+
+def _store(r, ids: List[str]):
+    pipe = r.pipeline()  # MULTI: readers see the old pool or the new one, never a half-built one
+    pipe.delete(POOL_KEY)
+    pipe.sadd(POOL_KEY, "")
+    for start in range(0, len(ids), SADD_CHUNK):
+        pipe.sadd(POOL_KEY, *ids[start:start + SADD_CHUNK])
+    pipe.expire(POOL_KEY, POOL_TTL)
+    pipe.execute()
+
+
+def build_pool(db: Session) -> List[str]:
+    ids = _load_window(db)
+    _store(get_sync_redis(), ids)
+    return ids
+
+
+def refresh_pool():
+    """Background job: rotate the pool to a new random window of the catalogue."""
+    if not acquire_job_lock("refresh_random_pool", REFRESH_INTERVAL - 5):
+        return
+
+    from app.database import SessionLocal
+
+    db: Session = SessionLocal()
+    try:
+        ids = build_pool(db)
+        print(f"🎲 Random artwork pool refreshed with {len(ids)} artworks")
+    finally:
+        db.close()
+
+
+# -------------------------
+# IN-PROCESS FALLBACK
+# -------------------------
+
+_local_ids: List[str] = []
+_local_loaded_at = 0.0
+_local_lock = threading.Lock()
+
+
+def _local_pool(db: Session) -> List[str]:
+    global _local_ids, _local_loaded_at
+    with _local_lock:
+        if time.time() - _local_loaded_at > REFRESH_INTERVAL:
+            _local_ids = _load_window(db)
+            _local_loaded_at = time.time()
+        return _local_ids
+
+
+# -------------------------
+# PUBLIC API
+# -------------------------
+
+def sample(db: Session, count: Optional[int] = None, exclude: Iterable[str] = ()) -> List[str]:
+    """
+    Up to `count` distinct random artwork ids (the whole pool, shuffled, when count is None),
+    never any of `exclude`.
+    """
+    exclude = {str(e) for e in exclude}
+    exclude.add("")
+    try:
+        r = get_sync_redis()
+        if count is None:
+            ids = list(r.smembers(POOL_KEY))
+        else:
+            ids = r.srandmember(POOL_KEY, count + len(exclude))  # distinct members
+        if not ids:  # not built yet (or expired)
+            ids = build_pool(db)
+    except Exception as e:
+        print(f"⚠️ Random pool read failed, using the in-process pool: {e}")
+        ids = _local_pool(db)
+        if count is not None:
+            ids = random.sample(ids, min(len(ids), count + len(exclude)))
+
+    ids = [i for i in ids if i not in exclude]
+    random.shuffle(ids)
+    return ids if count is None else ids[:count]
+
+
+def add(artwork_id: str):
+    """Artwork created or approved; only added to a built pool (otherwise the next build picks it up)."""
+    try:
+        r = get_sync_redis()
+        if r.exists(POOL_KEY):
+            r.sadd(POOL_KEY, str(artwork_id))
+    except Exception as e:
+        print(f"⚠️ Random pool update failed for {artwork_id}: {e}")
+
+
+def remove(artwork_id: str):
+    try:
+        get_sync_redis().srem(POOL_KEY, str(artwork_id))
+    except Exception as e:
+        print(f"⚠️ Random pool removal failed for {artwork_id}: {e}")
@@ -0,0 +1,398 @@
+import bisect
+import json
+import math
+import os
+import re
+import threading
+import time
+from typing import Optional
+import numpy as np
+from scipy import sparse
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from app.models import models
+from app.util.util_filelock import file_lock
+from app.util.util_tagindex import parse_tags
+
+# -------------------------
+# ARTWORK SEARCH INDEX
+# -------------------------
+# In-process inverted index over title / description / category / tags, shared by
+# every worker on a host through a file on disk (same model as util_tagindex): queries
+# run on an immutable snapshot without any lock, artwork writes are queued and
+# refresh_search_index() (background job, every worker) applies them in one batch under
+# a file lock. The file is built at startup when missing and fully rebuilt every
+# REBUILD_INTERVAL; requests never build it.
+#
+# Postings live in two segments:
+#   base  - CSR matrix, one row per term, one column per document (built on compaction)
+#   delta - {term: {doc: tf}} for documents indexed since the last compaction
+# Updated or deleted artworks leave a dead document behind until the next compaction.
+#
+# Ranking is BM25 over field-weighted term frequencies (BM25F-style); every query
+# token must match, the last one as a prefix so results update while typing.
+
+SEARCH_INDEX_PATH = os.getenv("SEARCH_INDEX_PATH", os.path.join("data", "search_index.npz"))
+FIELD_WEIGHTS = {"title": 3.0, "tags": 2.0, "category": 2.0, "description": 1.0}
+BM25_K1 = 1.2
+BM25_B = 0.75
+MAX_PREFIX_EXPANSIONS = 50
+PREFIX_DISCOUNT = 0.5           # completions of the last token count half as much as the exact word
+DELTA_COMPACT_DOCS = 5000       # fold the delta segment into base once it holds this many documents
+DEAD_COMPACT_RATIO = 0.25       # ... or once a quarter of all documents are dead
+REFRESH_INTERVAL = 5            # seconds between flushes of queued artwork changes
+REBUILD_INTERVAL = 6 * 3600     # seconds
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text) -> list:
+    if not text:
+        return []
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+def document_terms(title, description, category, tags) -> dict:
+    """{term: weighted tf} for one artwork."""
+    fields = {
+        "title": tokenize(title),
+        "description": tokenize(description),
+        "category": tokenize(category),
+        "tags": tokenize(" ".join(parse_tags(tags))),
+    }
+    terms = {}
+    for field, tokens in fields.items():
+        weight = FIELD_WEIGHTS[field]
+        for token in tokens:
+            terms[token] = terms.get(token, 0.0) + weight
+    return terms
+
+
+class SearchIndex:
+    def __init__(self, ids, created, lengths, vocab, base, delta=None, built_at=0.0):
+        self.ids = list(ids)                                # doc -> artwork id ("" for dead docs)
+        self.rows = {a: i for i, a in enumerate(self.ids) if a}
+        self.alive = np.array([bool(a) for a in self.ids], dtype=bool)
+        self.created = np.asarray(created, dtype=np.float64)
+        self.lengths = np.asarray(lengths, dtype=np.float64)
+        self.vocab = {t: i for i, t in enumerate(vocab)}
+        self.base = sparse.csr_matrix(base, dtype=np.float32)
+        self.delta = delta or {}                           # term -> {doc: tf}
+        self.delta_docs = len(self.ids) - self.base.shape[1]
+        self.live_length = float(self.lengths[self.alive].sum()) if len(self.ids) else 0.0
+        self.built_at = float(built_at)                    # time of the last full build from the DB
+        self._sorted_terms = None
+        self.mtime = None
+
+    @classmethod
+    def build(cls, db: Session) -> "SearchIndex":
+        artworks = (
+            db.query(
+                models.Artwork.id, models.Artwork.title, models.Artwork.description,
+                models.Artwork.category, models.Artwork.tags, models.Artwork.createdAt
+            )
+            .filter(or_(models.Artwork.isDeleted == False, models.Artwork.isDeleted.is_(None)))
+            .all()
+        )
+        index = cls([], [], [], [], sparse.csr_matrix((0, 0)), built_at=time.time())
+        index._append_many([
+            (art.id, document_terms(art.title, art.description, art.category, art.tags), art.createdAt)
+            for art in artworks
+        ])
+        index._compact()
+        return index
+
+    # ----------------------------
+    # Batch updates (only ever applied to an unpublished copy, see refresh_search_index)
+    # ----------------------------
+    def _append_many(self, documents):
+        """Append (artwork_id, terms, created_at) documents to the delta segment."""
+        if not documents:
+            return
+        created, lengths = [], []
+        for artwork_id, terms, created_at in documents:
+            doc = len(self.ids)
+            for term, tf in terms.items():
+                if term not in self.vocab:
+                    self.vocab[term] = len(self.vocab)
+                    self._sorted_terms = None
+                self.delta.setdefault(term, {})[doc] = tf
+            self.ids.append(artwork_id)
+            self.rows[artwork_id] = doc
+            created.append(created_at.timestamp() if created_at else 0.0)
+            lengths.append(sum(terms.values()))
+        self.alive = np.concatenate([self.alive, np.ones(len(documents), dtype=bool)])
+        self.created = np.concatenate([self.created, np.asarray(created, dtype=np.float64)])
+        self.lengths = np.concatenate([self.lengths, np.asarray(lengths, dtype=np.float64)])
+        self.live_length += float(sum(lengths))
+        self.delta_docs += len(documents)
+
+    def _kill(self, doc: int):
+        self.ids[doc] = ""
+        self.alive[doc] = False
+        self.live_length -= self.lengths[doc]
+
+    def apply(self, changes: dict):
+        """changes: {artwork_id: (title, description, category, tags, created_at), or None when the artwork is gone}."""
+        for artwork_id in changes:
+            doc = self.rows.pop(artwork_id, None)
+            if doc is not None:
+                self._kill(doc)
+        self._append_many([
+            (artwork_id, document_terms(*row[:4]), row[4])
+            for artwork_id, row in changes.items() if row is not None
+        ])
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        dead = len(self.ids) - len(self.rows)
+        if self.delta_docs >= DELTA_COMPACT_DOCS or (dead and dead >= DEAD_COMPACT_RATIO * len(self.ids)):
+            self._compact()
+
+    def _compact(self):
+        """Merge delta into base and drop dead documents."""
+        base = self.base.tocoo()
+        terms, docs, tfs = [base.row], [base.col], [base.data]
+        for term, postings in self.delta.items():
+            col = self.vocab[term]
+            terms.append(np.full(len(postings), col, dtype=np.int64))
+            docs.append(np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)))
+            tfs.append(np.fromiter(postings.values(), dtype=np.float32, count=len(postings)))
+        terms, docs, tfs = np.concatenate(terms), np.concatenate(docs), np.concatenate(tfs)
+
+        alive = self.alive
+        remap = np.cumsum(alive) - 1
+        keep = alive[docs] if len(docs) else np.zeros(0, dtype=bool)
+
+        self.base = sparse.csr_matrix(
+            (tfs[keep], (terms[keep], remap[docs[keep]])),
+            shape=(len(self.vocab), int(alive.sum())),
+            dtype=np.float32,
+        )
+        self.ids = [a for a in self.ids if a]
+        self.rows = {a: i for i, a in enumerate(self.ids)}
+        self.alive = np.ones(len(self.ids), dtype=bool)
+        self.created = self.created[alive]
+        self.lengths = self.lengths[alive]
+        self.delta = {}
+        self.delta_docs = 0
+
+    # ----------------------------
+    # Queries
+    # ----------------------------
+    def _postings(self, term: str):
+        """(docs, tfs) for a term across both segments, dead documents included."""
+        col = self.vocab.get(term)
+        if col is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        docs, tfs = [], []
+        if col < self.base.shape[0]:
+            start, end = self.base.indptr[col], self.base.indptr[col + 1]
+            docs.append(self.base.indices[start:end].astype(np.int64))
+            tfs.append(self.base.data[start:end])
+        postings = self.delta.get(term)
+        if postings:
+            docs.append(np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)))
+            tfs.append(np.fromiter(postings.values(), dtype=np.float32, count=len(postings)))
+        if not docs:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        return np.concatenate(docs), np.concatenate(tfs)
+
+    def _expand_prefix(self, prefix: str) -> list:
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self.vocab)
+        start = bisect.bisect_left(self._sorted_terms, prefix)
+        end = bisect.bisect_left(self._sorted_terms, prefix + "\U0010ffff")
+        matches = self._sorted_terms[start:end]
+        if len(matches) > MAX_PREFIX_EXPANSIONS:
+            # keep the most common completions
+            matches = sorted(matches, key=lambda t: -len(self._postings(t)[0]))[:MAX_PREFIX_EXPANSIONS]
+        return matches
+
+    def search(self, query: str, skip: int = 0, limit: int = 20) -> tuple:
+        """Returns (artwork ids for the page, total matches), best match first, newest first on ties."""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or not self.rows:
+            return [], 0
+
+        n_docs = len(self.rows)
+        avg_length = self.live_length / n_docs if n_docs else 1.0
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths / (avg_length or 1.0))
+
+        scores = np.zeros(len(self.ids), dtype=np.float64)
+        matched = np.ones(len(self.ids), dtype=bool)
+        for position, token in enumerate(tokens):
+            last = position == len(tokens) - 1
+            variants = self._expand_prefix(token) if last else [token]
+            token_hit = np.zeros(len(self.ids), dtype=bool)
+            for term in variants:
+                docs, tfs = self._postings(term)
+                if not len(docs):
+                    continue
+                df = len(docs)
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                if term != token:
+                    idf *= PREFIX_DISCOUNT
+                scores[docs] += idf * tfs * (BM25_K1 + 1) / (tfs + norm[docs])
+                token_hit[docs] = True
+            matched &= token_hit
+
+        candidates = np.flatnonzero(matched & self.alive)
+        total = len(candidates)
+        if not total or skip >= total:
+            return [], total
+
+        want = skip + limit
+        cand_scores = scores[candidates]
+        if total > want:
+            kth = np.partition(cand_scores, total - want)[total - want]
+            keep = cand_scores >= kth
+            candidates, cand_scores = candidates[keep], cand_scores[keep]
+
+        order = np.lexsort((-self.created[candidates], -cand_scores))[skip:want]
+        return [self.ids[i] for i in candidates[order]], total
+
+    # ----------------------------
+    # Persistence
+    # ----------------------------
+    def save(self, path: str = SEARCH_INDEX_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        vocab = sorted(self.vocab, key=self.vocab.get)
+        delta = {term: {str(doc): tf for doc, tf in postings.items()} for term, postings in self.delta.items()}
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                data=self.base.data,
+                indices=self.base.indices,
+                indptr=self.base.indptr,
+                shape=np.array(self.base.shape),
+                ids=np.array(self.ids, dtype="U36"),
+                created=self.created,
+                lengths=self.lengths,
+                vocab=np.array(vocab, dtype=str),
+                delta=np.array(json.dumps(delta)),
+                built_at=np.array(self.built_at),
+            )
+        os.replace(tmp_path, path)  # atomic, readers never see a half-written file
+        self.mtime = os.path.getmtime(path)
+
+    @classmethod
+    def load(cls, path: str = SEARCH_INDEX_PATH) -> "SearchIndex":
+        with np.load(path) as f:
+            base = sparse.csr_matrix((f["data"], f["indices"], f["indptr"]), shape=tuple(f["shape"]))
+            delta = {
+                term: {int(doc): tf for doc, tf in postings.items()}
+                for term, postings in json.loads(str(f["delta"])).items()
+            }
+            index = cls(f["ids"].tolist(), f["created"], f["lengths"], f["vocab"].tolist(), base, delta,
+                        float(f["built_at"]) if "built_at" in f.files else 0.0)
+        index.mtime = os.path.getmtime(path)
+        return index
+
+
+# -------------------------
+# SHARED INSTANCE
+# -------------------------
+
+_index = None
+_lock = threading.Lock()        # guards swapping _index, never held during a query
+_pending = {}                   # artwork_id -> (title, description, category, tags, created_at) or None
+_pending_lock = threading.Lock()
+
+
+def _file_mtime(path: str = SEARCH_INDEX_PATH):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def get_search_index(db: Session) -> Optional[SearchIndex]:
+    """
+    The current snapshot, reloaded when a worker has saved a newer file.
+    None until refresh_search_index() has written the file (requests never build it).
+    """
+    global _index
+    mtime = _file_mtime()
+    with _lock:
+        if mtime is not None and (_index is None or _index.mtime != mtime):
+            try:
+                _index = SearchIndex.load()
+            except (OSError, KeyError, ValueError) as e:  # mid-replace or an older file format
+                print(f"⚠️ Search index load failed: {e}")
+        return _index
+
+
+def search(db: Session, query: str, skip: int = 0, limit: int = 20) -> Optional[tuple]:
+    """(artwork ids, total) from the index, or None while no index is available yet."""
+    index = get_search_index(db)
+    if index is None:
+        return None
+    return index.search(query, skip, limit)
+
+
+def _publish(index: SearchIndex) -> SearchIndex:
+    global _index
+    with _lock:
+        _index = index
+    return index
+
+
+def rebuild_search_index(db: Session) -> SearchIndex:
+    with file_lock(SEARCH_INDEX_PATH):
+        index = SearchIndex.build(db)
+        index.save()
+    return _publish(index)
+
+
+def refresh_search_index():
+    """Background job: write queued artwork changes to the file; full rebuild when missing or stale."""
+    global _pending
+    with _pending_lock:
+        changes, _pending = _pending, {}
+
+    with file_lock(SEARCH_INDEX_PATH):
+        try:
+            index = SearchIndex.load() if _file_mtime() is not None else None
+        except (OSError, KeyError, ValueError):
+            index = None
+        if index is None or time.time() - index.built_at > REBUILD_INTERVAL:
+            from app.database import SessionLocal
+
+            db = SessionLocal()
+            try:
+                index = SearchIndex.build(db)  # queued changes were committed before they were queued
+            finally:
+                db.close()
+        elif changes:
+            index.apply(changes)
+        else:
+            return
+        index.save()
+    _publish(index)
+
+
+def index_artwork(db: Session, artwork: models.Artwork):
+    row = None if artwork.isDeleted else (
+        artwork.title, artwork.description, artwork.category, artwork.tags, artwork.createdAt
+    )
+    with _pending_lock:
+        _pending[str(artwork.id)] = row
+
+
+def remove_artwork(db: Session, artwork_id: str):
+    with _pending_lock:
+        _pending[str(artwork_id)] = None
+
+
+if __name__ == "__main__":
+    # Full rebuild: python -m app.util.util_search
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        index = rebuild_search_index(db)
+        print(f"✅ Search index rebuilt with {len(index.rows)} artworks, {len(index.vocab)} terms")
+    finally:
+        db.close()
@@ -0,0 +1,229 @@
+import time
+import numpy as np
+from scipy import sparse
+from sqlalchemy import insert, func, or_
+from sqlalchemy.orm import Session
+from app.models import models
+from app.core.redis_client import get_sync_redis
+from app.core.background import acquire_job_lock
+from app.util.util_tagindex import parse_tags
+
+# -------------------------
+# ARTWORK SIMILARITIES
+# -------------------------
+# Precomputes the top-K "more like this" artworks per artwork into artwork_similarities.
+#
+# Score = 3 * same category + 2 * shared tags + 1 * shared title words (the weights the
+# artwork page has always used). Each artwork becomes a sparse binary row with sqrt(weight)
+# per feature, so one sparse product X @ X.T yields every pairwise score at once.
+#
+# Artwork writes only mark the artwork dirty; refresh_similarities() (background job) then
+# recomputes just the affected neighbourhoods, with a full rebuild every FULL_REBUILD_INTERVAL.
+
+TOP_K = 20
+WEIGHTS = {"category": 3.0, "tag": 2.0, "title": 1.0}
+DIRTY_KEY = "similarity:dirty"
+BUILT_AT_KEY = "similarity:built_at"
+REFRESH_INTERVAL = 60                 # seconds
+FULL_REBUILD_INTERVAL = 24 * 3600     # seconds
+BLOCK_ROWS = 1000                     # rows per sparse product block
+IN_CHUNK = 1000                       # ids per IN (...) query
+INSERT_CHUNK = 5000
+
+
+def _features(category, tags, title) -> set:
+    features = set()
+    if category:
+        features.add(("category", category.strip().lower()))
+    features.update(("tag", tag) for tag in parse_tags(tags))
+    if title:
+        features.update(("title", word) for word in title.lower().split())
+    return features
+
+
+class FeatureMatrix:
+    """Weighted binary artwork x feature matrix of every live artwork; row order is oldest first."""
+
+    def __init__(self, db: Session):
+        rows = (
+            db.query(models.Artwork.id, models.Artwork.category, models.Artwork.tags, models.Artwork.title)
+            .filter(or_(models.Artwork.isDeleted == False, models.Artwork.isDeleted.is_(None)))
+            .order_by(models.Artwork.createdAt, models.Artwork.id)
+            .all()
+        )
+        vocab = {}
+        indptr, indices, data = [0], [], []
+        for row in rows:
+            for feature in _features(row.category, row.tags, row.title):
+                indices.append(vocab.setdefault(feature, len(vocab)))
+                data.append(np.sqrt(WEIGHTS[feature[0]]))
+            indptr.append(len(indices))
+
+        self.ids = [row.id for row in rows]
+        self.rows = {artwork_id: i for i, artwork_id in enumerate(self.ids)}
+        self.matrix = sparse.csr_matrix(
+            (np.array(data, dtype=np.float64), np.array(indices, dtype=np.int64), np.array(indptr, dtype=np.int64)),
+            shape=(len(rows), len(vocab)),
+        )
+        self.matrix_t = self.matrix.T.tocsr()
+
+    def scores(self, row_numbers) -> sparse.csr_matrix:
+        """Pairwise scores of the given rows against every artwork (len(row_numbers) x N)."""
+        scores = (self.matrix[row_numbers] @ self.matrix_t).tocsr()
+        scores.data = np.round(scores.data, 6)  # sqrt(w)**2 noise must not break ties
+        return scores
+
+    def top_k(self, row_numbers):
+        """Yield (row, [(similar_row, score), ...]) best first; ties go to the older artwork."""
+        for start in range(0, len(row_numbers), BLOCK_ROWS):
+            block = row_numbers[start:start + BLOCK_ROWS]
+            scores = self.scores(block)
+            for i, row in enumerate(block):
+                cols = scores.indices[scores.indptr[i]:scores.indptr[i + 1]]
+                vals = scores.data[scores.indptr[i]:scores.indptr[i + 1]]
+                keep = (cols != row) & (vals > 0)
+                cols, vals = cols[keep], vals[keep]
+                if len(cols) > TOP_K:
+                    kth = np.partition(vals, len(vals) - TOP_K)[len(vals) - TOP_K]
+                    keep = vals >= kth  # keep ties at the cut so the age tiebreak decides
+                    cols, vals = cols[keep], vals[keep]
+                order = np.lexsort((cols, -vals))[:TOP_K]  # row number == age rank
+                yield row, list(zip(cols[order].tolist(), vals[order].tolist()))
+
+
+def _write_rows(db: Session, features: FeatureMatrix, results):
+    batch = []
+    for row, neighbours in results:
+        artwork_id = features.ids[row]
+        for rank, (similar_row, score) in enumerate(neighbours):
+            batch.append({
+                "artwork_id": artwork_id,
+                "similar_id": features.ids[similar_row],
+                "score": score,
+                "rank": rank,
+            })
+        if len(batch) >= INSERT_CHUNK:
+            db.execute(insert(models.ArtworkSimilarity), batch)
+            batch = []
+    if batch:
+        db.execute(insert(models.ArtworkSimilarity), batch)
+
+
+def rebuild_similarities(db: Session) -> int:
+    """Recompute every artwork's neighbours; the table is swapped in a single transaction."""
+    features = FeatureMatrix(db)
+    db.query(models.ArtworkSimilarity).delete(synchronize_session=False)
+    _write_rows(db, features, features.top_k(list(range(len(features.ids)))))
+    db.commit()
+    try:
+        get_sync_redis().set(BUILT_AT_KEY, int(time.time()))
+    except Exception:
+        pass
+    return len(features.ids)
+
+
+def update_neighbourhoods(db: Session, artwork_ids) -> int:
+    """
+    Incremental update after the given artworks were created, edited or removed.
+    Recomputed: the changed artworks themselves, every artwork that listed one of them,
+    and every artwork a changed artwork now beats the current K-th neighbour of.
+    """
+    changed = {str(a) for a in artwork_ids}
+    features = FeatureMatrix(db)
+    table = models.ArtworkSimilarity
+
+    affected = set()
+    changed_list = list(changed)
+    for start in range(0, len(changed_list), IN_CHUNK):
+        chunk = changed_list[start:start + IN_CHUNK]
+        affected.update(
+            row.artwork_id
+            for row in db.query(table.artwork_id).filter(table.similar_id.in_(chunk)).distinct()
+        )
+
+    live_rows = [features.rows[a] for a in changed if a in features.rows]
+    if live_rows:
+        scores = features.scores(live_rows).tocoo()
+        # best score any changed artwork now has with each other artwork
+        best = {}
+        for col, val in zip(scores.col.tolist(), scores.data.tolist()):
+            if val > 0:
+                best[col] = max(best.get(col, 0.0), val)
+
+        candidates = [features.ids[col] for col in best if features.ids[col] not in changed]
+        for start in range(0, len(candidates), IN_CHUNK):
+            chunk = candidates[start:start + IN_CHUNK]
+            current = {
+                row.artwork_id: (row.kth, row.n)
+                for row in db.query(table.artwork_id, func.min(table.score).label("kth"), func.count().label("n"))
+                .filter(table.artwork_id.in_(chunk))
+                .group_by(table.artwork_id)
+            }
+            for artwork_id in chunk:
+                kth, n = current.get(artwork_id, (0.0, 0))
+                # strictly better only: on an exact tie the older neighbour keeps its slot
+                # (edited old artworks winning ties are settled by the next full rebuild)
+                if n < TOP_K or best[features.rows[artwork_id]] > kth:
+                    affected.add(artwork_id)
+
+    affected |= changed
+    if len(affected) > len(features.ids) // 4:
+        return rebuild_similarities(db)
+
+    affected_list = list(affected)
+    for start in range(0, len(affected_list), IN_CHUNK):
+        chunk = affected_list[start:start + IN_CHUNK]
+        db.query(table).filter(table.artwork_id.in_(chunk)).delete(synchronize_session=False)
+    rows = sorted(features.rows[a] for a in affected if a in features.rows)
+    _write_rows(db, features, features.top_k(rows))
+    db.commit()
+    return len(affected)
+
+
+def mark_dirty(artwork_id: str):
+    """Called by the artwork hooks; picked up by the next refresh_similarities() run."""
+    try:
+        get_sync_redis().sadd(DIRTY_KEY, str(artwork_id))
+    except Exception as e:
+        print(f"⚠️ Could not queue similarity update for {artwork_id}: {e}")
+
+
+def refresh_similarities():
+    """Background job: full rebuild when due, otherwise update the neighbourhoods of dirty artworks."""
+    if not acquire_job_lock("refresh_similarities", REFRESH_INTERVAL - 5):
+        return
+
+    from app.database import SessionLocal
+
+    r = get_sync_redis()
+    built_at = int(r.get(BUILT_AT_KEY) or 0)
+    db: Session = SessionLocal()
+    try:
+        if time.time() - built_at > FULL_REBUILD_INTERVAL and acquire_job_lock("rebuild_similarities", 3600):
+            r.delete(DIRTY_KEY)
+            count = rebuild_similarities(db)
+            print(f"🧮 Artwork similarities rebuilt for {count} artworks")
+            return
+
+        dirty = r.spop(DIRTY_KEY, 10000)
+        if not dirty:
+            return
+        try:
+            count = update_neighbourhoods(db, dirty)
+        except Exception:
+            db.rollback()
+            r.sadd(DIRTY_KEY, *dirty)  # retried on the next run
+            raise
+        print(f"🧮 Artwork similarities updated for {count} artworks ({len(dirty)} changed)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        print(f"Rebuilt similarities for {rebuild_similarities(session)} artworks")
+    finally:
+        session.close()
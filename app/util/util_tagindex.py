@@ -0,0 +1,337 @@
+import os
+import threading
+import time
+import numpy as np
+from scipy import sparse
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from app.models import models
+from app.util.util_filelock import file_lock
+
+# -------------------------
+# TAG SIMILARITY INDEX
+# -------------------------
+# Sparse (CSR) artwork x tag matrix shared by every worker on a host through a file on disk.
+# Each row also carries its category code (a one-hot category vector stored as an index).
+#
+# Readers get an immutable snapshot and query it without any lock; a newer file is loaded
+# into a new object and swapped in. Artwork writes are only queued (index_artwork /
+# remove_artwork); refresh_tag_index() (background job, every worker) applies the queue to
+# the file in one batch under a file lock, and rebuilds the file from the DB when it is
+# missing or older than REBUILD_INTERVAL, which also repairs updates lost by a crashed worker.
+
+TAG_INDEX_PATH = os.getenv("TAG_INDEX_PATH", os.path.join("data", "tag_index.npz"))
+COMPACT_RATIO = 0.25          # rebuild the matrix once a quarter of its rows are dead
+REFRESH_INTERVAL = 5          # seconds between flushes of queued artwork changes
+REBUILD_INTERVAL = 6 * 3600   # seconds
+
+
+def parse_tags(tags) -> list:
+    """Tags come as a JSON list (possibly holding comma-separated strings) or a plain string."""
+    if not tags:
+        return []
+    if isinstance(tags, list):
+        tags = ",".join(str(t) for t in tags)
+    return [t.strip().lower() for t in str(tags).split(",") if t.strip()]
+
+
+def _timestamp(value) -> float:
+    return value.timestamp() if value else 0.0
+
+
+def _category(value) -> str:
+    return value.strip().lower() if value else ""
+
+
+class TagIndex:
+    """
+    Row i holds the L2-normalised tag frequencies of artwork ids[i] and categories[i], an
+    index into category_vocab (0 = no category).
+    Replaced or deleted artworks leave an empty "dead" row behind until the next compaction.
+    """
+
+    def __init__(self, ids, vocab, matrix, created, category_vocab=("",), categories=(), built_at=0.0):
+        self.ids = list(ids)                        # row -> artwork id ("" for dead rows)
+        self.rows = {a: i for i, a in enumerate(self.ids) if a}
+        self.vocab = {t: i for i, t in enumerate(vocab)}
+        self.matrix = sparse.csr_matrix(matrix, dtype=np.float64)
+        self.created = np.asarray(created, dtype=np.float64)
+        self.category_vocab = {c: i for i, c in enumerate(category_vocab)}
+        self.categories = np.asarray(categories, dtype=np.int32)
+        self.built_at = float(built_at)             # time of the last full build from the DB
+        self._binary = None                         # 0/1 copy of matrix, built on first use
+        self.mtime = None
+
+    @classmethod
+    def build(cls, db: Session) -> "TagIndex":
+        artworks = (
+            db.query(models.Artwork.id, models.Artwork.tags, models.Artwork.createdAt, models.Artwork.category)
+            .filter(or_(models.Artwork.isDeleted == False, models.Artwork.isDeleted.is_(None)))
+            .all()
+        )
+        index = cls([], [], sparse.csr_matrix((0, 0)), [], built_at=time.time())
+        index._append_many([(art.id, art.tags, art.createdAt, art.category) for art in artworks])
+        return index
+
+    # ----------------------------
+    # Batch updates (only ever applied to an unpublished copy, see refresh_tag_index)
+    # ----------------------------
+    def _append_many(self, artworks):
+        """Append (artwork_id, tags, created_at, category) rows: one CSR block, one vstack."""
+        if not artworks:
+            return
+        indptr, indices, data = [0], [], []
+        created, categories = [], []
+        for artwork_id, tags, created_at, category in artworks:
+            counts = {}
+            for tag in parse_tags(tags):
+                col = self.vocab.setdefault(tag, len(self.vocab))
+                counts[col] = counts.get(col, 0.0) + 1.0
+            norm = np.sqrt(sum(v * v for v in counts.values()))
+            indices.extend(counts.keys())
+            data.extend(v / norm for v in counts.values())
+            indptr.append(len(indices))
+
+            self.rows[artwork_id] = len(self.ids)
+            self.ids.append(artwork_id)
+            created.append(_timestamp(created_at))
+            categories.append(self.category_vocab.setdefault(_category(category), len(self.category_vocab)))
+
+        block = sparse.csr_matrix(
+            (np.array(data, dtype=np.float64), np.array(indices, dtype=np.int64), np.array(indptr, dtype=np.int64)),
+            shape=(len(artworks), len(self.vocab)),
+        )
+        matrix = self.matrix
+        matrix.resize((matrix.shape[0], len(self.vocab)))
+        self.matrix = sparse.vstack([matrix, block], format="csr") if matrix.shape[0] else block
+        self.created = np.concatenate([self.created, np.asarray(created, dtype=np.float64)])
+        self.categories = np.concatenate([self.categories, np.asarray(categories, dtype=np.int32)])
+        self._binary = None
+
+    def _kill_many(self, rows):
+        for row in rows:
+            start, end = self.matrix.indptr[row], self.matrix.indptr[row + 1]
+            self.matrix.data[start:end] = 0.0
+            self.categories[row] = 0
+            self.ids[row] = ""
+        self.matrix.eliminate_zeros()
+        self._binary = None
+
+    def apply(self, changes: dict):
+        """changes: {artwork_id: (tags, created_at, category), or None when the artwork is gone}."""
+        dead = [self.rows.pop(a) for a in changes if a in self.rows]
+        if dead:
+            self._kill_many(dead)
+        self._append_many([(a, *row) for a, row in changes.items() if row is not None])
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        dead = len(self.ids) - len(self.rows)
+        if not dead or dead < COMPACT_RATIO * len(self.ids):
+            return
+        live = np.fromiter(sorted(self.rows.values()), dtype=np.int64, count=len(self.rows))
+        self.matrix = self.matrix[live]
+        self.created = self.created[live]
+        self.categories = self.categories[live]
+        self._binary = None
+        self.ids = [self.ids[i] for i in live]
+        self.rows = {a: i for i, a in enumerate(self.ids)}
+
+    # ----------------------------
+    # Queries
+    # ----------------------------
+    def similar_to(self, artwork_ids, limit: int = 10) -> list:
+        """
+        Rank every other artwork by its mean cosine similarity to `artwork_ids`,
+        newest first on ties. Returns artwork ids.
+        """
+        rows = [self.rows[a] for a in set(artwork_ids) if a in self.rows]
+        if not rows or limit <= 0:
+            return []
+
+        profile = np.asarray(self.matrix[rows].mean(axis=0)).ravel()
+        scores = self.matrix @ profile
+
+        mask = np.zeros(len(self.ids), dtype=bool)
+        mask[list(self.rows.values())] = True
+        mask[rows] = False
+        candidates = np.flatnonzero(mask)
+        if not len(candidates):
+            return []
+
+        cand_scores = scores[candidates]
+        if len(candidates) > limit:
+            # keep everything tied with the limit-th best score so createdAt can break the tie
+            kth = np.partition(cand_scores, len(cand_scores) - limit)[len(cand_scores) - limit]
+            keep = cand_scores >= kth
+            candidates, cand_scores = candidates[keep], cand_scores[keep]
+
+        order = np.lexsort((-self.created[candidates], -cand_scores))[:limit]
+        return [self.ids[i] for i in candidates[order]]
+
+    def binary(self) -> sparse.csr_matrix:
+        """Artwork x tag membership (1.0 per tag the artwork has)."""
+        if self._binary is None:
+            binary = self.matrix.copy()
+            binary.data[:] = 1.0
+            self._binary = binary
+        return self._binary
+
+    def score_profile(self, weights: dict, limit: int = None, tag_weight: float = 2.0,
+                      category_weight: float = 3.0) -> list:
+        """
+        Rank every artwork not in `weights` ({artwork_id: interaction weight}) against the
+        weighted tag and category profile of those artworks:
+            score = category_weight * profile[category] + tag_weight * sum(profile[tag] for shared tags)
+        Only positive scores are returned, best first and newest first on ties. Returns artwork ids.
+        """
+        pairs = [(self.rows[a], w) for a, w in weights.items() if a in self.rows]
+        if not pairs or (limit is not None and limit <= 0):
+            return []
+        rows = np.fromiter((r for r, _ in pairs), dtype=np.int64, count=len(pairs))
+        w = np.fromiter((w for _, w in pairs), dtype=np.float64, count=len(pairs))
+
+        binary = self.binary()
+        tag_profile = binary[rows].T @ w                         # weight per tag
+        category_profile = np.bincount(self.categories[rows], weights=w, minlength=len(self.category_vocab))
+        category_profile[0] = 0.0                                # "no category" never matches
+        scores = tag_weight * (binary @ tag_profile) + category_weight * category_profile[self.categories]
+
+        mask = np.zeros(len(self.ids), dtype=bool)
+        mask[list(self.rows.values())] = True
+        mask[rows] = False
+        candidates = np.flatnonzero(mask & (scores > 0))
+        if not len(candidates):
+            return []
+
+        cand_scores = scores[candidates]
+        if limit is not None and len(candidates) > limit:
+            # keep everything tied with the limit-th best score so createdAt can break the tie
+            kth = cand_scores[np.argpartition(cand_scores, len(cand_scores) - limit)[len(cand_scores) - limit]]
+            keep = cand_scores >= kth
+            candidates, cand_scores = candidates[keep], cand_scores[keep]
+
+        order = np.lexsort((-self.created[candidates], -cand_scores))[:limit]
+        return [self.ids[i] for i in candidates[order]]
+
+    # ----------------------------
+    # Persistence
+    # ----------------------------
+    def save(self, path: str = TAG_INDEX_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        vocab = sorted(self.vocab, key=self.vocab.get)
+        category_vocab = sorted(self.category_vocab, key=self.category_vocab.get)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                data=self.matrix.data,
+                indices=self.matrix.indices,
+                indptr=self.matrix.indptr,
+                shape=np.array(self.matrix.shape),
+                ids=np.array(self.ids, dtype="U36"),
+                vocab=np.array(vocab, dtype=str),
+                created=self.created,
+                category_vocab=np.array(category_vocab, dtype=str),
+                categories=self.categories,
+                built_at=np.array(self.built_at),
+            )
+        os.replace(tmp_path, path)  # atomic, readers never see a half-written file
+        self.mtime = os.path.getmtime(path)
+
+    @classmethod
+    def load(cls, path: str = TAG_INDEX_PATH) -> "TagIndex":
+        with np.load(path) as f:
+            matrix = sparse.csr_matrix((f["data"], f["indices"], f["indptr"]), shape=tuple(f["shape"]))
+            index = cls(f["ids"].tolist(), f["vocab"].tolist(), matrix, f["created"],
+                        f["category_vocab"].tolist(), f["categories"],
+                        float(f["built_at"]) if "built_at" in f.files else 0.0)
+        index.mtime = os.path.getmtime(path)
+        return index
+
+
+# -------------------------
+# SHARED INSTANCE
+# -------------------------
+
+_index = None
+_lock = threading.Lock()        # guards swapping _index, never held during a query
+_pending = {}                   # artwork_id -> (tags, created_at, category) or None, not yet in the file
+_pending_lock = threading.Lock()
+
+
+def _file_mtime(path: str = TAG_INDEX_PATH):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def get_tag_index(db: Session) -> TagIndex:
+    """
+    The current snapshot, reloaded when a worker has saved a newer file. Never builds:
+    until refresh_tag_index() has written the file, this is an empty index.
+    """
+    global _index
+    mtime = _file_mtime()
+    with _lock:
+        if mtime is not None and (_index is None or _index.mtime != mtime):
+            try:
+                _index = TagIndex.load()
+            except (OSError, KeyError, ValueError) as e:  # mid-replace, or saved before categories were indexed
+                print(f"⚠️ Tag index load failed: {e}")
+        if _index is None:
+            return TagIndex([], [], sparse.csr_matrix((0, 0)), [])
+        return _index
+
+
+def _publish(index: TagIndex) -> TagIndex:
+    global _index
+    with _lock:
+        _index = index
+    return index
+
+
+def rebuild_tag_index(db: Session) -> TagIndex:
+    with file_lock(TAG_INDEX_PATH):
+        index = TagIndex.build(db)
+        index.save()
+    return _publish(index)
+
+
+def refresh_tag_index():
+    """Background job: write queued artwork changes to the file; full rebuild when missing or stale."""
+    global _pending
+    with _pending_lock:
+        changes, _pending = _pending, {}
+
+    with file_lock(TAG_INDEX_PATH):
+        try:
+            index = TagIndex.load() if _file_mtime() is not None else None
+        except (OSError, KeyError, ValueError):
+            index = None
+        if index is None or time.time() - index.built_at > REBUILD_INTERVAL:
+            from app.database import SessionLocal
+
+            db = SessionLocal()
+            try:
+                index = TagIndex.build(db)  # queued changes were committed before they were queued
+            finally:
+                db.close()
+        elif changes:
+            index.apply(changes)
+        else:
+            return
+        index.save()
+    _publish(index)
+
+
+def index_artwork(db: Session, artwork: models.Artwork):
+    row = None if artwork.isDeleted else (artwork.tags, artwork.createdAt, artwork.category)
+    with _pending_lock:
+        _pending[str(artwork.id)] = row
+
+
+def remove_artwork(db: Session, artwork_id: str):
+    with _pending_lock:
+        _pending[str(artwork_id)] = None
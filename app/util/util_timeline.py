@@ -0,0 +1,228 @@
+import os
+import calendar
+from datetime import datetime
+from typing import List, Tuple
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+from app.models import models
+from app.core.redis_client import get_sync_redis
+
+# -------------------------
+# FOLLOWER TIMELINES (Redis)
+# -------------------------
+# timeline:{user_id}          ZSET artwork_id -> createdAt, newest artworks of the artists the user follows
+# timeline:{user_id}:celebs   SET of followed "celebrity" artists (always holds a "" sentinel); its
+#                             existence is what marks a timeline as built
+# artist:posts:{artist_id}    ZSET of a celebrity artist's newest artworks, read at feed time
+#
+# Artworks are pushed to followers' timelines when they pass moderation (fan-out on write).
+# Artists with CELEBRITY_FOLLOWERS or more followers are not fanned out; their posts are merged
+# in when the feed is read (fan-out on read). Timelines are built lazily from the DB on first
+# read, expire after TIMELINE_TTL and are dropped whenever the user follows/unfollows someone.
+
+TIMELINE_KEY = "timeline:{}"
+FOLLOWED_CELEBS_KEY = "timeline:{}:celebs"
+ARTIST_POSTS_KEY = "artist:posts:{}"
+
+TIMELINE_SIZE = 500
+ARTIST_POSTS_SIZE = 100
+TIMELINE_TTL = 3 * 24 * 3600  # seconds
+CELEBRITY_FOLLOWERS = int(os.getenv("FEED_CELEBRITY_FOLLOWERS", "10000"))
+FAN_OUT_CHUNK = 1000
+
+
+def _score(created_at: datetime) -> int:
+    return calendar.timegm(created_at.utctimetuple()) if created_at else 0
+
+
+def _visible():
+    return (
+        models.Artwork.status == models.StatusENUM.visible.value,
+        or_(models.Artwork.isDeleted == False, models.Artwork.isDeleted.is_(None)),
+    )
+
+
+def _follower_count(db: Session, artist_id: str) -> int:
+    return (
+        db.query(func.count())
+        .select_from(models.followers_association)
+        .filter(models.followers_association.c.followed_id == artist_id)
+        .scalar()
+    )
+
+
+def _split_followed(db: Session, user_id: str) -> Tuple[List[str], List[str]]:
+    """(regular artists, celebrity artists) followed by user_id."""
+    fa = models.followers_association
+    followed = [row.followed_id for row in db.query(fa.c.followed_id).filter(fa.c.follower_id == user_id).all()]
+    if not followed:
+        return [], []
+    celebs = {
+        row.followed_id
+        for row in db.query(fa.c.followed_id)
+        .filter(fa.c.followed_id.in_(followed))
+        .group_by(fa.c.followed_id)
+        .having(func.count() >= CELEBRITY_FOLLOWERS)
+        .all()
+    }
+    return [a for a in followed if a not in celebs], list(celebs)
+
+
+def build_timeline(db: Session, user_id: str) -> List[str]:
+    """Rebuild a user's timeline from the DB. Returns the followed celebrity ids."""
+    regular, celebs = _split_followed(db, user_id)
+    rows = []
+    if regular:
+        rows = (
+            db.query(models.Artwork.id, models.Artwork.createdAt)
+            .filter(models.Artwork.artistId.in_(regular), *_visible())
+            .order_by(models.Artwork.createdAt.desc())
+            .limit(TIMELINE_SIZE)
+            .all()
+        )
+
+    key, celebs_key = TIMELINE_KEY.format(user_id), FOLLOWED_CELEBS_KEY.format(user_id)
+    pipe = get_sync_redis().pipeline()
+    pipe.delete(key, celebs_key)
+    if rows:
+        pipe.zadd(key, {row.id: _score(row.createdAt) for row in rows})
+        pipe.expire(key, TIMELINE_TTL)
+    pipe.sadd(celebs_key, "", *celebs)
+    pipe.expire(celebs_key, TIMELINE_TTL)
+    pipe.execute()
+    return celebs
+
+
+def _artist_posts(db: Session, r, celebs: List[str], limit: int) -> List[Tuple[str, float]]:
+    pipe = r.pipeline(transaction=False)
+    for artist_id in celebs:
+        pipe.exists(ARTIST_POSTS_KEY.format(artist_id))
+        pipe.zrevrange(ARTIST_POSTS_KEY.format(artist_id), 0, limit - 1, withscores=True)
+    replies = pipe.execute()
+
+    entries = []
+    for i, artist_id in enumerate(celebs):
+        exists, posts = replies[2 * i], replies[2 * i + 1]
+        if not exists:
+            posts = _load_artist_posts(db, r, artist_id)[:limit]
+        entries.extend(posts)
+    return entries
+
+
+def _load_artist_posts(db: Session, r, artist_id: str) -> List[Tuple[str, float]]:
+    rows = (
+        db.query(models.Artwork.id, models.Artwork.createdAt)
+        .filter(models.Artwork.artistId == artist_id, *_visible())
+        .order_by(models.Artwork.createdAt.desc())
+        .limit(ARTIST_POSTS_SIZE)
+        .all()
+    )
+    posts = [(row.id, float(_score(row.createdAt))) for row in rows]
+    if posts:
+        key = ARTIST_POSTS_KEY.format(artist_id)
+        pipe = r.pipeline()
+        pipe.zadd(key, dict(posts))
+        pipe.expire(key, TIMELINE_TTL)
+        pipe.execute()
+    return posts
+
+
+def get_timeline_ids(db: Session, user_id: str, limit: int) -> List[str]:
+    """Newest `limit` artwork ids from followed artists: the pushed timeline merged with celebrity posts."""
+    user_id = str(user_id)
+    r = get_sync_redis()
+    try:
+        pipe = r.pipeline(transaction=False)
+        pipe.zrevrange(TIMELINE_KEY.format(user_id), 0, limit - 1, withscores=True)
+        pipe.smembers(FOLLOWED_CELEBS_KEY.format(user_id))
+        entries, celebs = pipe.execute()
+    except Exception as e:
+        print(f"⚠️ Timeline read failed, falling back to DB: {e}")
+        return _timeline_from_db(db, user_id, limit)
+
+    if not celebs:  # not built yet (or expired)
+        celebs = build_timeline(db, user_id)
+        entries = r.zrevrange(TIMELINE_KEY.format(user_id), 0, limit - 1, withscores=True)
+
+    celebs = [c for c in celebs if c]
+    if celebs:
+        entries = sorted(entries + _artist_posts(db, r, celebs, limit), key=lambda e: e[1], reverse=True)
+    return [artwork_id for artwork_id, _ in entries[:limit]]
+
+
+def _timeline_from_db(db: Session, user_id: str, limit: int) -> List[str]:
+    fa = models.followers_association
+    return [
+        row.id
+        for row in db.query(models.Artwork.id)
+        .join(fa, fa.c.followed_id == models.Artwork.artistId)
+        .filter(fa.c.follower_id == user_id, *_visible())
+        .order_by(models.Artwork.createdAt.desc())
+        .limit(limit)
+        .all()
+    ]
+
+
+def fan_out_artwork(artwork_id: str):
+    """Push a newly approved artwork to its artist's followers (or to the artist's post list for celebrities)."""
+    from app.database import SessionLocal
+    from app.util import util_feedcache
+
+    db: Session = SessionLocal()
+    try:
+        artwork = (
+            db.query(models.Artwork.id, models.Artwork.artistId, models.Artwork.createdAt)
+            .filter(models.Artwork.id == str(artwork_id), *_visible())
+            .first()
+        )
+        if not artwork:
+            return
+        score = _score(artwork.createdAt)
+        r = get_sync_redis()
+
+        if _follower_count(db, artwork.artistId) >= CELEBRITY_FOLLOWERS:
+            key = ARTIST_POSTS_KEY.format(artwork.artistId)
+            if r.exists(key):  # otherwise it is loaded in full on the next read
+                pipe = r.pipeline()
+                pipe.zadd(key, {artwork.id: score})
+                pipe.zremrangebyrank(key, 0, -ARTIST_POSTS_SIZE - 1)
+                pipe.execute()
+            util_feedcache.bump_artist(artwork.artistId)
+            return
+
+        fa = models.followers_association
+        followers = [
+            row.follower_id
+            for row in db.query(fa.c.follower_id).filter(fa.c.followed_id == artwork.artistId).all()
+        ]
+    finally:
+        db.close()
+
+    pushed = 0
+    for start in range(0, len(followers), FAN_OUT_CHUNK):
+        chunk = followers[start:start + FAN_OUT_CHUNK]
+        pipe = r.pipeline(transaction=False)
+        for follower_id in chunk:
+            pipe.exists(FOLLOWED_CELEBS_KEY.format(follower_id))
+        built = pipe.execute()
+
+        # only timelines that are already built; the rest pick the artwork up when they are built
+        targets = [follower_id for follower_id, exists in zip(chunk, built) if exists]
+        pipe = r.pipeline(transaction=False)
+        for follower_id in targets:
+            key = TIMELINE_KEY.format(follower_id)
+            pipe.zadd(key, {artwork.id: score})
+            pipe.zremrangebyrank(key, 0, -TIMELINE_SIZE - 1)
+            pipe.expire(key, TIMELINE_TTL)
+        util_feedcache.bump_many(targets, pipe)
+        pipe.execute()
+        pushed += len(targets)
+    print(f"📣 Artwork {artwork.id} fanned out to {pushed} timelines")
+
+
+def invalidate(user_id: str):
+    """Follow graph changed: drop the timeline, it is rebuilt on the next feed read."""
+    try:
+        get_sync_redis().delete(TIMELINE_KEY.format(user_id), FOLLOWED_CELEBS_KEY.format(user_id))
+    except Exception as e:
+        print(f"⚠️ Timeline invalidation failed for {user_id}: {e}")
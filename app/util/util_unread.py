@@ -0,0 +1,122 @@
+from collections import defaultdict
+from redis.exceptions import WatchError
+from sqlalchemy.orm import Session
+from app.models import models
+from app.core.redis_client import get_sync_redis
+from app.core.background import acquire_job_lock
+
+# -------------------------
+# UNREAD COUNTERS (Redis)
+# -------------------------
+# chat:unread:{receiver_id} is a hash of sender_id -> unread messages.
+# Updated right after the chat write commits; the conversations table stays the
+# source of truth and reconcile_unread() repairs any drift in the background.
+
+UNREAD_KEY = "chat:unread:{}"
+RECONCILE_INTERVAL = 300  # seconds
+
+
+def apply_chat_ops(ops: list):
+    """
+    Mirror committed chat writes onto the counters, in order, in one round trip:
+    ("message", row) -> HINCRBY receiver/sender, ("read", (sender_id, receiver_id)) -> HDEL.
+    """
+    if not ops:
+        return
+    try:
+        pipe = get_sync_redis().pipeline(transaction=False)
+        for kind, value in ops:
+            if kind == "message":
+                if value["sender_id"] != value["receiver_id"]:
+                    pipe.hincrby(UNREAD_KEY.format(value["receiver_id"]), value["sender_id"], 1)
+            else:
+                sender_id, receiver_id = value
+                pipe.hdel(UNREAD_KEY.format(receiver_id), str(sender_id))
+        pipe.execute()
+    except Exception as e:
+        print(f"⚠️ Unread counter update failed: {e}")
+
+
+def get_counts(receiver_id: str) -> dict:
+    counts = get_sync_redis().hgetall(UNREAD_KEY.format(receiver_id))
+    return {sender: int(n) for sender, n in counts.items() if int(n) > 0}
+
+
+def get_total(receiver_id: str) -> int:
+    return sum(get_counts(receiver_id).values())
+
+
+def _expected_counts(db: Session, owner_id: str) -> dict:
+    """Fresh conversations.unread_count of one owner, read in its own transaction."""
+    try:
+        rows = (
+            db.query(models.Conversation.partner_id, models.Conversation.unread_count)
+            .filter(models.Conversation.owner_id == owner_id, models.Conversation.unread_count > 0)
+            .all()
+        )
+    finally:
+        db.rollback()  # end the read so the next owner is not served from this snapshot
+    return {partner_id: str(unread) for partner_id, unread in rows}
+
+
+def _repair(r, db: Session, owner_id: str) -> bool:
+    """
+    Compare-and-set one hash against the DB: WATCH the key, read it, re-read the owner's
+    rows and only write if the key did not move meanwhile. A HINCRBY from apply_chat_ops
+    landing in between aborts the EXEC and the key is left for the next run.
+    """
+    key = UNREAD_KEY.format(owner_id)
+    with r.pipeline() as pipe:
+        try:
+            pipe.watch(key)
+            current = pipe.hgetall(key)
+            counts = _expected_counts(db, owner_id)
+            if current == counts:
+                return False
+            pipe.multi()
+            pipe.delete(key)
+            if counts:
+                pipe.hset(key, mapping=counts)
+            pipe.execute()
+            return True
+        except WatchError:
+            return False
+
+
+def reconcile_unread():
+    """Make every chat:unread:* hash match conversations.unread_count (runs on one worker at a time)."""
+    if not acquire_job_lock("reconcile_unread", RECONCILE_INTERVAL - 5):
+        return
+
+    from app.database import SessionLocal
+
+    db: Session = SessionLocal()
+    try:
+        rows = (
+            db.query(models.Conversation.owner_id, models.Conversation.partner_id, models.Conversation.unread_count)
+            .filter(models.Conversation.unread_count > 0)
+            .all()
+        )
+        db.rollback()
+
+        expected = defaultdict(dict)
+        for owner_id, partner_id, unread in rows:
+            expected[owner_id][partner_id] = str(unread)
+
+        # the snapshot only picks the candidates; every write re-checks the DB and the key
+        r = get_sync_redis()
+        suspects = set()
+        for key in r.scan_iter(match=UNREAD_KEY.format("*"), count=500):
+            owner_id = key.rsplit(":", 1)[-1]
+            if owner_id not in expected:
+                suspects.add(owner_id)
+        for owner_id, counts in expected.items():
+            if r.hgetall(UNREAD_KEY.format(owner_id)) != counts:
+                suspects.add(owner_id)
+
+        fixed = sum(_repair(r, db, owner_id) for owner_id in suspects)
+    finally:
+        db.close()
+
+    if fixed:
+        print(f"🔧 Reconciled unread counters for {fixed} users")
@@ -0,0 +1,328 @@
+import os
+import io
+import shutil
+import threading
+import time
+from typing import List, Optional, Tuple
+import numpy as np
+from PIL import Image
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from app.models import models
+from app.core.redis_client import get_sync_redis
+from app.util.util_filelock import file_lock
+
+# -------------------------
+# VISUAL SIMILARITY INDEX
+# -------------------------
+# Every ArtworkImage gets a small feature vector computed locally at upload time
+# (artwork_images.visual_vector, float16):
+#   - 4x4x4 RGB colour histogram (square-rooted, so a dot product is the Bhattacharyya coefficient)
+#   - 8x8 grayscale thumbnail minus its mean (coarse layout, perceptual-hash style)
+# each L2-normalised and weighted, then normalised again: cosine similarity == dot product.
+#
+# The index is a set of .npy files opened with mmap_mode="r", so every worker shares one copy
+# through the page cache:
+#   vectors.npy        N x DIM float16, one row per image
+#   image_artwork.npy  N int32 -> row of artwork_ids.npy
+#   planes.npy         TABLES x BITS x DIM random hyperplanes (random-projection LSH)
+#   codes.npy/order.npy  per table, the BITS-bit bucket code of every image, sorted, and the
+#                        image rows in that order (a bucket is a searchsorted range)
+# A query probes its own bucket plus every bucket one bit away in each table, then re-ranks the
+# candidates exactly (small indexes are simply scanned). Builds go to a new directory; CURRENT
+# names the live one.
+#
+# The index lives on each host's local disk. Uploads only bump a cluster-wide version counter
+# in Redis; refresh_visual_index() (background job, every worker) rebuilds this host's index
+# when it is missing or was built at an older version. A file lock makes one worker per host
+# do the build; the others find it up to date afterwards.
+
+VISUAL_INDEX_DIR = os.getenv("VISUAL_INDEX_DIR", os.path.join("data", "visual_index"))
+VERSION_KEY = "visual:version"
+REFRESH_INTERVAL = 600  # seconds
+
+HIST_LEVELS = 4                       # per channel -> 64 bins
+LAYOUT_SIZE = 8                       # 8 x 8 grayscale -> 64 values
+DIM = HIST_LEVELS ** 3 + LAYOUT_SIZE ** 2
+VECTOR_BYTES = DIM * 2                # float16
+COLOUR_WEIGHT, LAYOUT_WEIGHT = 0.7, 0.3
+TABLES, BITS = 8, 16
+EXACT_BELOW = 50_000                  # images; smaller indexes are scanned instead of probed
+SEED = 7
+BUILD_CHUNK = 100_000
+
+
+# -------------------------
+# FEATURE VECTORS
+# -------------------------
+
+def _unit(v: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(v)
+    return v / norm if norm else v
+
+
+def vector_from_image(img: Image.Image) -> np.ndarray:
+    img.draft("RGB", (64, 64))  # JPEGs are decoded at reduced size
+    small = img.convert("RGB").resize((32, 32))
+
+    levels = (np.asarray(small, dtype=np.uint8) // (256 // HIST_LEVELS)).reshape(-1, 3).astype(np.int64)
+    bins = (levels[:, 0] * HIST_LEVELS + levels[:, 1]) * HIST_LEVELS + levels[:, 2]
+    hist = np.sqrt(np.bincount(bins, minlength=HIST_LEVELS ** 3) / len(bins))
+
+    layout = np.asarray(small.convert("L").resize((LAYOUT_SIZE, LAYOUT_SIZE)), dtype=np.float64).ravel()
+    layout = _unit(layout - layout.mean())
+
+    return _unit(np.concatenate([np.sqrt(COLOUR_WEIGHT) * hist, np.sqrt(LAYOUT_WEIGHT) * layout])).astype(np.float32)
+
+
+def image_vector(fileobj) -> Optional[bytes]:
+    """Feature vector of an uploaded image as float16 bytes (None if it cannot be decoded). Rewinds fileobj."""
+    try:
+        with Image.open(fileobj) as img:
+            return vector_from_image(img).astype(np.float16).tobytes()
+    except Exception as e:
+        print(f"⚠️ Could not compute visual vector: {e}")
+        return None
+    finally:
+        fileobj.seek(0)
+
+
+def decode(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+
+
+# -------------------------
+# INDEX
+# -------------------------
+
+def _codes(vectors: np.ndarray, planes: np.ndarray) -> np.ndarray:
+    """(n, DIM) vectors -> (n, TABLES) uint32 bucket codes."""
+    bits = (vectors @ planes.reshape(-1, planes.shape[-1]).T > 0).reshape(len(vectors), *planes.shape[:2])
+    return (bits.astype(np.uint32) << np.arange(planes.shape[1], dtype=np.uint32)).sum(axis=2, dtype=np.uint32)
+
+
+class VisualIndex:
+
+    def __init__(self, path: str):
+        self.path = path
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        self.image_artwork = np.load(os.path.join(path, "image_artwork.npy"), mmap_mode="r")
+        self.artwork_ids = np.load(os.path.join(path, "artwork_ids.npy"))
+        self.planes = np.load(os.path.join(path, "planes.npy"))
+        self.codes = np.load(os.path.join(path, "codes.npy"), mmap_mode="r")
+        self.order = np.load(os.path.join(path, "order.npy"), mmap_mode="r")
+        self.probe_masks = np.concatenate([[0], 1 << np.arange(BITS)]).astype(np.uint32)
+
+    @staticmethod
+    def build(db: Session, root: str = VISUAL_INDEX_DIR, version: int = 0) -> int:
+        """
+        Write a new index from artwork_images.visual_vector and make it CURRENT. `version` is the
+        VERSION_KEY value read before the build started. Returns the image count.
+        """
+        query = (
+            db.query(models.ArtworkImage.artwork_id, models.ArtworkImage.visual_vector)
+            .join(models.Artwork, models.Artwork.id == models.ArtworkImage.artwork_id)
+            .filter(models.ArtworkImage.visual_vector.isnot(None),
+                    or_(models.Artwork.isDeleted == False, models.Artwork.isDeleted.is_(None)))
+        )
+        n = query.count()
+
+        build_id = f"{int(time.time() * 1000)}-{os.getpid()}"
+        path = os.path.join(root, build_id)
+        os.makedirs(path, exist_ok=True)
+        vectors = np.lib.format.open_memmap(os.path.join(path, "vectors.npy"), mode="w+", dtype=np.float16, shape=(n, DIM))
+        image_artwork = np.zeros(n, dtype=np.int32)
+        artworks = {}
+        i = 0
+        for row in query.yield_per(5000):
+            if i == n:  # rows inserted since the count; picked up by the next build
+                break
+            if len(row.visual_vector) != VECTOR_BYTES:  # image that could not be decoded
+                continue
+            vectors[i] = np.frombuffer(row.visual_vector, dtype=np.float16)
+            image_artwork[i] = artworks.setdefault(row.artwork_id, len(artworks))
+            i += 1
+        n = i
+        vectors.flush()
+
+        planes = np.random.default_rng(SEED).standard_normal((TABLES, BITS, DIM)).astype(np.float32)
+        codes = np.zeros((TABLES, n), dtype=np.uint32)
+        for start in range(0, n, BUILD_CHUNK):
+            end = min(start + BUILD_CHUNK, n)
+            codes[:, start:end] = _codes(np.asarray(vectors[start:end], dtype=np.float32), planes).T
+        order = np.argsort(codes, axis=1, kind="stable").astype(np.int32)
+
+        np.save(os.path.join(path, "image_artwork.npy"), image_artwork[:n])
+        np.save(os.path.join(path, "artwork_ids.npy"), np.array(sorted(artworks, key=artworks.get), dtype="U36"))
+        np.save(os.path.join(path, "planes.npy"), planes)
+        np.save(os.path.join(path, "codes.npy"), np.take_along_axis(codes, order, axis=1))
+        np.save(os.path.join(path, "order.npy"), order)
+        with open(os.path.join(path, "VERSION"), "w") as f:
+            f.write(str(version))
+        del vectors
+        if n < len(image_artwork):  # fewer rows than counted: trim the vectors file
+            np.save(os.path.join(path, "vectors.npy"), np.load(os.path.join(path, "vectors.npy"))[:n])
+
+        tmp_path = os.path.join(root, f"CURRENT.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            f.write(build_id)
+        previous = _current_build_id(root)
+        os.replace(tmp_path, os.path.join(root, "CURRENT"))  # atomic switch for every worker
+
+        # keep the previous build for workers that have not switched yet, drop anything older
+        for name in os.listdir(root):
+            if name not in (build_id, previous, "CURRENT") and os.path.isdir(os.path.join(root, name)):
+                shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+        return n
+
+    def query(self, vector: np.ndarray, limit: int = 10, exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Most similar artworks to `vector` as [(artwork_id, score)], best image per artwork, best first."""
+        if not len(self.vectors) or limit <= 0:
+            return []
+        vector = np.asarray(vector, dtype=np.float32)
+        if len(self.vectors) < EXACT_BELOW:
+            candidates = np.arange(len(self.vectors))
+        else:
+            probes = _codes(vector[None, :], self.planes)[0][:, None] ^ self.probe_masks  # TABLES x (BITS + 1)
+            ranges = []
+            for t in range(TABLES):
+                lo = np.searchsorted(self.codes[t], probes[t], side="left")
+                hi = np.searchsorted(self.codes[t], probes[t], side="right")
+                ranges.extend(self.order[t][a:b] for a, b in zip(lo, hi) if b > a)
+            if not ranges:
+                return []
+            candidates = np.unique(np.concatenate(ranges))
+
+        scores = np.asarray(self.vectors[candidates], dtype=np.float32) @ vector
+        artwork_rows = self.image_artwork[candidates]
+        results, seen = [], set()
+        for i in np.argsort(-scores, kind="stable"):
+            artwork_id = str(self.artwork_ids[artwork_rows[i]])
+            if artwork_id in seen or artwork_id == exclude:
+                continue
+            seen.add(artwork_id)
+            results.append((artwork_id, float(scores[i])))
+            if len(results) == limit:
+                break
+        return results
+
+
+# -------------------------
+# SHARED INSTANCE
+# -------------------------
+
+_index = None
+_lock = threading.Lock()
+
+
+def _current_build_id(root: str = VISUAL_INDEX_DIR) -> Optional[str]:
+    try:
+        with open(os.path.join(root, "CURRENT")) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def _built_version(build_id: str, root: str = VISUAL_INDEX_DIR) -> int:
+    try:
+        with open(os.path.join(root, build_id, "VERSION")) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return -1
+
+
+def get_visual_index() -> Optional[VisualIndex]:
+    """The live index, reopened when another worker has switched CURRENT. None until the first build."""
+    global _index
+    build_id = _current_build_id()
+    if build_id is None:
+        return None
+    with _lock:
+        if _index is None or os.path.basename(_index.path) != build_id:
+            _index = VisualIndex(os.path.join(VISUAL_INDEX_DIR, build_id))
+        return _index
+
+
+def similar_artworks(db: Session, artwork_id: str, limit: int = 10) -> List[str]:
+    """Artwork ids that look most like the given artwork (mean of its image vectors)."""
+    index = get_visual_index()
+    if index is None:
+        return []
+    blobs = [
+        row.visual_vector
+        for row in db.query(models.ArtworkImage.visual_vector)
+        .filter(models.ArtworkImage.artwork_id == str(artwork_id), models.ArtworkImage.visual_vector.isnot(None))
+        .all()
+    ]
+    blobs = [b for b in blobs if len(b) == VECTOR_BYTES]
+    if not blobs:
+        return []
+    vector = _unit(np.mean([decode(b) for b in blobs], axis=0))
+    return [a for a, _ in index.query(vector, limit=limit, exclude=str(artwork_id))]
+
+
+def mark_dirty():
+    try:
+        get_sync_redis().incr(VERSION_KEY)
+    except Exception as e:
+        print(f"⚠️ Could not mark visual index dirty: {e}")
+
+
+def refresh_visual_index():
+    """Background job: rebuild this host's index when images changed (or when there is none yet)."""
+    try:
+        version = int(get_sync_redis().get(VERSION_KEY) or 0)
+    except Exception as e:
+        print(f"⚠️ Could not read visual index version: {e}")
+        version = None  # Redis down: only build when this host has no index at all
+
+    with file_lock(VISUAL_INDEX_DIR):
+        build_id = _current_build_id()
+        if build_id is not None and (version is None or _built_version(build_id) >= version):
+            return
+
+        from app.database import SessionLocal
+
+        db: Session = SessionLocal()
+        try:
+            count = VisualIndex.build(db, version=version or 0)
+            print(f"🖼️ Visual index rebuilt with {count} images")
+        finally:
+            db.close()
+
+
+def backfill_vectors(db: Session, batch: int = 200) -> int:
+    """Compute visual_vector for images uploaded before it existed (downloads each image once)."""
+    import requests
+
+    done = 0
+    while True:
+        images = (
+            db.query(models.ArtworkImage)
+            .filter(models.ArtworkImage.visual_vector.is_(None))
+            .limit(batch)
+            .all()
+        )
+        if not images:
+            return done
+        for image in images:
+            try:
+                response = requests.get(image.url, timeout=30)
+                response.raise_for_status()
+                image.visual_vector = image_vector(io.BytesIO(response.content)) or b""
+            except Exception as e:
+                print(f"⚠️ Could not fetch {image.url}: {e}")
+                image.visual_vector = b""  # not retried; an empty vector is skipped by the index
+            done += 1
+        db.commit()
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        print(f"Computed visual vectors for {backfill_vectors(session)} images")
+        print(f"Visual index built with {VisualIndex.build(session)} images")
+    finally:
+        session.close()
@@ -0,0 +1,165 @@
+"""
+Admin audit logging benchmark: per-request overhead of the previous AdminLoggerMiddleware
+(BaseHTTPMiddleware; own session, second JWT decode, user query and a synchronous commit per
+admin call) vs app.core.admin_logger.AdminAuditMiddleware (pure ASGI, batched writes), on a
+public route and on an admin route.
+
+Usage:
+    python benchmarks/bench_admin_audit.py --requests 2000 --rounds 3
+
+Runs in-process against a throwaway SQLite database (DATABASE_URL is only set if missing).
+Both admin routes authenticate through the real get_current_admin.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench_admin_audit.db")
+os.environ.setdefault("JWT_ISSUER", "bench")
+
+import httpx
+from fastapi import APIRouter, Depends, FastAPI, Request
+from starlette.middleware.base import BaseHTTPMiddleware
+from sqlalchemy.orm import Session
+from app.database import Base, SessionLocal, engine
+from app.models.models import AdminAuditLog, RoleEnum, User
+from app.core.auth import create_token, decode_access_token, get_current_admin
+from app.core.admin_logger import AdminAuditMiddleware, AuditLogWriter
+
+
+class PreviousAdminLoggerMiddleware(BaseHTTPMiddleware):
+    """The previous AdminLoggerMiddleware, unchanged."""
+
+    async def dispatch(self, request: Request, call_next):
+        path = request.url.path
+        method = request.method
+
+        if path.startswith("/api/admin"):
+            db: Session = SessionLocal()
+            try:
+                token = request.headers.get("Authorization")
+                if token and token.startswith("Bearer "):
+                    token = token.split(" ")[1]
+                    decoded = decode_access_token(token)
+
+                    if decoded and decoded.get("username"):
+                        user = db.query(User).filter(User.username == decoded["username"]).first()
+                        if user and user.role == RoleEnum.admin:
+                            log = AdminAuditLog(
+                                admin_id=user.id,
+                                method=method,
+                                path=path,
+                                action=f"{method} {path}",
+                                description=f"Admin {user.username} called {method} {path}",
+                                ip_address=request.headers.get("x-forwarded-for", request.client.host),
+                                timestamp=datetime.utcnow()
+                            )
+                            db.add(log)
+                            db.commit()
+            except Exception as e:
+                print(f"[AdminLoggerMiddleware] Error: {e}")
+            finally:
+                db.close()
+
+        return await call_next(request)
+
+
+def make_app(middleware=None, **options) -> FastAPI:
+    app = FastAPI()
+    public = APIRouter()
+    admin = APIRouter(dependencies=[Depends(get_current_admin)])
+
+    @public.get("/artworks")
+    def list_artworks():
+        return {"ok": True}
+
+    @admin.get("/stats")
+    def stats():
+        return {"ok": True}
+
+    app.include_router(public, prefix="/api")
+    app.include_router(admin, prefix="/api/admin")
+    if middleware is not None:
+        app.add_middleware(middleware, **options)
+    return app
+
+
+def seed_admin() -> str:
+    Base.metadata.create_all(bind=engine, tables=[User.__table__, AdminAuditLog.__table__])
+    db = SessionLocal()
+    try:
+        username = f"bench_admin_{uuid.uuid4().hex[:8]}"
+        db.add(User(name="Bench", email=f"{username}@example.com", username=username,
+                    passwordHash="x", role=RoleEnum.admin))
+        db.commit()
+    finally:
+        db.close()
+    return create_token({"sub": username, "username": username}, timedelta(hours=1))
+
+
+def audit_rows() -> int:
+    db = SessionLocal()
+    try:
+        return db.query(AdminAuditLog).count()
+    finally:
+        db.close()
+
+
+async def measure(app, path: str, headers: dict, count: int) -> list:
+    samples = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(count):
+            start = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            samples.append((time.perf_counter() - start) * 1e6)
+            assert response.status_code == 200, response.text
+    return samples
+
+
+def report(name: str, samples: list):
+    samples = sorted(samples)
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(f"{name:<34} mean {statistics.mean(samples):8.0f} µs   p50 {statistics.median(samples):8.0f} µs   "
+          f"p99 {p99:8.0f} µs")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    headers = {"Authorization": f"Bearer {seed_admin()}"}
+    writer = AuditLogWriter()
+    await writer.start()
+    variants = [
+        ("no audit middleware", make_app()),
+        ("previous (BaseHTTPMiddleware)", make_app(PreviousAdminLoggerMiddleware)),
+        ("pure ASGI + batched", make_app(AdminAuditMiddleware, writer=writer)),
+    ]
+    print(f"{args.requests} sequential requests x {args.rounds} rounds, database {engine.url.drivername}")
+
+    for path in ("/api/artworks", "/api/admin/stats"):
+        print(f"\nGET {path}")
+        for name, app in variants:
+            await measure(app, path, headers, min(200, args.requests))  # warm-up
+            samples = []
+            for _ in range(args.rounds):
+                samples += await measure(app, path, headers, args.requests)
+            report(name, samples)
+
+    before = audit_rows()
+    await writer.stop()
+    print(f"\naudit rows written: {audit_rows()} (last {audit_rows() - before} flushed at shutdown)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,110 @@
+"""
+Artwork image upload benchmark: the previous create_artwork loop (read each file fully to check
+its size, then upload files one after another) vs app.core.media_storage (streamed validation,
+concurrent uploads).
+
+Usage:
+    python benchmarks/bench_artwork_upload.py --files 6 --size-mb 8 --latency-ms 400 --rounds 5
+
+Uploads go to a LocalStorage in a temp directory with an artificial per-upload latency
+(--latency-ms plus --bandwidth-mbps transfer time) standing in for Cloudinary.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.datastructures import Headers, UploadFile
+from app.core import media_storage
+
+MAX_FILE_SIZE_MB = 20
+ALLOWED_MIME_TYPES = {"image/jpeg", "image/png"}
+
+
+class SlowLocalStorage(media_storage.LocalStorage):
+    """LocalStorage that takes as long as a remote upload would."""
+
+    def __init__(self, root: str, latency_s: float, bandwidth_bps: float):
+        super().__init__(root=root)
+        self.latency_s = latency_s
+        self.bandwidth_bps = bandwidth_bps
+
+    def upload(self, fileobj, folder: str) -> dict:
+        start = time.perf_counter()
+        result = super().upload(fileobj, folder)
+        size = fileobj.tell()
+        remaining = self.latency_s + size / self.bandwidth_bps - (time.perf_counter() - start)
+        if remaining > 0:
+            time.sleep(remaining)
+        return result
+
+
+def make_files(count: int, size_mb: float) -> list:
+    files = []
+    payload = b"\xff\xd8\xff\xe0" + os.urandom(int(size_mb * 1024 * 1024) - 4)
+    for i in range(count):
+        spooled = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+        spooled.write(payload)
+        spooled.seek(0)
+        files.append(UploadFile(file=spooled, filename=f"{i}.jpg", headers=Headers({"content-type": "image/jpeg"})))
+    return files
+
+
+def old_pipeline(files: list):
+    """The previous create_artwork loop, minus the DB work."""
+    storage = media_storage.get_storage()
+    for file in files:
+        contents = file.file.read()
+        if len(contents) > MAX_FILE_SIZE_MB * 1024 * 1024:
+            raise ValueError("too large")
+        file.file.seek(0)
+        storage.upload(file.file, folder="bench")
+
+
+def new_pipeline(files: list):
+    for file in files:
+        media_storage.validate_image(file, ALLOWED_MIME_TYPES, MAX_FILE_SIZE_MB * 1024 * 1024)
+    media_storage.upload_many([file.file for file in files], folder="bench")
+
+
+def run(name: str, fn, files: list, rounds: int):
+    samples, peaks = [], []
+    for _ in range(rounds):
+        for file in files:
+            file.file.seek(0)
+        tracemalloc.start()
+        start = time.perf_counter()
+        fn(files)
+        samples.append((time.perf_counter() - start) * 1000)
+        peaks.append(tracemalloc.get_traced_memory()[1] / 1e6)
+        tracemalloc.stop()
+    print(f"{name:<26} mean {statistics.mean(samples):9.1f} ms   min {min(samples):9.1f} ms   "
+          f"peak Python memory {max(peaks):7.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=6)
+    parser.add_argument("--size-mb", type=float, default=8)
+    parser.add_argument("--latency-ms", type=float, default=400)
+    parser.add_argument("--bandwidth-mbps", type=float, default=100)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp()
+    media_storage.set_storage(SlowLocalStorage(root, args.latency_ms / 1000, args.bandwidth_mbps * 1e6 / 8))
+    files = make_files(args.files, args.size_mb)
+    print(f"{args.files} files x {args.size_mb} MB, {args.latency_ms:.0f} ms latency, "
+          f"{args.bandwidth_mbps:.0f} Mbit/s per upload, {media_storage.UPLOAD_WORKERS} upload workers")
+
+    run("sequential (previous)", old_pipeline, files, args.rounds)
+    run("streamed + concurrent", new_pipeline, files, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
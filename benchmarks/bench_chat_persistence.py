@@ -0,0 +1,124 @@
+"""
+Chat persistence benchmark: messages/sec for one worker, and how long the
+event loop is stalled, before and after the write-behind queue.
+
+    before: every message runs chat_crud.create_message (commit + refresh) on the loop
+    after : messages go through app.core.chat_writer (micro-batched group commits in a thread)
+
+Usage:
+    DATABASE_URL=mysql+pymysql://... python benchmarks/bench_chat_persistence.py --sockets 50 --messages 40
+
+Defaults to a throwaway SQLite file when DATABASE_URL is not set.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite:///bench_chat.db")
+
+from app.database import SessionLocal, Base, engine
+from app.models import models
+from app.crud import chat_crud
+from app.core.chat_writer import ChatWriter
+from app.schemas.chat_schemas import MessageCreate
+
+
+def setup_users():
+    Base.metadata.create_all(bind=engine, tables=[models.User.__table__, models.Message.__table__])
+    db = SessionLocal()
+    ids = []
+    for _ in range(2):
+        uid = str(uuid.uuid4())
+        db.add(models.User(id=uid, name="bench", email=f"{uid}@bench.local", username=f"bench_{uid[:8]}", passwordHash="x"))
+        ids.append(uid)
+    db.commit()
+    db.close()
+    return ids
+
+
+def cleanup(user_ids):
+    db = SessionLocal()
+    db.query(models.Message).filter(models.Message.sender_id.in_(user_ids)).delete(synchronize_session=False)
+    db.query(models.User).filter(models.User.id.in_(user_ids)).delete(synchronize_session=False)
+    db.commit()
+    db.close()
+
+
+async def loop_lag_probe(stop: asyncio.Event, samples: list, interval: float = 0.005):
+    """Records how late a 5 ms timer fires; that delay is what every other socket feels."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(loop.time() - start - interval)
+
+
+async def run_before(sender, receiver, sockets, messages):
+    async def socket(n):
+        for i in range(messages):
+            # The old handler pinned one session (and pooled connection) per socket, which
+            # deadlocks the loop once sockets > pool size; a short session per message is its best case.
+            db = SessionLocal()
+            try:
+                msg = MessageCreate(action="message", receiver_id=receiver, content=f"s{n} m{i}")
+                chat_crud.create_message(db, sender_id=sender, msg=msg)
+            finally:
+                db.close()
+            await asyncio.sleep(0)  # next frame from the socket
+
+    await asyncio.gather(*(socket(n) for n in range(sockets)))
+
+
+async def run_after(sender, receiver, sockets, messages):
+    writer = ChatWriter()
+    await writer.start()
+
+    async def socket(n):
+        futures = []
+        for i in range(messages):
+            msg = MessageCreate(action="message", receiver_id=receiver, content=f"s{n} m{i}")
+            futures.append(await writer.save_message(chat_crud.build_message_row(sender, msg)))
+            await asyncio.sleep(0)
+        await asyncio.gather(*futures)  # every message acked == committed
+
+    await asyncio.gather(*(socket(n) for n in range(sockets)))
+    await writer.stop()
+
+
+async def measure(name, runner, sender, receiver, sockets, messages):
+    stop, lag = asyncio.Event(), []
+    probe = asyncio.create_task(loop_lag_probe(stop, lag))
+    start = time.perf_counter()
+    await runner(sender, receiver, sockets, messages)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+
+    total = sockets * messages
+    lag.sort()
+    p99 = lag[int(len(lag) * 0.99) - 1] if lag else elapsed
+    worst = lag[-1] if lag else elapsed
+    print(f"{name:<7} {total:>7} msgs  {elapsed:8.2f}s  {total / elapsed:10.0f} msg/s  "
+          f"loop lag p99 {p99 * 1000:8.1f} ms  max {worst * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sockets", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=40, help="messages per socket")
+    args = parser.parse_args()
+
+    sender, receiver = setup_users()
+    try:
+        asyncio.run(measure("before", run_before, sender, receiver, args.sockets, args.messages))
+        asyncio.run(measure("after", run_after, sender, receiver, args.sockets, args.messages))
+    finally:
+        cleanup([sender, receiver])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Artwork search benchmark: the old four-way ILIKE scan vs the inverted index (app.util.util_search)
+on a synthetic catalogue.
+
+Usage:
+    DATABASE_URL=mysql+pymysql://... python benchmarks/bench_search.py --artworks 100000 --queries 200
+
+Defaults to a throwaway SQLite file when DATABASE_URL is not set. Synthetic rows are
+inserted under a dedicated bench user and removed afterwards.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite:///bench_search.db")
+
+from sqlalchemy import insert, or_
+from app.database import SessionLocal, Base, engine
+from app.models import models
+from app.util.util_search import SearchIndex
+
+CATEGORIES = ["Painting", "Photography", "Digital", "Sculpture", "Illustration", "Drawing", "Mixed Media"]
+
+
+def make_vocabulary(size: int, rng: random.Random) -> list:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(3, 10))))
+    return sorted(words)
+
+
+def seed(db, artworks: int, vocabulary: list, rng: random.Random) -> str:
+    Base.metadata.create_all(bind=engine, tables=[models.User.__table__, models.Artwork.__table__])
+    artist_id = str(uuid.uuid4())
+    db.add(models.User(id=artist_id, name="bench", email=f"{artist_id}@bench.local",
+                       username=f"bench_{artist_id[:8]}", passwordHash="x"))
+    db.commit()
+
+    # Zipf-ish word popularity, like real titles and tags
+    weights = [1.0 / (rank + 1) for rank in range(len(vocabulary))]
+    start = datetime(2024, 1, 1)
+    batch = []
+    for i in range(artworks):
+        words = rng.choices(vocabulary, weights, k=14)
+        batch.append({
+            "id": str(uuid.uuid4()),
+            "title": " ".join(words[:3]).title(),
+            "description": " ".join(words[3:11]),
+            "category": rng.choice(CATEGORIES),
+            "tags": words[11:14],
+            "artistId": artist_id,
+            "createdAt": start + timedelta(minutes=i),
+            "isDeleted": False,
+        })
+        if len(batch) == 5000:
+            db.execute(insert(models.Artwork), batch)
+            batch = []
+    if batch:
+        db.execute(insert(models.Artwork), batch)
+    db.commit()
+    return artist_id
+
+
+def cleanup(db, artist_id: str):
+    db.query(models.Artwork).filter(models.Artwork.artistId == artist_id).delete(synchronize_session=False)
+    db.query(models.User).filter(models.User.id == artist_id).delete(synchronize_session=False)
+    db.commit()
+
+
+def ilike_search(db, query: str) -> list:
+    """The previous search_crud.search_artworks predicate (ids only, so we time the scan, not ORM loading)."""
+    return [row.id for row in db.query(models.Artwork.id).filter(
+        or_(
+            models.Artwork.title.ilike(f"%{query}%"),
+            models.Artwork.description.ilike(f"%{query}%"),
+            models.Artwork.category.ilike(f"%{query}%"),
+            models.Artwork.tags.ilike(f"%{query}%")
+        )).all()]
+
+
+def timed(fn, queries) -> list:
+    samples = []
+    for q in queries:
+        start = time.perf_counter()
+        fn(q)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(name: str, samples: list):
+    samples = sorted(samples)
+    p95 = samples[max(0, int(len(samples) * 0.95) - 1)]
+    print(f"{name:<22} mean {statistics.mean(samples):9.2f} ms   p50 {statistics.median(samples):9.2f} ms   p95 {p95:9.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--artworks", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--vocabulary", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    vocabulary = make_vocabulary(args.vocabulary, rng)
+    db = SessionLocal()
+
+    start = time.perf_counter()
+    artist_id = seed(db, args.artworks, vocabulary, rng)
+    print(f"seeded {args.artworks} artworks in {time.perf_counter() - start:.1f}s")
+
+    try:
+        start = time.perf_counter()
+        index = SearchIndex.build(db)
+        build_s = time.perf_counter() - start
+        path = os.path.join(tempfile.mkdtemp(), "search_index.npz")
+        index.save(path)
+        print(f"index build {build_s:.1f}s, {len(index.vocab)} terms, {os.path.getsize(path) / 1e6:.1f} MB on disk")
+
+        # mix of one-word, two-word and typed-prefix queries
+        head = vocabulary[:2000]
+        queries = []
+        for _ in range(args.queries):
+            kind = rng.random()
+            if kind < 0.4:
+                queries.append(rng.choice(head))
+            elif kind < 0.8:
+                queries.append(f"{rng.choice(head)} {rng.choice(head)}")
+            else:
+                queries.append(rng.choice(head)[:3])
+
+        ilike = timed(lambda q: ilike_search(db, q), queries)
+        indexed = timed(lambda q: index.search(q, 0, 20), queries)
+
+        def indexed_page(q):
+            ids, _ = index.search(q, 0, 20)
+            if ids:
+                db.query(models.Artwork).filter(models.Artwork.id.in_(ids)).all()
+        hydrated = timed(indexed_page, queries)
+
+        report("ILIKE scan", ilike)
+        report("index search", indexed)
+        report("index + page hydrate", hydrated)
+
+        start = time.perf_counter()
+        index.apply({
+            str(uuid.uuid4()): ("new blue ocean", "fresh artwork", "Painting", ["ocean"], datetime.utcnow())
+            for _ in range(100)
+        })
+        print(f"batched apply          {(time.perf_counter() - start) * 10:.2f} ms per artwork (in memory)")
+    finally:
+        cleanup(db, artist_id)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()